@@ -0,0 +1,46 @@
+"""Add analysis jobs table
+
+Revision ID: 3f9a1c2d7b45
+Revises: ca7bdec27c32
+Create Date: 2026-10-17 10:12:41.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7b45'
+down_revision: Union[str, None] = 'ca7bdec27c32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('analysis_jobs',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'RUNNING', 'SUCCEEDED', 'FAILED', name='analysisjobstatus'), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('video_path', sa.String(length=255), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysis_jobs_id'), 'analysis_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_jobs_user_id'), 'analysis_jobs', ['user_id'], unique=False)
+    op.create_index('ix_analysis_jobs_queue', 'analysis_jobs', ['status', 'priority', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_jobs_queue', table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_user_id'), table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_id'), table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
@@ -0,0 +1,45 @@
+"""Add analysis results table
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f9a1c2d7b45
+Create Date: 2026-10-17 15:36:08.417290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, None] = '3f9a1c2d7b45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('analysis_results',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=True),
+    sa.Column('source', sa.String(length=20), nullable=False),
+    sa.Column('score', sa.Float(), nullable=True),
+    sa.Column('feedback', sa.Text(), nullable=True),
+    sa.Column('segments', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('track_path', sa.String(length=255), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysis_results_id'), 'analysis_results', ['id'], unique=False)
+    op.create_index('ix_analysis_results_user_created', 'analysis_results', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_results_user_created', table_name='analysis_results')
+    op.drop_index(op.f('ix_analysis_results_id'), table_name='analysis_results')
+    op.drop_table('analysis_results')
@@ -0,0 +1,28 @@
+"""Add analysis job retry columns
+
+Revision ID: c4d7a2e9f615
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-17 18:05:27.538104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d7a2e9f615'
+down_revision: Union[str, None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('analysis_jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('analysis_jobs', sa.Column('run_after', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analysis_jobs', 'run_after')
+    op.drop_column('analysis_jobs', 'attempts')
@@ -0,0 +1,26 @@
+"""Drop analysis_results.track_path
+
+Revision ID: e5a8c3f1b207
+Revises: c4d7a2e9f615
+Create Date: 2026-10-17 21:12:44.019364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8c3f1b207'
+down_revision: Union[str, None] = 'c4d7a2e9f615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_column('analysis_results', 'track_path')
+
+
+def downgrade() -> None:
+    op.add_column('analysis_results', sa.Column('track_path', sa.String(length=255), nullable=True))
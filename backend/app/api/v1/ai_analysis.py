@@ -1,36 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, WebSocket
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, WebSocket
 from fastapi.websockets import WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
+import asyncio
+import logging
 
-from ...core.database import get_async_db
-from ...core.security import get_current_active_user
+from ...core.database import get_async_db, AsyncSessionLocal
+from ...core.pose_packets import decode_packet, is_landmark_packet
+from ...core.security import get_current_active_user, get_current_admin_user
+from ...core.ai import ai_analyzer
 from ...schemas.base import DataResponse
+from ...schemas.analysis import AnalysisHistoryPage, AnalysisJobPublic, AnalysisResultPublic
 from ...services.ai_service import AIService
 from ...models.user import User
 from ...core.exceptions import BusinessException, ForbiddenException, NotFoundException, ValidationException
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/analyze", response_model=DataResponse[Dict[str, Any]])
 async def analyze_dance(
     video: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
     ai_service: AIService = Depends()
 ):
     """
     分析用户上传的舞蹈视频
     """
     try:
-        contents = await video.read()
-        result = await ai_service.analyze_dance_video(contents)
+        # 直接传递底层文件对象，按块上传，不把整个视频读入内存
+        result = await ai_service.analyze_dance_video(video.file)
+        await ai_service.record_analysis(db, user_id=current_user.id, result=result, source="upload")
         return DataResponse(data=result)
+    except BusinessException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
+@router.post("/jobs", response_model=DataResponse[AnalysisJobPublic])
+async def submit_analysis_job(
+    video: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    ai_service: AIService = Depends()
+):
+    """
+    提交后台视频分析任务，立即返回任务ID
+
+    分析完成后结果通过 WebSocket 推送（type 为 analysis_job），也可以轮询任务状态。
+    教师和管理员提交的任务优先处理。
+    """
+    job = await ai_service.submit_analysis_job(
+        db,
+        user=current_user,
+        video=video.file
+    )
+    return DataResponse(data=job)
+
+@router.get("/jobs/{job_id}", response_model=DataResponse[AnalysisJobPublic])
+async def get_analysis_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    ai_service: AIService = Depends()
+):
+    """
+    查询分析任务的状态和结果
+    """
+    job = await ai_service.get_analysis_job(db, job_id=job_id, user_id=current_user.id)
+    if job is None:
+        raise NotFoundException("分析任务不存在")
+    return DataResponse(data=job)
+
+@router.get("/metrics", response_model=DataResponse[Dict[str, Any]])
+async def get_ai_service_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    查看 AI 服务的并发限制、熔断器、请求合并和结果缓存状态（管理员）
+    """
+    return DataResponse(data=ai_analyzer.stats())
+
 @router.post("/feedback/{video_id}", response_model=DataResponse[Dict[str, Any]])
 async def get_feedback(
     video_id: int,
@@ -46,6 +100,8 @@ async def get_feedback(
         return DataResponse(data=result)
     except ValueError as e:
         raise NotFoundException(str(e))
+    except BusinessException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -68,24 +124,30 @@ async def compare_videos(
         raise ValidationException("必须提供标准视频ID或上传标准视频")
     
     try:
-        user_contents = await user_video.read()
-        
         if standard_video:
-            standard_contents = await standard_video.read()
             result = await ai_service.compare_with_standard_video(
-                user_contents,
-                standard_contents
+                user_video.file,
+                standard_video.file
             )
         else:
             result = await ai_service.compare_with_standard_by_id(
                 db,
-                user_contents,
+                user_video.file,
                 standard_video_id
             )
-        
+
+        await ai_service.record_analysis(
+            db,
+            user_id=current_user.id,
+            result=result,
+            source="compare",
+            course_id=None if standard_video else standard_video_id
+        )
         return DataResponse(data=result)
     except ValueError as e:
         raise NotFoundException(str(e))
+    except BusinessException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -154,49 +216,72 @@ async def get_ai_coach_advice(
 @router.websocket("/realtime-analysis")
 async def realtime_analysis(
     websocket: WebSocket,
+    course_id: Optional[int] = None,
     ai_service: AIService = Depends()
 ):
     """
     实时分析摄像头输入
+
+    每个连接对应一个实时会话：收到的帧只保留最新一帧进行推理，
+    评分结果按固定频率推送，而不是每帧回复一次。
+
+    二进制消息支持两种格式：编码后的图像帧（JPEG/PNG），
+    或客户端本地估计好的关键点数据包（见 pose_packets），后者直接进入评分。
     """
     await websocket.accept()
+
+    # 只在创建会话时访问数据库，连接期间不占用数据库会话
+    async with AsyncSessionLocal() as db:
+        session = await ai_service.create_realtime_session(db, course_id=course_id)
+    runner = asyncio.create_task(session.run(websocket.send_json))
     try:
         while True:
-            # 接收视频帧数据
+            # 接收视频帧或关键点数据包
             frame_data = await websocket.receive_bytes()
-            
-            # 进行AI分析
-            result = await ai_service.analyze_dance_frame(frame_data)
-            
-            # 发送分析结果
-            await websocket.send_json(result)
+            if is_landmark_packet(frame_data):
+                try:
+                    timestamps, landmarks = decode_packet(frame_data)
+                except ValueError as e:
+                    logger.warning(f"Invalid landmark packet: {e}")
+                    continue
+                # 数据包中是客户端的毫秒时间戳，滤波按客户端的实际帧间隔计算
+                session.submit_landmarks(landmarks, timestamps / 1000.0)
+            else:
+                session.submit(frame_data)
     except WebSocketDisconnect:
         pass
     except Exception as e:
+        logger.error(f"Realtime analysis error: {e}")
         await websocket.close()
+    finally:
+        session.close()
+        runner.cancel()
 
 # AI分析历史记录接口
-@router.get("/analysis-history", response_model=DataResponse[Dict[str, Any]])
+@router.get("/analysis-history", response_model=DataResponse[AnalysisHistoryPage])
 async def get_analysis_history(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_async_db),
     ai_service: AIService = Depends(),
-    skip: int = 0,
-    limit: int = 20
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
 ):
     """
     获取用户的AI分析历史记录
+
+    按时间倒序游标分页：首页不传 cursor，之后传入上一页返回的 next_cursor，
+    next_cursor 为空表示没有更多记录，total 只在首页返回。列表只包含摘要，完整结果通过详情接口获取。
     """
     history = await ai_service.get_analysis_history(
-        db, 
-        user_id=current_user.id, 
-        skip=skip, 
+        db,
+        user_id=current_user.id,
+        cursor=cursor,
         limit=limit
     )
     
     return DataResponse(data=history)
 
-@router.get("/analysis/{analysis_id}", response_model=DataResponse[Dict[str, Any]])
+@router.get("/analysis/{analysis_id}", response_model=DataResponse[AnalysisResultPublic])
 async def get_analysis_details(
     analysis_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -1,59 +1,329 @@
+import asyncio
+import importlib.util
+import io
+import json
+import logging
+import os
+import random
+import time
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO, Optional, Union
 from .config import settings
+from .result_cache import ResultCache, content_key, file_key, path_key
+from .single_flight import SingleFlight
+from .load_control import AdaptiveLimiter, CircuitBreaker
+from .keyframes import pool_estimator, sample_keyframes
+from .pose_inference import pose_inference_pool
+
+logger = logging.getLogger(__name__)
+
+# 这些状态码通常是推理服务临时过载或重启，值得重试
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+def _detach(video: Union[bytes, BinaryIO]) -> Union[bytes, BinaryIO]:
+    """
+    让合并后的共享调用拥有自己的视频句柄
+
+    共享调用可能比发起它的请求活得更久：该请求断开时 FastAPI 会关闭 UploadFile，
+    其余等待者的调用就会读到已关闭的文件。复制文件描述符后，原文件被关闭也不影响这里读取，
+    临时文件在最后一个描述符关闭后才释放。没有描述符的内存文件直接读出内容。
+    """
+    if isinstance(video, (bytes, bytearray, memoryview)):
+        return video
+    try:
+        # SpooledTemporaryFile 在这里会先写入磁盘
+        fd = video.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        video.seek(0)
+        return video.read()
+    owned = os.fdopen(os.dup(fd), "rb")
+    owned.seek(0)
+    return owned
+
+
+def _close(video: Union[bytes, BinaryIO]):
+    if hasattr(video, "close"):
+        video.close()
+
 
 class AIAnalyzer:
     def __init__(self):
         self.api_url = settings.MINICPM_V_API_URL
         self.api_key = settings.MINICPM_V_API_KEY
+        # Content-Type 由 httpx 按 json / files 参数自动设置，上传文件时必须是 multipart
         self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {self.api_key}"
         }
+        self.model_version = settings.MINICPM_V_MODEL_VERSION
+        self.keyframes = settings.MINICPM_V_KEYFRAMES
+        # 只发送关键帧时模型看到的输入不同，结果与整段视频分开缓存
+        self.analysis_version = (
+            f"{self.model_version}+keyframes{self.keyframes}" if self.keyframes > 0 else self.model_version
+        )
+        self.max_retries = settings.MINICPM_V_MAX_RETRIES
+        self.retry_backoff = settings.MINICPM_V_RETRY_BACKOFF
+        self.retry_budget = settings.MINICPM_V_RETRY_BUDGET
+        self.cache = ResultCache(
+            settings.ANALYSIS_CACHE_DIR,
+            settings.ANALYSIS_CACHE_MAX_BYTES,
+            memory_items=settings.ANALYSIS_CACHE_MEMORY_ITEMS
+        )
+        # 同一视频的并发分析只向服务发送一次请求
+        self.flights = SingleFlight()
+        # 推理服务变慢时限制并发并快速失败，避免请求堆积拖慢其他接口
+        self.limiter = AdaptiveLimiter(
+            initial=settings.MINICPM_V_CONCURRENCY,
+            min_limit=settings.MINICPM_V_MIN_CONCURRENCY,
+            max_limit=settings.MINICPM_V_MAX_CONCURRENCY,
+            latency_target=settings.MINICPM_V_LATENCY_TARGET,
+            queue_timeout=settings.MINICPM_V_QUEUE_TIMEOUT
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.MINICPM_V_BREAKER_FAILURES,
+            recovery_time=settings.MINICPM_V_BREAKER_RECOVERY
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        http2 = settings.MINICPM_V_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("h2 is not installed, falling back to HTTP/1.1 for the AI service")
+            http2 = False
+        return httpx.AsyncClient(
+            base_url=self.api_url,
+            headers=self.headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.MINICPM_V_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MINICPM_V_MAX_KEEPALIVE,
+                keepalive_expiry=settings.MINICPM_V_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                settings.MINICPM_V_READ_TIMEOUT,
+                connect=settings.MINICPM_V_CONNECT_TIMEOUT
+            )
+        )
+
+    async def start(self):
+        """创建共享的 HTTP 客户端，由应用生命周期调用"""
+        if self._client is None:
+            self._client = self._create_client()
+
+    async def close(self):
+        """关闭 HTTP 客户端及其连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 脚本等不经过应用生命周期的场景下按需创建
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    async def _post(self, path: str, **kwargs) -> Dict[str, Any]:
+        """
+        发送请求，连接失败、超时和 502/503/504 时按指数退避加随机抖动重试
+
+        每次尝试都要经过熔断器和并发限制，服务不可用或排队超时时
+        抛出 ServiceUnavailableException，不再等待；超过总时间预算后不再重试。
+
+        Args:
+            path: 相对于服务地址的路径
+            **kwargs: 传给 httpx 的请求参数
+
+        Returns:
+            响应 JSON
+        """
+        deadline = time.monotonic() + self.retry_budget
+        attempt = 0
+        while True:
+            # 全抖动：等待时间在 [0, backoff * 2^attempt] 内随机，避免大量请求同时重试
+            delay = random.uniform(0, self.retry_backoff * (2 ** attempt))
+            give_up = attempt >= self.max_retries or time.monotonic() + delay > deadline
+            try:
+                response = await self._attempt(path, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or give_up:
+                    response.raise_for_status()
+                    return response.json()
+                logger.warning(f"AI service {path} returned {response.status_code}, retrying")
+            except httpx.TransportError as e:
+                if give_up:
+                    raise
+                logger.warning(f"AI service {path} request failed: {e}, retrying")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt(self, path: str, **kwargs) -> httpx.Response:
+        """发送一次请求，并把耗时和结果反馈给熔断器和并发限制"""
+        self.breaker.check()
+        await self.limiter.acquire()
+        # 排队期间熔断器可能已经打开，拿到名额后再检查一次
+        try:
+            self.breaker.before_call()
+        except BaseException:
+            self.limiter.release_unused()
+            raise
+
+        started = time.monotonic()
+        try:
+            response = await self.client.post(path, **kwargs)
+        except httpx.TransportError:
+            self.limiter.release(time.monotonic() - started, overloaded=True)
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            self.limiter.release_unused()
+            self.breaker.cancel()
+            raise
+
+        # 只有 502/503/504 表示服务过载需要收紧并发；任何 5xx 都说明服务端出错，计入熔断
+        self.limiter.release(time.monotonic() - started, response.status_code in RETRY_STATUS_CODES)
+        self.breaker.record(response.status_code < 500)
+        return response
 
-    async def analyze_dance_video(self, video_data: bytes) -> Dict[str, Any]:
-        """分析舞蹈视频并返回评分和建议"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/analyze",
-                    headers=self.headers,
-                    files={"video": video_data}
-                )
-                response.raise_for_status()
-                return response.json()
+    def stats(self) -> Dict[str, Any]:
+        """返回并发限制、熔断器、请求合并和结果缓存的状态"""
+        return {
+            "limiter": self.limiter.stats(),
+            "breaker": self.breaker.stats(),
+            "single_flight": self.flights.stats(),
+            "cache": self.cache.stats(),
+        }
+
+    async def analyze_dance_video(self, video: Union[bytes, BinaryIO]) -> Dict[str, Any]:
+        """
+        分析舞蹈视频并返回评分和建议，同一视频和模型版本的结果直接从缓存返回
+
+        Args:
+            video: 视频内容，或支持 seek 的文件对象；文件对象按块上传，不会整体读入内存
+
+        Returns:
+            分析结果
+        """
+        cache_key = await self._content_key(video, self.analysis_version)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # _detach 在发起调用的请求中同步执行，共享任务只读取自己持有的句柄
+        return await self.flights.do(cache_key, lambda: self._analyze_owned(_detach(video), cache_key))
+
+    async def _content_key(self, video: Union[bytes, BinaryIO], version: Optional[str] = None) -> str:
+        """
+        计算上传内容的缓存键
+
+        文件对象需要在上传前单独读一遍：缓存查询和请求合并都以这个键为准，必须在发出请求之前得到；
+        关键帧模式上传的是帧条而不是视频本身，也无法在上传时顺带计算。
+        按路径打开的磁盘文件（课程标准视频）按修改时间缓存键，只在第一次读取。
+        """
+        version = version or self.model_version
+        if isinstance(video, (bytes, bytearray, memoryview)):
+            return content_key(video, version)
+        name = getattr(video, "name", None)
+        if isinstance(name, str) and os.path.isfile(name):
+            return await asyncio.to_thread(path_key, name, version)
+        return await asyncio.to_thread(file_key, video, version)
+
+    async def _sample_keyframes(self, video: Union[bytes, BinaryIO]) -> Optional[Dict[str, Any]]:
+        """
+        在本地选出关键帧，返回帧条和关键点摘要组成的请求参数
+
+        姿态推理进程池未启动或视频无法解码时返回 None，由调用方改为上传整段视频。
+        """
+        if self.keyframes <= 0 or not pose_inference_pool.started:
+            return None
+        if isinstance(video, (bytes, bytearray, memoryview)):
+            video = io.BytesIO(video)
+        try:
+            sample = await sample_keyframes(
+                video,
+                pool_estimator(pose_inference_pool, settings.MINICPM_V_KEYFRAME_CONCURRENCY),
+                count=self.keyframes,
+                sample_fps=settings.MINICPM_V_KEYFRAME_FPS,
+                max_samples=settings.MINICPM_V_KEYFRAME_MAX_SAMPLES,
+                concurrency=settings.MINICPM_V_KEYFRAME_CONCURRENCY
+            )
+        except Exception as e:
+            logger.warning(f"Keyframe sampling failed, sending the whole video: {e!r}")
+            return None
+        if sample is None:
+            return None
+        strip, summary = sample
+        return {
+            "files": {"frames": ("keyframes.jpg", strip, "image/jpeg")},
+            "data": {"summary": json.dumps(summary, ensure_ascii=False)},
+        }
+
+    async def _analyze_owned(self, video: Union[bytes, BinaryIO], cache_key: str) -> Dict[str, Any]:
+        try:
+            return await self._analyze(video, cache_key)
+        finally:
+            _close(video)
+
+    async def _analyze(self, video: Union[bytes, BinaryIO], cache_key: str) -> Dict[str, Any]:
+        request = await self._sample_keyframes(video)
+        if request is None:
+            request = {"files": {"video": video}}
+        try:
+            result = await self._post("/analyze", **request)
         except httpx.HTTPError as e:
             raise Exception(f"AI分析服务请求失败: {str(e)}")
 
+        await self.cache.set(cache_key, result)
+        return result
+
     async def get_dance_feedback(self, video_url: str) -> Dict[str, Any]:
         """获取舞蹈反馈"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/feedback",
-                    headers=self.headers,
-                    json={"video_url": video_url}
-                )
-                response.raise_for_status()
-                return response.json()
+            return await self._post("/feedback", json={"video_url": video_url})
         except httpx.HTTPError as e:
             raise Exception(f"获取反馈失败: {str(e)}")
 
-    async def compare_with_standard(self, user_video: bytes, standard_video: bytes) -> Dict[str, Any]:
-        """将用户视频与标准动作进行对比"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/compare",
-                    headers=self.headers,
-                    files={
-                        "user_video": user_video,
-                        "standard_video": standard_video
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
+    async def compare_with_standard(
+        self,
+        user_video: Union[bytes, BinaryIO],
+        standard_video: Union[bytes, BinaryIO]
+    ) -> Dict[str, Any]:
+        """
+        将用户视频与标准动作进行对比，文件对象按块上传
+
+        同一对视频的并发对比（例如全班同时提交同一段示范）只发送一次请求。
+        """
+        user_key = await self._content_key(user_video)
+        standard_key = await self._content_key(standard_video)
+        flight_key = content_key(f"compare:{user_key}:{standard_key}".encode("utf-8"), self.model_version)
+        return await self.flights.do(
+            flight_key,
+            lambda: self._compare_owned(_detach(user_video), _detach(standard_video))
+        )
+
+    async def _compare_owned(
+        self,
+        user_video: Union[bytes, BinaryIO],
+        standard_video: Union[bytes, BinaryIO]
+    ) -> Dict[str, Any]:
+        try:
+            return await self._compare(user_video, standard_video)
+        finally:
+            _close(user_video)
+            _close(standard_video)
+
+    async def _compare(
+        self,
+        user_video: Union[bytes, BinaryIO],
+        standard_video: Union[bytes, BinaryIO]
+    ) -> Dict[str, Any]:
+        try:
+            return await self._post(
+                "/compare",
+                files={
+                    "user_video": user_video,
+                    "standard_video": standard_video
+                }
+            )
         except httpx.HTTPError as e:
             raise Exception(f"视频对比失败: {str(e)}")
 
-ai_analyzer = AIAnalyzer() 
\ No newline at end of file
+ai_analyzer = AIAnalyzer()
@@ -0,0 +1,296 @@
+"""
+视频分析任务队列
+
+上传的视频先保存到本地并在 analysis_jobs 表中登记，接口立即返回任务ID；
+固定数量的后台协程按优先级从表中领取任务调用 AI 服务，结果写回数据库，
+并通过 WebSocket 连接管理器推送给提交任务的用户，离线用户可以轮询任务状态。
+任务表就是队列本身，服务重启后未完成的任务会重新排队。
+"""
+import asyncio
+import logging
+import os
+import random
+import shutil
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from .ai import ai_analyzer
+from .config import settings
+from .database import AsyncSessionLocal
+from .exceptions import BusinessException, ServiceUnavailableException
+from .websocket import manager
+from ..models.analysis import AnalysisJob, AnalysisJobStatus
+from ..repositories import analysis_job_repository, analysis_result_repository
+from ..schemas.analysis import AnalysisJobCreate, AnalysisJobPublic, AnalysisResultCreate
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_NORMAL = 0
+# 直播课堂的学员在等结果，优先处理
+PRIORITY_LIVE = 10
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _save_upload(file: BinaryIO, path: str):
+    """把上传文件分块复制到任务目录"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file, f, COPY_CHUNK_SIZE)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class AnalysisJobQueue:
+    """
+    以数据库表为存储的分析任务队列
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.ANALYSIS_JOB_WORKERS,
+        user_concurrency: int = settings.ANALYSIS_JOB_USER_CONCURRENCY,
+        max_pending: int = settings.ANALYSIS_JOB_MAX_PENDING,
+        poll_interval: float = settings.ANALYSIS_JOB_POLL_INTERVAL,
+        max_retries: int = settings.ANALYSIS_JOB_MAX_RETRIES,
+        retry_backoff: float = settings.ANALYSIS_JOB_RETRY_BACKOFF
+    ):
+        """
+        初始化任务队列
+
+        Args:
+            workers: 同时处理的任务数
+            user_concurrency: 同一用户同时处理的任务数上限
+            max_pending: 同一用户未完成任务数上限，超过后拒绝提交
+            poll_interval: 空闲时检查新任务的间隔（秒），用于发现其他进程提交的任务和到期的重试任务
+            max_retries: AI 服务暂时不可用时任务重新排队的最大次数
+            retry_backoff: 第一次重新排队的等待时间（秒），之后每次加倍
+        """
+        self.workers = workers
+        self.user_concurrency = user_concurrency
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.job_dir = os.path.join(settings.UPLOAD_DIR, "jobs")
+        self._running_users: Counter = Counter()
+        self._claim_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """恢复中断的任务并启动后台处理协程"""
+        if self._tasks:
+            return
+        async with AsyncSessionLocal() as db:
+            requeued = await analysis_job_repository.requeue_running(db)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted analysis jobs")
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"analysis-job-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Analysis job queue started with {self.workers} workers")
+
+    async def stop(self):
+        """停止后台处理协程，处理中的任务下次启动时重新排队"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self,
+        db,
+        *,
+        user_id: int,
+        video: BinaryIO,
+        priority: int = PRIORITY_NORMAL
+    ) -> AnalysisJob:
+        """
+        提交分析任务
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            video: 上传的视频文件对象
+            priority: 优先级，数值越大越先处理
+
+        Returns:
+            新建的任务
+        """
+        if await analysis_job_repository.count_unfinished(db, user_id=user_id) >= self.max_pending:
+            raise BusinessException("待处理的分析任务过多，请等待已提交的任务完成", code=429)
+
+        path = os.path.join(self.job_dir, f"{uuid.uuid4().hex}.video")
+        await asyncio.to_thread(_save_upload, video, path)
+        try:
+            job = await analysis_job_repository.create(
+                db,
+                obj_in=AnalysisJobCreate(user_id=user_id, priority=priority, video_path=path)
+            )
+        except Exception:
+            _remove(path)
+            raise
+        self._wakeup.set()
+        return job
+
+    async def _claim(self) -> Optional[AnalysisJob]:
+        # 串行领取，保证每个用户的并发计数准确
+        async with self._claim_lock:
+            busy = [
+                user_id for user_id, count in self._running_users.items()
+                if count >= self.user_concurrency
+            ]
+            async with AsyncSessionLocal() as db:
+                job = await analysis_job_repository.claim_next(db, exclude_user_ids=busy)
+            if job is not None:
+                self._running_users[job.user_id] += 1
+            return job
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim analysis job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self._run(job)
+            finally:
+                self._running_users[job.user_id] -= 1
+                if self._running_users[job.user_id] <= 0:
+                    del self._running_users[job.user_id]
+                # 该用户的下一个任务现在可以领取了
+                self._wakeup.set()
+
+    async def _run(self, job: AnalysisJob):
+        """处理一个任务；任何异常都只让这个任务失败，不会结束处理协程"""
+        job_id, video_path = job.id, job.video_path
+        try:
+            if await self._process(job):
+                # 已重新排队，保留视频等待下次处理
+                return
+        except asyncio.CancelledError:
+            # 服务停止，任务保持处理中，下次启动时重新排队
+            raise
+        except Exception as e:
+            logger.exception(f"Analysis job {job_id} crashed")
+            await self._mark_failed(job_id, str(e))
+        _remove(video_path)
+
+    async def _process(self, job: AnalysisJob) -> bool:
+        """
+        调用 AI 服务并保存结果
+
+        Returns:
+            任务是否因 AI 服务暂时不可用而重新排队
+        """
+        result, error = None, None
+        try:
+            with open(job.video_path, "rb") as video:
+                result = await ai_analyzer.analyze_dance_video(video)
+        except asyncio.CancelledError:
+            raise
+        except ServiceUnavailableException as e:
+            # 熔断或排队超时是暂时的，等服务恢复后再试，而不是让任务失败
+            if job.attempts < self.max_retries:
+                await self._retry_later(job)
+                return True
+            logger.error(f"Analysis job {job.id} failed after {job.attempts} retries: {e}")
+            error = str(e)[:500]
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} failed: {e}")
+            error = str(e)[:500]
+
+        async with AsyncSessionLocal() as db:
+            job = await analysis_job_repository.get(db, job.id)
+            job = await analysis_job_repository.update(
+                db,
+                db_obj=job,
+                obj_in={
+                    "status": AnalysisJobStatus.FAILED if error else AnalysisJobStatus.SUCCEEDED,
+                    "result": result,
+                    "error": error,
+                    "finished_at": datetime.now(timezone.utc)
+                }
+            )
+        if result is not None:
+            await self._record_history(job.id, job.user_id, result)
+        await self._notify(job)
+        return False
+
+    async def _record_history(self, job_id: int, user_id: int, result: Dict[str, Any]):
+        # 历史记录只是附带保存，失败不影响任务结果
+        try:
+            async with AsyncSessionLocal() as db:
+                await analysis_result_repository.create(
+                    db,
+                    obj_in=AnalysisResultCreate.from_ai_result(result, user_id=user_id, source="job")
+                )
+        except Exception as e:
+            logger.error(f"Failed to record analysis history for job {job_id}: {e!r}")
+
+    async def _retry_later(self, job: AnalysisJob):
+        # 指数退避并加抖动，服务恢复时重新排队的任务不会同时涌入
+        delay = self.retry_backoff * (2 ** job.attempts) * random.uniform(1.0, 1.5)
+        async with AsyncSessionLocal() as db:
+            record = await analysis_job_repository.get(db, job.id)
+            await analysis_job_repository.update(
+                db,
+                db_obj=record,
+                obj_in={
+                    "status": AnalysisJobStatus.PENDING,
+                    "started_at": None,
+                    "attempts": job.attempts + 1,
+                    "run_after": datetime.now(timezone.utc) + timedelta(seconds=delay)
+                }
+            )
+        logger.warning(f"AI service unavailable, analysis job {job.id} requeued in {delay:.0f}s")
+
+    async def _mark_failed(self, job_id: int, error: str):
+        """在新的数据库会话中把任务标记为失败，原会话可能已处于错误状态"""
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await analysis_job_repository.get(db, job_id)
+                job = await analysis_job_repository.update(
+                    db,
+                    db_obj=job,
+                    obj_in={
+                        "status": AnalysisJobStatus.FAILED,
+                        "error": error[:500],
+                        "finished_at": datetime.now(timezone.utc)
+                    }
+                )
+        except Exception as e:
+            # 数据库也不可用时任务保持处理中，下次启动时重新排队
+            logger.error(f"Failed to mark analysis job {job_id} as failed: {e!r}")
+            return
+        await self._notify(job)
+
+    async def _notify(self, job: AnalysisJob):
+        await manager.send_personal_message({
+            "type": "analysis_job",
+            "data": AnalysisJobPublic.model_validate(job).model_dump(mode="json")
+        }, job.user_id)
+
+
+# 全局分析任务队列实例
+analysis_job_queue = AnalysisJobQueue()
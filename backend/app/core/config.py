@@ -29,6 +29,50 @@ class Settings(BaseSettings):
     # AI服务配置
     MINICPM_V_API_URL: str = os.getenv("MINICPM_V_API_URL", "http://localhost:9000/v1")
     MINICPM_V_API_KEY: str = os.getenv("MINICPM_V_API_KEY", "dummy_key_for_development")
+    MINICPM_V_MODEL_VERSION: str = os.getenv("MINICPM_V_MODEL_VERSION", "minicpm-v-2.6")
+    MINICPM_V_KEYFRAMES: int = int(os.getenv("MINICPM_V_KEYFRAMES", "16"))  # 0 表示上传整段视频
+    MINICPM_V_KEYFRAME_FPS: float = float(os.getenv("MINICPM_V_KEYFRAME_FPS", "5"))
+    MINICPM_V_KEYFRAME_MAX_SAMPLES: int = int(os.getenv("MINICPM_V_KEYFRAME_MAX_SAMPLES", "300"))  # 长视频自动降低采样帧率
+    MINICPM_V_KEYFRAME_CONCURRENCY: int = int(os.getenv("MINICPM_V_KEYFRAME_CONCURRENCY", "2"))
+    MINICPM_V_MAX_CONNECTIONS: int = int(os.getenv("MINICPM_V_MAX_CONNECTIONS", "20"))
+    MINICPM_V_MAX_KEEPALIVE: int = int(os.getenv("MINICPM_V_MAX_KEEPALIVE", "10"))
+    MINICPM_V_KEEPALIVE_EXPIRY: float = float(os.getenv("MINICPM_V_KEEPALIVE_EXPIRY", "30"))
+    MINICPM_V_HTTP2: bool = os.getenv("MINICPM_V_HTTP2", "true").lower() == "true"
+    MINICPM_V_CONNECT_TIMEOUT: float = float(os.getenv("MINICPM_V_CONNECT_TIMEOUT", "5"))
+    MINICPM_V_READ_TIMEOUT: float = float(os.getenv("MINICPM_V_READ_TIMEOUT", "120"))  # 视频推理耗时较长
+    MINICPM_V_MAX_RETRIES: int = int(os.getenv("MINICPM_V_MAX_RETRIES", "2"))
+    MINICPM_V_RETRY_BACKOFF: float = float(os.getenv("MINICPM_V_RETRY_BACKOFF", "0.5"))
+    MINICPM_V_RETRY_BUDGET: float = float(os.getenv("MINICPM_V_RETRY_BUDGET", "180"))  # 含重试的总时间预算
+    MINICPM_V_CONCURRENCY: int = int(os.getenv("MINICPM_V_CONCURRENCY", "8"))
+    MINICPM_V_MIN_CONCURRENCY: int = int(os.getenv("MINICPM_V_MIN_CONCURRENCY", "1"))
+    MINICPM_V_MAX_CONCURRENCY: int = int(os.getenv("MINICPM_V_MAX_CONCURRENCY", "32"))
+    MINICPM_V_LATENCY_TARGET: float = float(os.getenv("MINICPM_V_LATENCY_TARGET", "60"))
+    MINICPM_V_QUEUE_TIMEOUT: float = float(os.getenv("MINICPM_V_QUEUE_TIMEOUT", "10"))
+    MINICPM_V_BREAKER_FAILURES: int = int(os.getenv("MINICPM_V_BREAKER_FAILURES", "5"))
+    MINICPM_V_BREAKER_RECOVERY: float = float(os.getenv("MINICPM_V_BREAKER_RECOVERY", "30"))
+
+    # AI分析结果缓存
+    ANALYSIS_CACHE_DIR: str = os.getenv("ANALYSIS_CACHE_DIR", os.path.join(UPLOAD_DIR, "cache", "analysis"))
+    ANALYSIS_CACHE_MAX_BYTES: int = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", "268435456"))  # 256MB
+    ANALYSIS_CACHE_MEMORY_ITEMS: int = int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", "128"))
+
+    # AI分析任务队列
+    ANALYSIS_JOB_WORKERS: int = int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+    ANALYSIS_JOB_USER_CONCURRENCY: int = int(os.getenv("ANALYSIS_JOB_USER_CONCURRENCY", "1"))
+    ANALYSIS_JOB_MAX_PENDING: int = int(os.getenv("ANALYSIS_JOB_MAX_PENDING", "5"))
+    ANALYSIS_JOB_POLL_INTERVAL: float = float(os.getenv("ANALYSIS_JOB_POLL_INTERVAL", "5"))
+    # AI 服务熔断或繁忙时任务重新排队的次数和首次等待时间（秒），之后每次加倍
+    ANALYSIS_JOB_MAX_RETRIES: int = int(os.getenv("ANALYSIS_JOB_MAX_RETRIES", "5"))
+    ANALYSIS_JOB_RETRY_BACKOFF: float = float(os.getenv("ANALYSIS_JOB_RETRY_BACKOFF", "30"))
+
+    # 姿态推理配置
+    POSE_WORKERS: int = int(os.getenv("POSE_WORKERS", "2"))
+    POSE_SLOT_SIZE: int = int(os.getenv("POSE_SLOT_SIZE", "2097152"))  # 单帧上限 2MB
+    POSE_FILTER: str = os.getenv("POSE_FILTER", "one_euro")  # none / one_euro / kalman
+    # 视频比对时在本地提取关键点轨迹的采样帧率、帧数上限和并发推理帧数
+    POSE_COMPARE_FPS: float = float(os.getenv("POSE_COMPARE_FPS", "10"))
+    POSE_COMPARE_MAX_FRAMES: int = int(os.getenv("POSE_COMPARE_MAX_FRAMES", "1200"))
+    POSE_COMPARE_CONCURRENCY: int = int(os.getenv("POSE_COMPARE_CONCURRENCY", "2"))
 
     class Config:
         case_sensitive = True
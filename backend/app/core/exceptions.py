@@ -42,6 +42,12 @@ class ForbiddenException(BusinessException):
         super().__init__(message, code=403)
 
 
+class ServiceUnavailableException(BusinessException):
+    """依赖服务过载或不可用异常"""
+    def __init__(self, message: str = "服务暂时不可用", detail: str = None):
+        super().__init__(message, code=503, detail=detail)
+
+
 # 异常处理器
 async def business_exception_handler(request: Request, exc: BusinessException) -> JSONResponse:
     """业务异常处理器"""
@@ -0,0 +1,157 @@
+"""
+跨进程的共享内存帧环
+
+所有帧槽位在启动时一次性分配在一块共享内存里，采集、推理、渲染进程直接在槽位上
+读写图像，进程之间只通过队列传递槽位编号，不再序列化整帧图像。
+每个槽位同时附带关键点和时间戳区域，推理结果也原地写回，渲染时无需额外传输。
+
+槽位的流转：空闲 -> 采集写入 -> 推理 -> 渲染 -> 归还空闲。
+下游处理不过来时，take_latest 只取最新的槽位并把更旧的直接归还，不会积压旧帧。
+"""
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .pose_track import CHANNELS, NUM_LANDMARKS
+
+# 上游结束时放入队列的标记
+END = -1
+
+# 每个槽位附带的时间字段
+CAPTURED_AT = 0
+CAPTURE_SECONDS = 1
+INFERENCE_SECONDS = 2
+TIMING_FIELDS = 3
+
+# 丢帧计数，按阶段区分
+STAGES = ("capture", "inference", "render")
+
+
+class FrameRing:
+    """
+    预分配的共享内存帧槽位
+
+    在主进程中创建后可以直接作为参数传给子进程，子进程中会按名称重新映射同一块内存。
+    """
+
+    def __init__(self, shape: Tuple[int, int, int], slots: int, free_queue, name: Optional[str] = None):
+        """
+        创建或映射帧环
+
+        Args:
+            shape: 单帧图像形状 (高, 宽, 通道)
+            slots: 槽位数量
+            free_queue: 存放空闲槽位编号的进程间队列
+            name: 已有共享内存的名称，为空时新建并把所有槽位放入空闲队列
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.free_queue = free_queue
+
+        frame_bytes = int(np.prod(self.shape))
+        landmark_bytes = NUM_LANDMARKS * CHANNELS * 4
+        timing_bytes = TIMING_FIELDS * 8
+        size = slots * (frame_bytes + landmark_bytes + timing_bytes) + len(STAGES) * 8
+
+        self._owner = name is None
+        self._shm = SharedMemory(name=name, create=self._owner, size=size if self._owner else 0)
+        buf = self._shm.buf
+        offset = 0
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=offset)
+        offset += slots * frame_bytes
+        self.landmarks = np.ndarray(
+            (slots, NUM_LANDMARKS, CHANNELS), dtype=np.float32, buffer=buf, offset=offset
+        )
+        offset += slots * landmark_bytes
+        self.timings = np.ndarray((slots, TIMING_FIELDS), dtype=np.float64, buffer=buf, offset=offset)
+        offset += slots * timing_bytes
+        self._dropped = np.ndarray((len(STAGES),), dtype=np.int64, buffer=buf, offset=offset)
+
+        if self._owner:
+            self._dropped[:] = 0
+            for slot in range(slots):
+                free_queue.put(slot)
+
+    def __getstate__(self):
+        # 子进程只需要名称和布局即可重新映射
+        return {
+            "shape": self.shape,
+            "slots": self.slots,
+            "free_queue": self.free_queue,
+            "name": self._shm.name,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["shape"], state["slots"], state["free_queue"], name=state["name"])
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def frame(self, slot: int) -> np.ndarray:
+        """返回槽位中图像的视图"""
+        return self.frames[slot]
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        取一个空闲槽位
+
+        Args:
+            timeout: 等待时间（秒），0 表示不等待
+
+        Returns:
+            槽位编号，没有空闲槽位时返回 None
+        """
+        try:
+            if timeout == 0:
+                return self.free_queue.get_nowait()
+            return self.free_queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def release(self, slot: int):
+        """归还槽位"""
+        self.free_queue.put(slot)
+
+    def drop(self, stage: str, count: int = 1):
+        """记录某个阶段丢弃的帧数，每个阶段只由一个进程写入"""
+        self._dropped[STAGES.index(stage)] += count
+
+    def dropped(self):
+        """返回各阶段累计丢帧数"""
+        return {stage: int(count) for stage, count in zip(STAGES, self._dropped)}
+
+    def take_latest(self, queue, stage: str, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        从阶段队列中取出最新的槽位，更旧的槽位直接归还并计入该阶段的丢帧数
+
+        Args:
+            queue: 上游阶段的输出队列
+            stage: 当前阶段名称
+            timeout: 队列为空时的等待时间（秒）
+
+        Returns:
+            槽位编号；超时返回 None；上游已结束返回 END
+        """
+        try:
+            slot = queue.get(timeout=timeout)
+        except Empty:
+            return None
+        while slot != END:
+            try:
+                newer = queue.get_nowait()
+            except Empty:
+                break
+            self.release(slot)
+            self.drop(stage)
+            slot = newer
+        return slot
+
+    def close(self):
+        """解除映射，创建者同时释放共享内存"""
+        self.frames = self.landmarks = self.timings = self._dropped = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,186 @@
+"""
+健康指标趋势计算
+
+输入是从数据库按列取出的记录时间和指标值：(记录数,) 时间戳和 (记录数, 指标数) 数值矩阵，
+缺失值为 NaN。所有指标一次完成最小二乘斜率、滑动平均、波动和异常值标记，
+不按记录或按指标做 Python 循环，几年的记录也只需几毫秒。
+"""
+import warnings
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 参与趋势分析的指标，顺序与数值矩阵的列一致
+METRICS: Tuple[str, ...] = ("weight", "bmi", "heart_rate", "blood_sugar")
+
+SECONDS_PER_DAY = 86400.0
+DEFAULT_WINDOW_DAYS = 7.0
+# 稳健 z 分数超过该值视为异常读数（Iglewicz-Hoaglin 推荐值）
+DEFAULT_OUTLIER_THRESHOLD = 3.5
+# 拟合变化幅度低于该百分比视为平稳
+STABLE_PERCENT = 1.0
+
+
+def to_columns(rows: Sequence[Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把查询结果转成列数组
+
+    Args:
+        rows: (recorded_at, 各指标...) 的行，按记录时间升序
+
+    Returns:
+        (记录数,) 以天为单位的时间，和 (记录数, 指标数) 数值矩阵；
+        空值和 0 都视为未填写，记为 NaN
+    """
+    if not rows:
+        return np.empty(0, dtype=np.float64), np.empty((0, len(METRICS)), dtype=np.float64)
+    times = np.fromiter((row[0].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    values[values == 0] = np.nan
+    return times / SECONDS_PER_DAY, values
+
+
+def rolling_mean(times: np.ndarray, values: np.ndarray, window_days: float = DEFAULT_WINDOW_DAYS) -> np.ndarray:
+    """
+    按时间窗口计算滑动平均
+
+    记录间隔不固定，窗口按时间而不是按条数划分：每条记录取其之前 window_days 天内
+    （含自身）的有效读数的平均值，用前缀和一次算出。
+
+    Args:
+        times: (记录数,) 升序时间（天）
+        values: (记录数, 指标数) 数值矩阵
+        window_days: 窗口长度（天）
+
+    Returns:
+        与 values 同形的滑动平均，窗口内没有有效读数时为 NaN
+    """
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    start = np.searchsorted(times, times - window_days, side="left")
+    end = np.arange(1, len(times) + 1)
+    window_counts = counts[end] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, (sums[end] - sums[start]) / window_counts, np.nan)
+
+
+def compute_trends(
+    times: np.ndarray,
+    values: np.ndarray,
+    window_days: float = DEFAULT_WINDOW_DAYS,
+    outlier_threshold: float = DEFAULT_OUTLIER_THRESHOLD
+) -> Dict[str, np.ndarray]:
+    """
+    计算所有指标的趋势统计
+
+    Args:
+        times: (记录数,) 升序时间（天），至少一条记录
+        values: (记录数, 指标数) 数值矩阵，缺失值为 NaN
+        window_days: 滑动平均窗口（天）
+        outlier_threshold: 异常值的稳健 z 分数阈值
+
+    Returns:
+        各统计量的 (指标数,) 数组，以及 (记录数, 指标数) 的 outlier_mask
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    safe_count = np.maximum(count, 1)
+    filled = np.where(valid, values, 0.0)
+
+    # 时间相对第一条记录，避免大数相减损失精度
+    t = (times - times[0])[:, None]
+    t_mean = (t * valid).sum(axis=0) / safe_count
+    mean = filled.sum(axis=0) / safe_count
+    dt = np.where(valid, t - t_mean, 0.0)
+    dy = np.where(valid, values - mean, 0.0)
+    sxx = (dt * dt).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(sxx > 0, (dt * dy).sum(axis=0) / sxx, 0.0)
+    intercept = mean - slope * t_mean
+
+    # 各指标第一个和最后一个有效读数的位置
+    first_index = valid.argmax(axis=0)
+    last_index = len(values) - 1 - valid[::-1].argmax(axis=0)
+    columns = np.arange(values.shape[1])
+    first_t = t[first_index, 0]
+    last_t = t[last_index, 0]
+
+    # 用拟合直线在首末读数处的差值表示变化，不受单次读数波动影响
+    fitted_first = intercept + slope * first_t
+    change = slope * (last_t - first_t)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change_percent = np.where(fitted_first != 0, change / fitted_first * 100, 0.0)
+
+    std = np.sqrt((dy * dy).sum(axis=0) / safe_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cv = np.where(mean != 0, std / mean, 0.0)
+
+    # 异常值按去趋势后的残差判断，持续上升或下降的读数不会被误标
+    residual = values - (intercept + slope * t)
+    with warnings.catch_warnings():
+        # 整列缺失时 nanmedian 返回 NaN 并告警，这样的列不会有异常值
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(residual, axis=0)
+        mad = np.nanmedian(np.abs(residual - median), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        robust_z = np.where(mad > 0, 0.6745 * (residual - median) / mad, 0.0)
+    outlier_mask = valid & (np.abs(robust_z) > outlier_threshold)
+
+    rolling = rolling_mean(times, values, window_days)
+    return {
+        "count": count,
+        "first_value": values[first_index, columns],
+        "last_value": values[last_index, columns],
+        "change": change,
+        "change_percent": change_percent,
+        "slope_per_day": slope,
+        "mean": mean,
+        "std": std,
+        "cv": cv,
+        "rolling_mean": rolling[last_index, columns],
+        "outliers": outlier_mask.sum(axis=0),
+        "outlier_mask": outlier_mask,
+    }
+
+
+def _classify(change_percent: float) -> str:
+    if abs(change_percent) < STABLE_PERCENT:
+        return "stable"
+    return "increasing" if change_percent > 0 else "decreasing"
+
+
+def summarize(stats: Dict[str, np.ndarray], metrics: Sequence[str] = METRICS) -> Dict[str, Optional[Dict]]:
+    """
+    把统计数组整理成每个指标一个字典，有效读数少于两条的指标为 None
+
+    Args:
+        stats: compute_trends 的结果
+        metrics: 指标名称，与数值矩阵的列一致
+
+    Returns:
+        指标名 -> 趋势字典
+    """
+    summary: Dict[str, Optional[Dict]] = {}
+    for i, name in enumerate(metrics):
+        if stats["count"][i] < 2:
+            summary[name] = None
+            continue
+        change_percent = float(stats["change_percent"][i])
+        summary[name] = {
+            "trend": _classify(change_percent),
+            "change": round(float(stats["change"][i]), 2),
+            "change_percent": round(change_percent, 2),
+            "first_value": float(stats["first_value"][i]),
+            "last_value": float(stats["last_value"][i]),
+            "slope_per_day": round(float(stats["slope_per_day"][i]), 4),
+            "mean": round(float(stats["mean"][i]), 2),
+            "std": round(float(stats["std"][i]), 2),
+            "cv": round(float(stats["cv"][i]), 4),
+            "rolling_mean": round(float(stats["rolling_mean"][i]), 2),
+            "outliers": int(stats["outliers"][i]),
+            "data_points": int(stats["count"][i]),
+        }
+    return summary
+
@@ -0,0 +1,378 @@
+"""
+上传视频的关键帧采样
+
+视觉模型只需要看有代表性的画面，不必接收整段视频。这里先按较低帧率解码上传的视频，
+用共享姿态推理进程池估计每个采样帧的关键点，按相邻帧的姿态变化量选出关键帧：
+把累计动作量等分，动作密集的段落多取、静止的段落少取。
+长视频按采样帧数上限自动降低采样帧率，多个采样帧同时交给进程池推理，耗时不随视频长度线性增长。
+选中的画面拼成一张 JPEG 帧条，连同关键点摘要一起发送给模型，数据量通常只有原视频的百分之一。
+同样的采样流程也用于提取上传视频的关键点轨迹，供本地 DTW 比对使用。
+"""
+import asyncio
+import logging
+import math
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .pose_track import CHANNELS, NUM_LANDMARKS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_FPS = 5.0
+DEFAULT_KEYFRAMES = 16
+# 单个视频估计姿态的采样帧数上限，超过时按视频长度降低采样帧率
+DEFAULT_MAX_SAMPLES = 300
+# 同时交给进程池推理的采样帧数
+DEFAULT_CONCURRENCY = 2
+DEFAULT_TILE_WIDTH = 320
+# 送去估计姿态的采样帧宽度，够用即可，越小编码和推理越快
+POSE_INPUT_WIDTH = 480
+JPEG_QUALITY = 80
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 估计单帧关键点的函数：输入 JPEG 数据，返回 (33, 4) 数组，未检测到人体时返回 None
+Estimator = Callable[[bytes], Awaitable[Optional[np.ndarray]]]
+
+
+def pose_change(landmarks: np.ndarray) -> np.ndarray:
+    """
+    计算每帧相对上一帧的姿态变化量
+
+    Args:
+        landmarks: (帧数, 33, 4) 关键点数组，未检测到人体的帧为 NaN
+
+    Returns:
+        (帧数,) 变化量，为两帧都可见的关键点位移按可见度加权的平均值；第一帧和缺失帧为 0
+    """
+    if len(landmarks) < 2:
+        return np.zeros(len(landmarks), dtype=np.float32)
+    xy = landmarks[:, :, :2]
+    visibility = np.nan_to_num(landmarks[:, :, 3])
+    displacement = np.nan_to_num(np.linalg.norm(xy[1:] - xy[:-1], axis=2))
+    weight = np.minimum(visibility[1:], visibility[:-1])
+    total = weight.sum(axis=1)
+    change = np.where(total > 0, (displacement * weight).sum(axis=1) / np.maximum(total, 1e-9), 0.0)
+    return np.concatenate([[0.0], change]).astype(np.float32)
+
+
+def select_keyframes(landmarks: np.ndarray, count: int) -> np.ndarray:
+    """
+    按累计姿态变化量等分选出关键帧
+
+    Args:
+        landmarks: (帧数, 33, 4) 关键点数组
+        count: 最多选出的帧数
+
+    Returns:
+        升序排列的帧序号，首帧总会被选中
+    """
+    frames = len(landmarks)
+    if frames <= count:
+        return np.arange(frames)
+
+    cumulative = np.cumsum(pose_change(landmarks))
+    if cumulative[-1] <= 0:
+        # 整段没有检测到动作，退化为均匀采样
+        return np.unique(np.linspace(0, frames - 1, count).round().astype(np.intp))
+
+    # 每个目标动作量对应累计量首次达到它的帧
+    targets = np.linspace(0.0, cumulative[-1], count)
+    indices = np.searchsorted(cumulative, targets)
+    return np.unique(np.clip(indices, 0, frames - 1))
+
+
+def build_frame_strip(images: List[np.ndarray], tile_width: int = DEFAULT_TILE_WIDTH) -> bytes:
+    """
+    把关键帧按网格拼成一张 JPEG
+
+    Args:
+        images: BGR 画面
+        tile_width: 每格宽度，高度按第一帧的宽高比计算
+
+    Returns:
+        JPEG 数据
+    """
+    height, width = images[0].shape[:2]
+    tile_height = max(1, round(tile_width * height / width))
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    strip = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        row, column = divmod(i, columns)
+        y, x = row * tile_height, column * tile_width
+        cv2.resize(image, (tile_width, tile_height), dst=strip[y:y + tile_height, x:x + tile_width],
+                   interpolation=cv2.INTER_AREA)
+    success, encoded = cv2.imencode(".jpg", strip, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not success:
+        raise ValueError("关键帧编码失败")
+    return encoded.tobytes()
+
+
+def _spool_to_file(video: BinaryIO, directory: str) -> str:
+    """OpenCV 只能按路径读取视频，先把上传内容分块复制到临时文件"""
+    fd, path = tempfile.mkstemp(suffix=".video", dir=directory)
+    video.seek(0)
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(video, f, COPY_CHUNK_SIZE)
+    video.seek(0)
+    return path
+
+
+def _probe(path: str) -> Tuple[float, int]:
+    """读取视频帧率和总帧数，容器中没有记录总帧数时为 0"""
+    cap = cv2.VideoCapture(path)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) or 30.0, max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    finally:
+        cap.release()
+
+
+def sample_step(fps: float, frame_count: int, sample_fps: float, max_samples: int) -> int:
+    """
+    计算采样间隔的帧数
+
+    Args:
+        fps: 视频帧率
+        frame_count: 视频总帧数，未知时为 0
+        sample_fps: 期望的采样帧率
+        max_samples: 采样帧数上限
+
+    Returns:
+        每隔多少帧取一帧，保证采样帧数不超过上限
+    """
+    step = max(1, round(fps / sample_fps))
+    if frame_count > 0 and max_samples > 0:
+        step = max(step, math.ceil(frame_count / max_samples))
+    return step
+
+
+def _iter_samples(path: str, fps: float, step: int) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """每隔 step 帧产出 (视频帧号, 时间戳, BGR 画面)，跳过的帧只 grab 不解码"""
+    cap = cv2.VideoCapture(path)
+    try:
+        index = 0
+        while cap.grab():
+            if index % step == 0:
+                success, image = cap.retrieve()
+                if success:
+                    yield index, index / fps, image
+            index += 1
+    finally:
+        cap.release()
+
+
+def _read_frames(path: str, indices: List[int]) -> List[np.ndarray]:
+    """第二遍顺序读取，只解码选中的帧"""
+    wanted = set(indices)
+    images = {}
+    cap = cv2.VideoCapture(path)
+    try:
+        index = 0
+        last = max(indices)
+        while index <= last and cap.grab():
+            if index in wanted:
+                success, image = cap.retrieve()
+                if success:
+                    images[index] = image
+            index += 1
+    finally:
+        cap.release()
+    return [images[i] for i in indices if i in images]
+
+
+def _encode_for_pose(image: np.ndarray) -> bytes:
+    height, width = image.shape[:2]
+    if width > POSE_INPUT_WIDTH:
+        scale = POSE_INPUT_WIDTH / width
+        image = cv2.resize(image, (POSE_INPUT_WIDTH, round(height * scale)), interpolation=cv2.INTER_AREA)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes()
+
+
+def _sample_next(samples: Iterator) -> Optional[Tuple[int, float, bytes]]:
+    item = next(samples, None)
+    if item is None:
+        return None
+    index, timestamp, image = item
+    return index, timestamp, _encode_for_pose(image)
+
+
+def landmark_summary(
+    landmarks: np.ndarray,
+    timestamps: np.ndarray,
+    selected: np.ndarray,
+    sample_fps: float
+) -> Dict:
+    """
+    生成随帧条一起发送的关键点摘要
+
+    Returns:
+        包含采样信息、动作量统计和每个关键帧关键点的字典
+    """
+    change = pose_change(landmarks)
+    detected = ~np.isnan(landmarks[:, 0, 0])
+    keyframes = []
+    for position in selected:
+        points = landmarks[position]
+        keyframes.append({
+            "time": round(float(timestamps[position]), 3),
+            "motion": round(float(change[position]), 4),
+            "landmarks": None if np.isnan(points[0, 0]) else np.round(points, 3).tolist(),
+        })
+    return {
+        "sample_fps": sample_fps,
+        "duration": round(float(timestamps[-1]), 3) if len(timestamps) else 0.0,
+        "sampled_frames": int(len(landmarks)),
+        "detected_ratio": round(float(detected.mean()), 3) if len(detected) else 0.0,
+        "motion_mean": round(float(change.mean()), 4) if len(change) else 0.0,
+        "motion_p95": round(float(np.percentile(change, 95)), 4) if len(change) else 0.0,
+        "keyframes": keyframes,
+    }
+
+
+async def sample_keyframes(
+    video: BinaryIO,
+    estimate: Estimator,
+    count: int = DEFAULT_KEYFRAMES,
+    sample_fps: float = DEFAULT_SAMPLE_FPS,
+    tile_width: int = DEFAULT_TILE_WIDTH,
+    work_dir: Optional[str] = None,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+    concurrency: int = DEFAULT_CONCURRENCY
+) -> Optional[Tuple[bytes, Dict]]:
+    """
+    从上传视频中选出关键帧
+
+    解码和编码在线程中进行，关键点估计交给 estimate，整个过程不阻塞事件循环，
+    内存中只保留关键点数组和最终选中的画面。解码下一帧的同时最多有 concurrency 帧在推理。
+
+    Args:
+        video: 支持 seek 的视频文件对象，完成后读取位置恢复到开头
+        estimate: 估计单帧关键点的异步函数，需支持 concurrency 个并发调用
+        count: 关键帧数量
+        sample_fps: 估计姿态的采样帧率
+        tile_width: 帧条中每格的宽度
+        work_dir: 临时文件目录
+        max_samples: 采样帧数上限，0 表示不限制
+        concurrency: 同时推理的采样帧数
+
+    Returns:
+        (帧条 JPEG, 关键点摘要)，视频无法解码时返回 None
+    """
+    path = await asyncio.to_thread(_spool_to_file, video, work_dir)
+    try:
+        samples = await _estimate_samples(path, estimate, sample_fps, max_samples, concurrency)
+        if samples is None:
+            return None
+        frame_indices, timestamps, landmarks, effective_fps = samples
+        selected = select_keyframes(landmarks, count)
+        images = await asyncio.to_thread(_read_frames, path, [frame_indices[i] for i in selected])
+        if not images:
+            return None
+        strip = await asyncio.to_thread(build_frame_strip, images, tile_width)
+        return strip, landmark_summary(landmarks, timestamps, selected, effective_fps)
+    finally:
+        await asyncio.to_thread(os.remove, path)
+
+
+async def extract_track(
+    video: BinaryIO,
+    estimate: Estimator,
+    sample_fps: float = DEFAULT_SAMPLE_FPS,
+    work_dir: Optional[str] = None,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+    concurrency: int = DEFAULT_CONCURRENCY
+) -> Optional[Tuple[np.ndarray, float]]:
+    """
+    按采样帧率提取上传视频的关键点轨迹
+
+    Args:
+        video: 支持 seek 的视频文件对象，完成后读取位置恢复到开头
+        estimate: 估计单帧关键点的异步函数，需支持 concurrency 个并发调用
+        sample_fps: 期望的采样帧率
+        work_dir: 临时文件目录
+        max_samples: 采样帧数上限，0 表示不限制
+        concurrency: 同时推理的采样帧数
+
+    Returns:
+        ((帧数, 33, 4) 关键点数组, 实际采样帧率)，未检测到人体的帧为 NaN；视频无法解码时返回 None
+    """
+    path = await asyncio.to_thread(_spool_to_file, video, work_dir)
+    try:
+        samples = await _estimate_samples(path, estimate, sample_fps, max_samples, concurrency)
+        if samples is None:
+            return None
+        _, _, landmarks, effective_fps = samples
+        return landmarks, effective_fps
+    finally:
+        await asyncio.to_thread(os.remove, path)
+
+
+async def _estimate_samples(
+    path: str,
+    estimate: Estimator,
+    sample_fps: float,
+    max_samples: int,
+    concurrency: int
+) -> Optional[Tuple[List[int], np.ndarray, np.ndarray, float]]:
+    """
+    解码采样帧并估计关键点
+
+    Returns:
+        (视频帧号, (采样数,) 时间戳, (采样数, 33, 4) 关键点, 实际采样帧率)，没有可解码的帧时返回 None
+    """
+    tasks: List[asyncio.Task] = []
+    try:
+        fps, frame_count = await asyncio.to_thread(_probe, path)
+        step = sample_step(fps, frame_count, sample_fps, max_samples)
+        samples = _iter_samples(path, fps, step)
+        frame_indices, timestamps = [], []
+        while True:
+            item = await asyncio.to_thread(_sample_next, samples)
+            if item is None:
+                break
+            index, timestamp, encoded = item
+            frame_indices.append(index)
+            timestamps.append(timestamp)
+            tasks.append(asyncio.create_task(estimate(encoded)))
+            # 在途的推理达到上限时先等最早的一帧，结果按提交顺序收集
+            done = len(tasks) - concurrency
+            if done >= 0:
+                await tasks[done]
+        if not tasks:
+            return None
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    empty = np.full((NUM_LANDMARKS, CHANNELS), np.nan, dtype=np.float32)
+    landmarks = np.stack([empty if result is None else result for result in results])
+    return frame_indices, np.asarray(timestamps, dtype=np.float32), landmarks, round(fps / step, 3)
+
+
+def pool_estimator(pool, concurrency: int = DEFAULT_CONCURRENCY) -> Estimator:
+    """
+    使用共享姿态推理进程池估计关键点
+
+    进程池中每个会话同时只处理一帧，这里为每次采样准备 concurrency 个独立的会话标识，
+    并发的调用各占一个，与实时分析会话一起在进程池中轮转。
+    """
+    prefix = f"keyframes-{uuid.uuid4().hex}"
+    sessions: asyncio.Queue = asyncio.Queue()
+    for i in range(concurrency):
+        sessions.put_nowait(f"{prefix}-{i}")
+
+    async def estimate(frame: bytes) -> Optional[np.ndarray]:
+        session_id = await sessions.get()
+        try:
+            return await pool.estimate(session_id, frame)
+        finally:
+            sessions.put_nowait(session_id)
+
+    return estimate
@@ -0,0 +1,193 @@
+"""
+AI 服务过载保护
+
+AdaptiveLimiter 按 AIMD 调整同时发往推理服务的请求数：请求顺利且延迟在目标以内时
+每轮加一，超时、5xx 或延迟超标时减半，排队等待超过上限的请求直接拒绝。
+CircuitBreaker 在连续失败后短时间内拒绝所有请求，之后放少量试探请求，
+成功则恢复。两者都让推理服务变慢时调用方快速失败，而不是堆积在 FastAPI 进程里。
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from .exceptions import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 自适应并发限制
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target: float = 60.0,
+        backoff: float = 0.5,
+        queue_timeout: float = 10.0
+    ):
+        """
+        Args:
+            initial: 初始并发上限
+            min_limit: 并发上限的最小值
+            max_limit: 并发上限的最大值
+            latency_target: 单次请求的目标延迟（秒），超过视为过载
+            backoff: 过载时上限乘以的系数
+            queue_timeout: 等待空闲名额的最长时间（秒），超时后拒绝请求
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self):
+        """占用一个并发名额，排队超时抛出 ServiceUnavailableException"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 名额在超时的同时分配了过来，归还给下一个等待者
+                self.in_flight -= 1
+                self._wake()
+            waiter.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise ServiceUnavailableException("AI服务繁忙，请稍后再试")
+
+    def release(self, latency: float, overloaded: bool):
+        """
+        归还名额并按结果调整并发上限
+
+        Args:
+            latency: 本次请求耗时（秒）
+            overloaded: 请求是否超时、失败或返回过载状态
+        """
+        self.in_flight -= 1
+        if overloaded or latency > self.latency_target:
+            now = time.monotonic()
+            # 同一批请求同时失败只算一次，避免上限被连续减半到底
+            if now - self._last_decrease >= min(latency, self.latency_target):
+                previous = int(self.limit)
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                if int(self.limit) < previous:
+                    logger.warning(f"AI service overloaded, concurrency limit lowered to {int(self.limit)}")
+        else:
+            # 每个满载周期约加一
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def release_unused(self):
+        """请求被取消、未得到结果时归还名额，不调整上限"""
+        self.in_flight -= 1
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for waiter in self._waiters if not waiter.done()),
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """
+    熔断器：closed 正常放行，open 全部拒绝，half_open 只放行少量试探请求
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0, half_open_calls: int = 1):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            recovery_time: 熔断后多久开始试探（秒）
+            half_open_calls: 试探阶段同时放行的请求数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_calls = half_open_calls
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened_count = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    def check(self):
+        """只检查是否处于熔断期，不占用试探名额，用于排队前快速拒绝"""
+        if self.state == STATE_OPEN and time.monotonic() - self._opened_at < self.recovery_time:
+            self.rejected += 1
+            raise ServiceUnavailableException("AI服务暂时不可用，请稍后再试")
+
+    def before_call(self):
+        """发送请求前检查，熔断期间抛出 ServiceUnavailableException"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_time:
+                self.rejected += 1
+                raise ServiceUnavailableException("AI服务暂时不可用，请稍后再试")
+            self.state = STATE_HALF_OPEN
+            self._trials = 0
+        if self.state == STATE_HALF_OPEN:
+            if self._trials >= self.half_open_calls:
+                self.rejected += 1
+                raise ServiceUnavailableException("AI服务暂时不可用，请稍后再试")
+            self._trials += 1
+
+    def record(self, success: bool):
+        """记录请求结果"""
+        if success:
+            if self.state != STATE_CLOSED:
+                logger.info("AI service recovered, circuit closed")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != STATE_OPEN:
+                logger.warning(f"AI service failing, circuit opened for {self.recovery_time}s")
+                self.opened_count += 1
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+
+    def cancel(self):
+        """试探请求被取消时归还试探名额"""
+        if self.state == STATE_HALF_OPEN and self._trials > 0:
+            self._trials -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened_count,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,274 @@
+"""
+多人姿态跟踪
+
+MediaPipe Pose 一次只能估计一个人。广场舞课堂同一画面里有十几位学员，
+这里每隔若干帧用 OpenCV 自带的 HOG 行人检测找出人体框，并按 IoU 与已有的人匹配；
+两次检测之间不再检测，而是用每个人上一帧关键点的外接框确定下一帧的裁剪区域。
+每个人持有独立的 Pose 实例，所有人的裁剪图在线程池中一起推理，
+开销大致与人数成正比，且每个人的编号在整段视频中保持不变。
+"""
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .pose_track import landmarks_to_array
+
+DEFAULT_DETECT_INTERVAL = 15
+DEFAULT_MAX_PEOPLE = 20
+DEFAULT_IOU_THRESHOLD = 0.3
+# IoU 匹配不上时，小框有这么大比例落在大框内也视为同一个人
+CONTAINMENT_THRESHOLD = 0.6
+DEFAULT_MAX_MISSES = 10
+# 裁剪框在人体框基础上向外扩展的比例，给下一帧的移动留余量
+CROP_MARGIN = 0.25
+MIN_CROP_SIZE = 32
+VISIBILITY_THRESHOLD = 0.5
+
+
+def box_iou(a: np.ndarray, b: np.ndarray, containment: bool = False) -> np.ndarray:
+    """
+    计算两组框的 IoU
+
+    Args:
+        a: (n, 4) 框，格式为 (x0, y0, x1, y1)
+        b: (m, 4) 框
+        containment: 为 True 时改用交集占较小框面积的比例
+
+    Returns:
+        (n, m) 重叠度矩阵
+    """
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    if containment:
+        union = np.minimum(area_a[:, None], area_b[None, :])
+    else:
+        union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> List[tuple]:
+    """按 IoU 从大到小贪心匹配，返回 [(行, 列)]"""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    iou = iou.copy()
+    while True:
+        row, col = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[row, col] < threshold:
+            break
+        pairs.append((int(row), int(col)))
+        iou[row, :] = -1.0
+        iou[:, col] = -1.0
+    return pairs
+
+
+def landmarks_box(landmarks: np.ndarray, width: int, height: int) -> Optional[np.ndarray]:
+    """由可见关键点求像素坐标外接框，可见点太少时返回 None"""
+    visible = np.nan_to_num(landmarks[:, 3]) >= VISIBILITY_THRESHOLD
+    if visible.sum() < 4:
+        return None
+    points = landmarks[visible, :2] * (width, height)
+    return np.concatenate([points.min(axis=0), points.max(axis=0)])
+
+
+class PersonDetector:
+    """
+    基于 HOG + 线性 SVM 的行人检测，不依赖额外模型文件
+    """
+
+    def __init__(self, detect_width: int = 480, min_score: float = 0.3, nms_threshold: float = 0.4):
+        """
+        Args:
+            detect_width: 检测前把画面缩小到的宽度，越小越快
+            min_score: 检测得分阈值
+            nms_threshold: 非极大值抑制的 IoU 阈值
+        """
+        self.detect_width = detect_width
+        self.min_score = min_score
+        self.nms_threshold = nms_threshold
+        self._hog = cv2.HOGDescriptor()
+        self._hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        """
+        检测画面中的人
+
+        Returns:
+            (k, 4) 像素坐标框 (x0, y0, x1, y1)
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, self.detect_width / width)
+        small = image if scale == 1.0 else cv2.resize(
+            image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        rects, weights = self._hog.detectMultiScale(small, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return np.zeros((0, 4), dtype=np.float32)
+
+        weights = np.asarray(weights, dtype=np.float32).ravel()
+        keep = cv2.dnn.NMSBoxes(
+            [list(map(int, r)) for r in rects], weights.tolist(), self.min_score, self.nms_threshold
+        )
+        keep = np.asarray(keep, dtype=np.intp).ravel()
+        rects = np.asarray(rects, dtype=np.float32)[keep] / scale
+        return np.concatenate([rects[:, :2], rects[:, :2] + rects[:, 2:]], axis=1)
+
+
+class PersonTrack:
+    """单个被跟踪的人"""
+
+    def __init__(self, track_id: int, box: np.ndarray, pose):
+        self.id = track_id
+        self.box = box
+        self.pose = pose
+        self.landmarks: Optional[np.ndarray] = None
+        self.misses = 0
+        self.frames = 0
+
+
+class MultiPoseTracker:
+    """
+    多人姿态跟踪器
+    """
+
+    def __init__(
+        self,
+        create_pose: Callable[[], object],
+        detector: Optional[PersonDetector] = None,
+        detect_interval: int = DEFAULT_DETECT_INTERVAL,
+        max_people: int = DEFAULT_MAX_PEOPLE,
+        iou_threshold: float = DEFAULT_IOU_THRESHOLD,
+        max_misses: int = DEFAULT_MAX_MISSES,
+        workers: int = 4
+    ):
+        """
+        Args:
+            create_pose: 创建单人 Pose 实例的函数
+            detector: 人体检测器，默认使用 PersonDetector
+            detect_interval: 每隔多少帧做一次人体检测
+            max_people: 同时跟踪的最多人数
+            iou_threshold: 检测框与已有人匹配的 IoU 阈值
+            max_misses: 连续多少帧既没有检测到也没有估计出关键点就结束跟踪
+            workers: 并行推理的线程数
+        """
+        self._create_pose = create_pose
+        self.detector = detector or PersonDetector()
+        self.detect_interval = detect_interval
+        self.max_people = max_people
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks: Dict[int, PersonTrack] = {}
+        self.frame_index = 0
+        self._ids = itertools.count(1)
+        # 结束跟踪的人留下的 Pose 实例，重置后给新出现的人复用
+        self._idle_poses: List[object] = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="multi-pose")
+
+    def _acquire_pose(self):
+        if self._idle_poses:
+            pose = self._idle_poses.pop()
+            pose.reset()
+            return pose
+        return self._create_pose()
+
+    def _update_detections(self, image: np.ndarray):
+        detections = self.detector.detect(image)
+        tracks = list(self.tracks.values())
+        matched = set()
+        if tracks and len(detections):
+            boxes = np.stack([track.box for track in tracks])
+            pairs = greedy_match(box_iou(boxes, detections), self.iou_threshold)
+            # 关键点外接框通常比检测框小，剩下的再按包含关系匹配一轮
+            rows = [row for row in range(len(tracks)) if row not in {r for r, _ in pairs}]
+            cols = [col for col in range(len(detections)) if col not in {c for _, c in pairs}]
+            if rows and cols:
+                overlap = box_iou(boxes[rows], detections[cols], containment=True)
+                pairs += [
+                    (rows[r], cols[c]) for r, c in greedy_match(overlap, CONTAINMENT_THRESHOLD)
+                ]
+            for row, col in pairs:
+                # 用检测框校正关键点外接框的漂移
+                tracks[row].box = detections[col]
+                matched.add(col)
+
+        for col in range(len(detections)):
+            if col in matched or len(self.tracks) >= self.max_people:
+                continue
+            track_id = next(self._ids)
+            self.tracks[track_id] = PersonTrack(track_id, detections[col], self._acquire_pose())
+
+    def _crop(self, box: np.ndarray, width: int, height: int):
+        """按扩展比例计算裁剪区域，返回整数像素坐标，区域过小时返回 None"""
+        x0, y0, x1, y1 = box
+        mx = (x1 - x0) * CROP_MARGIN
+        my = (y1 - y0) * CROP_MARGIN
+        x0, y0 = int(max(0, x0 - mx)), int(max(0, y0 - my))
+        x1, y1 = int(min(width, x1 + mx)), int(min(height, y1 + my))
+        if x1 - x0 < MIN_CROP_SIZE or y1 - y0 < MIN_CROP_SIZE:
+            return None
+        return x0, y0, x1, y1
+
+    def _estimate(self, track: PersonTrack, image_rgb: np.ndarray) -> Optional[np.ndarray]:
+        height, width = image_rgb.shape[:2]
+        region = self._crop(track.box, width, height)
+        if region is None:
+            return None
+        x0, y0, x1, y1 = region
+        crop = np.ascontiguousarray(image_rgb[y0:y1, x0:x1])
+        results = track.pose.process(crop)
+        if results.pose_landmarks is None:
+            return None
+
+        # 裁剪图内的归一化坐标换算回整幅画面
+        landmarks = landmarks_to_array(results.pose_landmarks)
+        crop_width, crop_height = x1 - x0, y1 - y0
+        landmarks[:, 0] = (landmarks[:, 0] * crop_width + x0) / width
+        landmarks[:, 1] = (landmarks[:, 1] * crop_height + y0) / height
+        landmarks[:, 2] *= crop_width / width
+        return landmarks
+
+    def process(self, image: np.ndarray) -> List[PersonTrack]:
+        """
+        处理一帧 BGR 画面
+
+        Returns:
+            当前仍在跟踪的人，landmarks 为 None 表示这一帧没有估计出关键点
+        """
+        height, width = image.shape[:2]
+        if self.frame_index % self.detect_interval == 0 or not self.tracks:
+            self._update_detections(image)
+        self.frame_index += 1
+
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        tracks = list(self.tracks.values())
+        results = self._executor.map(lambda track: self._estimate(track, image_rgb), tracks)
+        for track, landmarks in zip(tracks, results):
+            track.landmarks = landmarks
+            box = None if landmarks is None else landmarks_box(landmarks, width, height)
+            if box is None:
+                track.misses += 1
+            else:
+                track.box = box
+                track.misses = 0
+                track.frames += 1
+
+        for track in tracks:
+            if track.misses > self.max_misses:
+                self._idle_poses.append(self.tracks.pop(track.id).pose)
+        return list(self.tracks.values())
+
+    def close(self):
+        """关闭线程池和所有 Pose 实例"""
+        self._executor.shutdown(wait=True)
+        for pose in self._idle_poses + [track.pose for track in self.tracks.values()]:
+            pose.close()
+        self._idle_poses = []
+        self.tracks = {}
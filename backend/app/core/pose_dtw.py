@@ -0,0 +1,426 @@
+"""
+基于动态时间规整 (DTW) 的姿态序列比对
+
+在关节角度特征上对齐学员轨迹与课程标准轨迹，支持三种模式：
+- full: 完整 DTW，适合短片段；单元数超过 MAX_FULL_CELLS 时改用能放下的最宽 Sakoe-Chiba 带
+- banded: Sakoe-Chiba 带约束，只计算对角线附近的单元
+- fast: 多尺度近似 (FastDTW)，先在粗分辨率上对齐，再在投影路径附近细化
+
+每一行的递推 D[i, j] = c[i, j] + min(D[i-1, j-1], D[i-1, j], D[i, j-1])
+中同行依赖 D[i, j-1] 通过前缀和加累积最小值一次算出，只在行上做 Python 循环。
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .pose_features import JOINT_NAMES, feature_matrix
+from .pose_index import SegmentIndex
+
+DTW_MODES = ("full", "banded", "fast")
+DEFAULT_BAND_SECONDS = 5.0
+DEFAULT_RADIUS = 8
+DEFAULT_SEGMENT_SECONDS = 2.0
+# 在索引定位的乐句前后各保留的余量（秒）
+DEFAULT_MARGIN_SECONDS = 3.0
+# full 模式累计代价矩阵的单元数上限（float64 约 32MB），超过时改用带约束
+MAX_FULL_CELLS = 4_000_000
+# 平均角度误差达到该值时得分约为 37 分
+ERROR_SCALE_DEGREES = 30.0
+
+
+def _sakoe_chiba_window(n: int, m: int, band: int) -> Tuple[np.ndarray, np.ndarray]:
+    """沿两条序列的对角线生成每行允许的列范围 [lo, hi]"""
+    centers = np.arange(n) * ((m - 1) / max(n - 1, 1))
+    # 序列长度不等时对角线斜率大于 1，带宽至少要覆盖一行跨越的列数
+    band = max(band, int(math.ceil(m / max(n, 1))))
+    lo = np.clip(np.floor(centers - band), 0, m - 1).astype(np.intp)
+    hi = np.clip(np.ceil(centers + band), 0, m - 1).astype(np.intp)
+    return _connect_window(lo, hi, m)
+
+
+def _connect_window(lo: np.ndarray, hi: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """保证窗口包含起点和终点，且相邻两行的列范围相连"""
+    lo = lo.copy()
+    hi = hi.copy()
+    lo[0] = 0
+    hi[-1] = m - 1
+    hi = np.maximum.accumulate(hi)
+    lo = np.minimum.accumulate(lo[::-1])[::-1]
+    lo[1:] = np.minimum(lo[1:], hi[:-1] + 1)
+    return lo, hi
+
+
+def accumulate_row(cost: np.ndarray, diag_or_up: np.ndarray) -> np.ndarray:
+    """
+    计算一行累计代价 row[j] = cost[j] + min(diag_or_up[j], row[j-1])
+
+    展开后 row[j] = S[j] + min_{k<=j}(diag_or_up[k] - S[k-1])，S 为 cost 的前缀和，
+    用 cumsum 和 minimum.accumulate 即可整行求出。
+
+    Args:
+        cost: 本行各列的局部代价
+        diag_or_up: 各列的 min(D[i-1, j-1], D[i-1, j])
+
+    Returns:
+        本行累计代价
+    """
+    prefix = np.cumsum(cost)
+    return prefix + np.minimum.accumulate(diag_or_up - (prefix - cost))
+
+
+def _dtw_window(
+    x: np.ndarray,
+    y: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray
+) -> Tuple[float, np.ndarray]:
+    """
+    在给定窗口内计算 DTW
+
+    Args:
+        x: (n, 特征数) 序列
+        y: (m, 特征数) 序列
+        lo: 每行允许的最小列号
+        hi: 每行允许的最大列号
+
+    Returns:
+        (累计代价, (路径长度, 2) 对齐路径)
+    """
+    n, m = x.shape[0], y.shape[0]
+    width = int((hi - lo).max()) + 1
+    acc = np.full((n, width), np.inf, dtype=np.float64)
+
+    # prev[j + 1] 保存上一行 D[i-1, j]，prev[0] 是虚拟起点 D[-1, -1]
+    prev = np.full(m + 1, np.inf, dtype=np.float64)
+    prev[0] = 0.0
+    prev_lo, prev_hi = 0, -1
+    for i in range(n):
+        start, stop = int(lo[i]), int(hi[i]) + 1
+        cost = np.sqrt(np.sum((y[start:stop] - x[i]) ** 2, axis=1, dtype=np.float64))
+        row = accumulate_row(cost, np.minimum(prev[start:stop], prev[start + 1:stop + 1]))
+
+        prev[0] = np.inf
+        prev[prev_lo + 1:prev_hi + 2] = np.inf
+        prev[start + 1:stop + 1] = row
+        prev_lo, prev_hi = start, stop - 1
+        acc[i, :stop - start] = row
+
+    total = acc[n - 1, (m - 1) - lo[n - 1]]
+    if not np.isfinite(total):
+        raise ValueError("DTW 窗口不连通，无法对齐")
+    return float(total), _backtrack(acc, lo, hi)
+
+
+def _backtrack(acc: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """从终点回溯最优对齐路径"""
+
+    def value(i: int, j: int) -> float:
+        if i < 0 or j < lo[i] or j > hi[i]:
+            return np.inf
+        return acc[i, j - lo[i]]
+
+    i, j = acc.shape[0] - 1, int(hi[-1])
+    path = [(i, j)]
+    while i > 0 or j > 0:
+        if i == 0:
+            j -= 1
+        elif j == 0:
+            i -= 1
+        else:
+            diag, up, left = value(i - 1, j - 1), value(i - 1, j), value(i, j - 1)
+            if diag <= up and diag <= left:
+                i, j = i - 1, j - 1
+            elif up <= left:
+                i -= 1
+            else:
+                j -= 1
+        path.append((i, j))
+    return np.array(path[::-1], dtype=np.intp)
+
+
+def dtw(x: np.ndarray, y: np.ndarray, band: Optional[int] = None) -> Tuple[float, np.ndarray]:
+    """
+    计算两条特征序列的 DTW 代价和对齐路径
+
+    Args:
+        x: (n, 特征数) 序列
+        y: (m, 特征数) 序列
+        band: Sakoe-Chiba 带宽（帧），为空时计算完整 DTW
+
+    Returns:
+        (累计代价, (路径长度, 2) 对齐路径)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    n, m = x.shape[0], y.shape[0]
+    if n == 0 or m == 0:
+        raise ValueError("序列不能为空")
+    if band is None:
+        lo = np.zeros(n, dtype=np.intp)
+        hi = np.full(n, m - 1, dtype=np.intp)
+    else:
+        lo, hi = _sakoe_chiba_window(n, m, band)
+    return _dtw_window(x, y, lo, hi)
+
+
+def _coarsen(x: np.ndarray) -> np.ndarray:
+    """相邻两帧取平均，序列长度减半"""
+    even = x[: x.shape[0] // 2 * 2]
+    coarse = (even[0::2] + even[1::2]) * 0.5
+    if x.shape[0] % 2:
+        coarse = np.vstack([coarse, x[-1:]])
+    return coarse
+
+
+def _expand_window(path: np.ndarray, n: int, m: int, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """将粗分辨率路径投影到细分辨率，并向四周扩展 radius 帧"""
+    lo = np.full(n, m - 1, dtype=np.intp)
+    hi = np.zeros(n, dtype=np.intp)
+    # 每个粗单元 (i, j) 覆盖细分辨率的 2x2 区域
+    for di in (0, 1):
+        rows = np.minimum(path[:, 0] * 2 + di, n - 1)
+        np.minimum.at(lo, rows, np.minimum(path[:, 1] * 2, m - 1))
+        np.maximum.at(hi, rows, np.minimum(path[:, 1] * 2 + 1, m - 1))
+
+    spread_lo, spread_hi = lo.copy(), hi.copy()
+    for shift in range(1, radius + 1):
+        spread_lo[shift:] = np.minimum(spread_lo[shift:], lo[:-shift])
+        spread_lo[:-shift] = np.minimum(spread_lo[:-shift], lo[shift:])
+        spread_hi[shift:] = np.maximum(spread_hi[shift:], hi[:-shift])
+        spread_hi[:-shift] = np.maximum(spread_hi[:-shift], hi[shift:])
+
+    lo = np.clip(spread_lo - radius, 0, m - 1)
+    hi = np.clip(spread_hi + radius, 0, m - 1)
+    return _connect_window(lo, hi, m)
+
+
+def fast_dtw(x: np.ndarray, y: np.ndarray, radius: int = DEFAULT_RADIUS) -> Tuple[float, np.ndarray]:
+    """
+    多尺度近似 DTW (FastDTW)，时间和内存与序列长度线性相关
+
+    Args:
+        x: (n, 特征数) 序列
+        y: (m, 特征数) 序列
+        radius: 每一层在投影路径周围扩展的帧数
+
+    Returns:
+        (累计代价, (路径长度, 2) 对齐路径)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    min_size = radius + 2
+    if x.shape[0] <= min_size or y.shape[0] <= min_size:
+        return dtw(x, y)
+
+    _, coarse_path = fast_dtw(_coarsen(x), _coarsen(y), radius)
+    lo, hi = _expand_window(coarse_path, x.shape[0], y.shape[0], radius)
+    return _dtw_window(x, y, lo, hi)
+
+
+def align(
+    x: np.ndarray,
+    y: np.ndarray,
+    mode: str = "banded",
+    band: Optional[int] = None,
+    radius: int = DEFAULT_RADIUS
+) -> Tuple[float, np.ndarray]:
+    """
+    按指定模式对齐两条特征序列
+
+    Args:
+        x: (n, 特征数) 序列
+        y: (m, 特征数) 序列
+        mode: full / banded / fast，full 模式的单元数受 MAX_FULL_CELLS 限制
+        band: banded 模式下的带宽（帧）
+        radius: fast 模式下的扩展半径（帧）
+
+    Returns:
+        (累计代价, (路径长度, 2) 对齐路径)
+    """
+    if mode == "full":
+        n, m = x.shape[0], y.shape[0]
+        if n * m <= MAX_FULL_CELLS:
+            return dtw(x, y)
+        # 两条长序列的完整矩阵放不进内存，取总单元数不超过上限的最宽带
+        return dtw(x, y, band=max(1, (MAX_FULL_CELLS // max(n, 1) - 1) // 2))
+    if mode == "banded":
+        return dtw(x, y, band=band if band is not None else DEFAULT_RADIUS)
+    if mode == "fast":
+        return fast_dtw(x, y, radius=radius)
+    raise ValueError(f"不支持的比对模式: {mode}")
+
+
+def error_to_score(error_degrees: np.ndarray) -> np.ndarray:
+    """将平均角度误差（度）转换为 0-100 的得分"""
+    return 100.0 * np.exp(-np.asarray(error_degrees) / ERROR_SCALE_DEGREES)
+
+
+def segment_costs(
+    x: np.ndarray,
+    y: np.ndarray,
+    path: np.ndarray,
+    fps: float,
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS
+) -> List[Dict[str, Any]]:
+    """
+    按标准轨迹的时间轴分段统计对齐代价
+
+    Args:
+        x: (n, 8) 学员特征序列（角度 / 180）
+        y: (m, 8) 标准特征序列（角度 / 180）
+        path: 对齐路径
+        fps: 帧率
+        segment_seconds: 分段时长（秒）
+
+    Returns:
+        分段结果列表，包含时间范围、平均代价、各关节误差和得分
+    """
+    segment_frames = max(1, int(round(segment_seconds * fps)))
+    learner_idx, reference_idx = path[:, 0], path[:, 1]
+    segment_ids = reference_idx // segment_frames
+    segment_count = int(segment_ids[-1]) + 1
+
+    joint_error = np.abs(x[learner_idx] - y[reference_idx]) * 180.0  # (路径长度, 8)
+    local_cost = np.sqrt(np.sum((x[learner_idx] - y[reference_idx]) ** 2, axis=1))
+
+    counts = np.bincount(segment_ids, minlength=segment_count)
+    safe_counts = np.maximum(counts, 1)
+    mean_cost = np.bincount(segment_ids, weights=local_cost, minlength=segment_count) / safe_counts
+    joint_sums = np.zeros((segment_count, joint_error.shape[1]))
+    np.add.at(joint_sums, segment_ids, joint_error)
+    joint_mean = joint_sums / safe_counts[:, None]
+    scores = error_to_score(joint_mean.mean(axis=1))
+
+    learner_start = np.full(segment_count, np.iinfo(np.intp).max)
+    learner_end = np.zeros(segment_count, dtype=np.intp)
+    np.minimum.at(learner_start, segment_ids, learner_idx)
+    np.maximum.at(learner_end, segment_ids, learner_idx)
+
+    segments = []
+    for k in np.flatnonzero(counts):
+        segments.append({
+            "reference_start": round(float(k * segment_frames / fps), 3),
+            "reference_end": round(float(min((k + 1) * segment_frames, y.shape[0]) / fps), 3),
+            "learner_start": round(float(learner_start[k] / fps), 3),
+            "learner_end": round(float((learner_end[k] + 1) / fps), 3),
+            "cost": round(float(mean_cost[k]), 4),
+            "joint_errors": {
+                name: round(float(err), 2) for name, err in zip(JOINT_NAMES, joint_mean[k])
+            },
+            "score": round(float(scores[k]), 1),
+        })
+    return segments
+
+
+def resample(values: np.ndarray, fps: float, target_fps: float) -> np.ndarray:
+    """
+    按最近帧把轨迹或特征序列重采样到目标帧率
+
+    Args:
+        values: 第一维为帧的数组
+        fps: 原帧率
+        target_fps: 目标帧率
+
+    Returns:
+        重采样后的数组，帧率相同时原样返回
+    """
+    n = values.shape[0]
+    if n == 0 or abs(fps - target_fps) < 1e-6:
+        return values
+    count = max(1, int(round(n * target_fps / fps)))
+    indices = np.minimum(np.round(np.arange(count) * (fps / target_fps)).astype(np.intp), n - 1)
+    return values[indices]
+
+
+def compare_tracks(
+    learner: np.ndarray,
+    reference: np.ndarray,
+    fps: float,
+    mode: str = "banded",
+    band_seconds: float = DEFAULT_BAND_SECONDS,
+    radius: int = DEFAULT_RADIUS,
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+    index: Optional[SegmentIndex] = None,
+    margin_seconds: float = DEFAULT_MARGIN_SECONDS
+) -> Dict[str, Any]:
+    """
+    比对学员关键点轨迹与标准关键点轨迹
+
+    提供标准轨迹的分段索引且学员片段明显短于标准轨迹时，
+    先用索引定位对应的乐句，只在该段前后 margin_seconds 的范围内做 DTW。
+
+    Args:
+        learner: (n, 33, 4) 学员关键点
+        reference: (m, 33, 4) 标准关键点
+        fps: 帧率（两条轨迹需已重采样到相同帧率）
+        mode: full / banded / fast
+        band_seconds: banded 模式下的带宽（秒）
+        radius: fast 模式下的扩展半径（帧）
+        segment_seconds: 分段时长（秒）
+        index: 标准轨迹的分段索引，帧率可以与 fps 不同
+        margin_seconds: 定位到的乐句前后保留的余量（秒）
+
+    Returns:
+        比对结果，包含总代价、整体得分、比对的标准轨迹范围和分段明细
+    """
+    return compare_features(
+        feature_matrix(learner),
+        feature_matrix(reference),
+        fps,
+        mode=mode,
+        band_seconds=band_seconds,
+        radius=radius,
+        segment_seconds=segment_seconds,
+        index=index,
+        margin_seconds=margin_seconds
+    )
+
+
+def compare_features(
+    x: np.ndarray,
+    y: np.ndarray,
+    fps: float,
+    mode: str = "banded",
+    band_seconds: float = DEFAULT_BAND_SECONDS,
+    radius: int = DEFAULT_RADIUS,
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+    index: Optional[SegmentIndex] = None,
+    margin_seconds: float = DEFAULT_MARGIN_SECONDS
+) -> Dict[str, Any]:
+    """
+    比对已经算好的特征矩阵，参数和返回值与 compare_tracks 相同
+
+    标准轨迹的特征可以预先计算并缓存，每次比对只需计算学员一侧。
+
+    Args:
+        x: (n, 8) 学员特征矩阵
+        y: (m, 8) 标准特征矩阵，帧率与学员一致
+    """
+    start, stop = 0, y.shape[0]
+    if index is not None and 0 < x.shape[0] < y.shape[0] // 2:
+        # 索引按标准轨迹的原始帧率建立，查询前把学员特征换到同一帧率，结果按秒换算回来
+        matches = index.query(resample(x, fps, index.fps), top_k=1)
+        if matches:
+            margin = int(round(margin_seconds * fps))
+            start = max(0, int(round(matches[0]["start"] * fps)) - margin)
+            stop = min(y.shape[0], int(round(matches[0]["end"] * fps)) + margin)
+
+    band = max(1, int(round(band_seconds * fps)))
+    cost, path = align(x, y[start:stop], mode=mode, band=band, radius=radius)
+    # 路径换算回完整标准轨迹的帧号，分段时间与不使用索引时一致
+    path[:, 1] += start
+    segments = segment_costs(x, y, path, fps, segment_seconds=segment_seconds)
+
+    overall_error = float(np.mean(np.abs(x[path[:, 0]] - y[path[:, 1]])) * 180.0)
+    return {
+        "mode": mode,
+        "cost": round(cost, 4),
+        "normalized_cost": round(cost / len(path), 4),
+        "path_length": int(len(path)),
+        "reference_start": round(start / fps, 3),
+        "reference_end": round(stop / fps, 3),
+        "mean_angle_error": round(overall_error, 2),
+        "score": round(float(error_to_score(overall_error)), 1),
+        "segments": segments,
+    }
@@ -0,0 +1,191 @@
+"""
+姿态特征计算
+
+对 (帧数, 33, 4) 的关键点数组整体计算关节角度、角速度和左右对称性，
+所有计算都在 NumPy 数组上一次完成，不按帧或按关键点做 Python 循环。
+关键点编号与 MediaPipe PoseLandmark 一致。
+"""
+from typing import Dict, List
+
+import numpy as np
+
+# MediaPipe PoseLandmark 编号
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# 关节名称 -> (端点A, 关节顶点, 端点B)，角度为顶点处两条肢段的夹角
+JOINTS: Dict[str, tuple] = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW),
+    "right_shoulder": (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+JOINT_NAMES: List[str] = list(JOINTS)
+JOINT_TRIPLETS = np.array(list(JOINTS.values()), dtype=np.intp)
+
+# 左右成对的关节在 JOINT_NAMES 中的位置
+SYMMETRY_PAIRS: Dict[str, tuple] = {
+    "elbow": (0, 1),
+    "shoulder": (2, 3),
+    "hip": (4, 5),
+    "knee": (6, 7),
+}
+_LEFT = np.array([pair[0] for pair in SYMMETRY_PAIRS.values()], dtype=np.intp)
+_RIGHT = np.array([pair[1] for pair in SYMMETRY_PAIRS.values()], dtype=np.intp)
+
+DEFAULT_MIN_VISIBILITY = 0.5
+
+
+def joint_angles(
+    landmarks: np.ndarray,
+    min_visibility: float = DEFAULT_MIN_VISIBILITY,
+    use_z: bool = False
+) -> np.ndarray:
+    """
+    计算关节角度
+
+    Args:
+        landmarks: (..., 33, 4) 关键点数组
+        min_visibility: 关键点可见度阈值，任一端点低于阈值时该角度记为 NaN
+        use_z: 是否使用 MediaPipe 估计的深度坐标
+
+    Returns:
+        (..., 8) 关节角度数组，单位为度，顺序与 JOINT_NAMES 一致
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    dims = 3 if use_z else 2
+    points = landmarks[..., JOINT_TRIPLETS, :dims]  # (..., 8, 3, dims)
+    v1 = points[..., 0, :] - points[..., 1, :]
+    v2 = points[..., 2, :] - points[..., 1, :]
+
+    dot = np.sum(v1 * v2, axis=-1)
+    if use_z:
+        cross = np.linalg.norm(np.cross(v1, v2), axis=-1)
+    else:
+        cross = np.abs(v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0])
+    # atan2 在接近 0° 和 180° 时比 arccos 数值更稳定
+    angles = np.degrees(np.arctan2(cross, dot))
+
+    visibility = landmarks[..., JOINT_TRIPLETS, 3].min(axis=-1)
+    return np.where(visibility >= min_visibility, angles, np.nan).astype(np.float32)
+
+
+def angular_velocity(angles: np.ndarray, fps: float) -> np.ndarray:
+    """
+    计算关节角速度
+
+    Args:
+        angles: (帧数, 关节数) 角度数组
+        fps: 帧率
+
+    Returns:
+        (帧数, 关节数) 角速度数组，单位为度/秒
+    """
+    if angles.shape[0] < 2:
+        return np.zeros_like(angles)
+    return (np.gradient(angles, axis=0) * fps).astype(np.float32)
+
+
+def symmetry(angles: np.ndarray) -> np.ndarray:
+    """
+    计算左右肢体角度差
+
+    Args:
+        angles: (..., 8) 关节角度数组
+
+    Returns:
+        (..., 4) 左右角度差的绝对值，顺序与 SYMMETRY_PAIRS 一致
+    """
+    return np.abs(angles[..., _LEFT] - angles[..., _RIGHT])
+
+
+def symmetry_index(angles: np.ndarray) -> np.ndarray:
+    """
+    计算整体对称性得分，1 表示左右完全一致，0 表示相差 180°
+
+    Args:
+        angles: (..., 8) 关节角度数组
+
+    Returns:
+        (...) 对称性得分
+    """
+    diff = symmetry(angles)
+    valid = ~np.isnan(diff)
+    count = valid.sum(axis=-1)
+    # 全部缺失的帧记为 NaN，避免 nanmean 对空切片告警
+    mean = np.where(valid, diff, 0.0).sum(axis=-1) / np.maximum(count, 1)
+    return np.where(count > 0, 1.0 - mean / 180.0, np.nan).astype(np.float32)
+
+
+def interpolate_missing(values: np.ndarray) -> np.ndarray:
+    """
+    沿时间轴线性插值填补 NaN，整列缺失时填 0
+
+    Args:
+        values: (帧数, 特征数) 数组
+
+    Returns:
+        填补后的新数组
+    """
+    values = np.array(values, dtype=np.float32, copy=True)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+
+    frames = np.arange(values.shape[0])
+    # 只在特征维度上循环，特征数是常数级
+    for column in np.flatnonzero(missing.any(axis=0)):
+        valid = ~missing[:, column]
+        if valid.any():
+            values[:, column] = np.interp(frames, frames[valid], values[valid, column])
+        else:
+            values[:, column] = 0.0
+    return values
+
+
+def compute_features(
+    landmarks: np.ndarray,
+    fps: float,
+    min_visibility: float = DEFAULT_MIN_VISIBILITY
+) -> Dict[str, np.ndarray]:
+    """
+    一次性计算整段轨迹的运动学特征
+
+    Args:
+        landmarks: (帧数, 33, 4) 关键点数组
+        fps: 帧率
+        min_visibility: 关键点可见度阈值
+
+    Returns:
+        包含 angles、angular_velocity、symmetry、symmetry_index 的字典
+    """
+    angles = joint_angles(landmarks, min_visibility=min_visibility)
+    return {
+        "angles": angles,
+        "angular_velocity": angular_velocity(angles, fps),
+        "symmetry": symmetry(angles),
+        "symmetry_index": symmetry_index(angles),
+    }
+
+
+def feature_matrix(landmarks: np.ndarray, min_visibility: float = DEFAULT_MIN_VISIBILITY) -> np.ndarray:
+    """
+    生成用于序列比对的特征矩阵：缺失值已插值，角度缩放到 [0, 1]
+
+    Args:
+        landmarks: (帧数, 33, 4) 关键点数组
+        min_visibility: 关键点可见度阈值
+
+    Returns:
+        (帧数, 8) float32 特征矩阵
+    """
+    angles = joint_angles(landmarks, min_visibility=min_visibility)
+    return interpolate_missing(angles) / np.float32(180.0)
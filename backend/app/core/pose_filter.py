@@ -0,0 +1,247 @@
+"""
+姿态关键点滤波
+
+MediaPipe 的原始关键点逐帧抖动，直接用于评分会让反馈忽高忽低。
+这里提供 one-euro 和常速度卡尔曼两种滤波器，每一步同时处理全部 33 个关键点的坐标，
+既可以在实时循环中逐帧调用，也可以用 filter_track 离线处理整条轨迹。
+可见度通道不参与滤波，原样保留。坐标为 NaN 的单个关键点跳过本帧，不更新它的滤波状态，
+也不影响其他关键点。
+"""
+import math
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+FILTER_NONE = "none"
+FILTER_ONE_EURO = "one_euro"
+FILTER_KALMAN = "kalman"
+FILTER_CHOICES = (FILTER_NONE, FILTER_ONE_EURO, FILTER_KALMAN)
+
+# 参与滤波的坐标通道 (x, y, z)
+COORDS = 3
+
+
+def _smoothing_factor(cutoff: np.ndarray, dt: float) -> np.ndarray:
+    """一阶低通滤波的平滑系数"""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class LandmarkFilter(ABC):
+    """
+    关键点滤波器基类
+
+    update 传入 None 表示该帧未检测到人体，滤波状态随之重置，
+    重新检测到人体时从新的位置开始，不会从旧位置拖出一段轨迹。
+    子类的状态按关键点逐行保存，从未有过有效测量的关键点状态为 NaN，第一次出现时直接用测量值初始化。
+    """
+
+    def __init__(self):
+        self._last_time: Optional[float] = None
+
+    def reset(self):
+        """清空滤波状态"""
+        self._last_time = None
+
+    def update(self, landmarks: Optional[np.ndarray], timestamp: float) -> Optional[np.ndarray]:
+        """
+        滤波一帧关键点
+
+        Args:
+            landmarks: (33, 4) 关键点数组，未检测到人体时为 None
+            timestamp: 帧时间（秒）
+
+        Returns:
+            滤波后的 (33, 4) 关键点数组，坐标缺失的关键点保持 NaN；未检测到人体时返回 None
+        """
+        if landmarks is None:
+            self.reset()
+            return None
+
+        result = np.array(landmarks, dtype=np.float32)
+        coords = result[:, :COORDS].astype(np.float64)
+        valid = ~np.isnan(coords).any(axis=1)
+        if not valid.any():
+            self.reset()
+            return None
+
+        if self._last_time is None or timestamp <= self._last_time:
+            self._initialize(coords, result[:, 3])
+        else:
+            result[:, :COORDS] = self._step(coords, result[:, 3], timestamp - self._last_time, valid)
+            result[~valid, :COORDS] = np.nan
+        self._last_time = timestamp
+        return result
+
+    @abstractmethod
+    def _initialize(self, coords: np.ndarray, visibility: np.ndarray):
+        """用第一帧测量值初始化状态，缺失的关键点状态为 NaN"""
+
+    @abstractmethod
+    def _step(self, coords: np.ndarray, visibility: np.ndarray, dt: float, valid: np.ndarray) -> np.ndarray:
+        """
+        推进一帧
+
+        Args:
+            coords: (33, 3) 坐标测量值
+            visibility: (33,) 可见度
+            dt: 距上一帧的时间（秒）
+            valid: (33,) 坐标有效的关键点，其余关键点的状态保持不变
+
+        Returns:
+            (33, 3) 滤波后的坐标
+        """
+
+
+class OneEuroFilter(LandmarkFilter):
+    """
+    one-euro 滤波：速度慢时截止频率低、抑制抖动，速度快时截止频率升高、减少延迟
+    """
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 20.0, d_cutoff: float = 1.0):
+        """
+        初始化滤波器
+
+        Args:
+            min_cutoff: 静止时的截止频率（Hz），越小越平滑
+            beta: 截止频率随速度（归一化坐标/秒）增长的系数，越大快速动作的延迟越小
+            d_cutoff: 速度估计的截止频率（Hz）
+        """
+        super().__init__()
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._value: Optional[np.ndarray] = None
+        self._velocity: Optional[np.ndarray] = None
+
+    def _initialize(self, coords, visibility):
+        self._value = coords
+        self._velocity = np.zeros_like(coords)
+
+    def _step(self, coords, visibility, dt, valid):
+        rows = valid[:, None]
+        fresh = valid & np.isnan(self._value).any(axis=1)
+        velocity = (coords - self._value) / dt
+        alpha_d = _smoothing_factor(np.float64(self.d_cutoff), dt)
+        self._velocity = np.where(rows, alpha_d * velocity + (1.0 - alpha_d) * self._velocity, self._velocity)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._velocity)
+        alpha = _smoothing_factor(cutoff, dt)
+        self._value = np.where(rows, alpha * coords + (1.0 - alpha) * self._value, self._value)
+
+        self._value[fresh] = coords[fresh]
+        self._velocity[fresh] = 0.0
+        return self._value
+
+
+class KalmanFilter(LandmarkFilter):
+    """
+    常速度模型的卡尔曼滤波，每个坐标独立估计位置和速度
+
+    测量噪声按关键点可见度放大，被遮挡的关键点更多依赖预测值。
+    """
+
+    def __init__(self, process_noise: float = 1.0, measurement_noise: float = 2.5e-5):
+        """
+        初始化滤波器
+
+        Args:
+            process_noise: 加速度噪声强度，越大越信任测量值
+            measurement_noise: 可见度为 1 时的测量噪声方差（归一化坐标）
+        """
+        super().__init__()
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self._position: Optional[np.ndarray] = None
+        self._velocity: Optional[np.ndarray] = None
+        # 2x2 协方差矩阵按元素分开保存，全部关键点一起做逐元素运算
+        self._p00 = self._p01 = self._p11 = None
+
+    def _initialize(self, coords, visibility):
+        self._position = coords
+        self._velocity = np.zeros_like(coords)
+        self._p00 = np.full_like(coords, self.measurement_noise)
+        self._p01 = np.zeros_like(coords)
+        self._p11 = np.full_like(coords, 1.0)
+
+    def _step(self, coords, visibility, dt, valid):
+        rows = valid[:, None]
+        fresh = valid & np.isnan(self._position).any(axis=1)
+
+        # 预测：缺失的关键点只做预测，不做更新
+        q = self.process_noise
+        self._position = self._position + self._velocity * dt
+        p00 = self._p00 + dt * (2.0 * self._p01 + dt * self._p11) + q * dt ** 3 / 3.0
+        p01 = self._p01 + dt * self._p11 + q * dt ** 2 / 2.0
+        p11 = self._p11 + q * dt
+
+        # 更新
+        r = self.measurement_noise / np.clip(np.nan_to_num(visibility), 0.05, 1.0)[:, None]
+        innovation = np.where(rows, coords - self._position, 0.0)
+        s = p00 + r
+        k0 = np.where(rows, p00 / s, 0.0)
+        k1 = np.where(rows, p01 / s, 0.0)
+        self._position = self._position + k0 * innovation
+        self._velocity = self._velocity + k1 * innovation
+        self._p00 = (1.0 - k0) * p00
+        self._p01 = (1.0 - k0) * p01
+        self._p11 = p11 - k1 * p01
+
+        self._position[fresh] = coords[fresh]
+        self._velocity[fresh] = 0.0
+        self._p00[fresh] = self.measurement_noise
+        self._p01[fresh] = 0.0
+        self._p11[fresh] = 1.0
+        return self._position
+
+
+def create_filter(kind: str = FILTER_ONE_EURO, **kwargs) -> Optional[LandmarkFilter]:
+    """
+    按名称创建滤波器
+
+    Args:
+        kind: none / one_euro / kalman
+        **kwargs: 传给滤波器的参数
+
+    Returns:
+        滤波器实例，kind 为 none 时返回 None
+    """
+    if kind == FILTER_NONE:
+        return None
+    if kind == FILTER_ONE_EURO:
+        return OneEuroFilter(**kwargs)
+    if kind == FILTER_KALMAN:
+        return KalmanFilter(**kwargs)
+    raise ValueError(f"未知的滤波器类型: {kind}")
+
+
+def filter_track(landmarks: np.ndarray, fps: float, kind: str = FILTER_ONE_EURO, **kwargs) -> np.ndarray:
+    """
+    离线滤波整条轨迹
+
+    与实时循环使用同样的单向滤波，标准轨迹和学员实时数据的延迟特性一致，
+    两边做对齐时不会因为滤波方式不同而产生系统偏差。
+
+    Args:
+        landmarks: (帧数, 33, 4) 关键点数组，未检测到人体的帧为 NaN
+        fps: 轨迹帧率
+        kind: 滤波器类型
+        **kwargs: 传给滤波器的参数
+
+    Returns:
+        滤波后的新数组，缺失帧保持 NaN
+    """
+    landmark_filter = create_filter(kind, **kwargs)
+    result = np.array(landmarks, dtype=np.float32)
+    if landmark_filter is None:
+        return result
+
+    missing = np.isnan(result).all(axis=(1, 2))
+    for index in range(result.shape[0]):
+        frame = None if missing[index] else result[index]
+        filtered = landmark_filter.update(frame, index / fps)
+        if filtered is not None:
+            result[index] = filtered
+    return result
+
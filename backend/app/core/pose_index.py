@@ -0,0 +1,276 @@
+"""
+标准动作的分段索引
+
+课程视频通常是十几分钟的完整套路，学员上传的练习片段只有几秒到几十秒。
+先把标准轨迹切成重叠的短窗口，每个窗口取等间隔的几帧关节角度拼成签名，
+用 k-means 码本把签名量化成码字并建立倒排表。查询时片段的每个窗口找最近的几个码字，
+按"标准窗口位置 - 片段窗口位置"投票，票数集中的位置就是片段对应的乐句起点，
+之后只需在这一小段上做详细的 DTW 比对。
+"""
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .pose_features import feature_matrix
+from .pose_track import open_track
+
+INDEX_SUFFIX = ".pidx"
+INDEX_VERSION = 1
+DEFAULT_WINDOW_SECONDS = 1.0
+DEFAULT_HOP_SECONDS = 0.25
+DEFAULT_CODEBOOK_SIZE = 64
+SIGNATURE_POINTS = 4
+KMEANS_ITERATIONS = 20
+
+
+def window_signatures(
+    features: np.ndarray,
+    window: int,
+    hop: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算滑动窗口签名
+
+    Args:
+        features: (帧数, 8) 特征矩阵
+        window: 窗口长度（帧）
+        hop: 窗口步长（帧）
+
+    Returns:
+        ((窗口数, SIGNATURE_POINTS * 8) 签名, (窗口数,) 窗口起始帧)
+    """
+    n = features.shape[0]
+    last = max(0, n - window)
+    offsets = np.arange(0, last + 1, hop)
+    # 窗口内等间隔取样，超出序列末尾的按最后一帧处理
+    picks = np.rint(np.linspace(0, window - 1, SIGNATURE_POINTS)).astype(np.intp)
+    indices = np.minimum(offsets[:, None] + picks[None, :], n - 1)
+    signatures = np.nan_to_num(features[indices]).reshape(len(offsets), -1)
+    return signatures.astype(np.float32), offsets
+
+
+def _squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) 的平方欧氏距离矩阵"""
+    d = (a * a).sum(axis=1)[:, None] - 2.0 * (a @ b.T) + (b * b).sum(axis=1)[None, :]
+    return np.maximum(d, 0.0)
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    k-means 聚类（k-means++ 初始化），返回 (k, 维度) 聚类中心
+
+    Args:
+        data: (样本数, 维度) 数据
+        k: 聚类数，超过样本数时取样本数
+        iterations: 最大迭代次数
+        seed: 随机种子，固定后同一条轨迹生成的索引完全一致
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, data.shape[0])
+    centroids = np.empty((k, data.shape[1]), dtype=np.float32)
+    centroids[0] = data[rng.integers(data.shape[0])]
+    nearest = _squared_distances(data, centroids[:1])[:, 0]
+    for i in range(1, k):
+        total = nearest.sum()
+        choice = rng.choice(data.shape[0], p=nearest / total) if total > 0 else rng.integers(data.shape[0])
+        centroids[i] = data[choice]
+        nearest = np.minimum(nearest, _squared_distances(data, centroids[i:i + 1])[:, 0])
+
+    labels = None
+    for _ in range(iterations):
+        new_labels = np.argmin(_squared_distances(data, centroids), axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        # 空簇保留原中心
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class SegmentIndex:
+    """
+    标准轨迹的签名索引
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        signatures: np.ndarray,
+        offsets: np.ndarray,
+        codes: np.ndarray,
+        fps: float,
+        window: int,
+        hop: int,
+        length: int
+    ):
+        self.centroids = centroids
+        self.signatures = signatures
+        self.offsets = offsets
+        self.codes = codes
+        self.fps = fps
+        self.window = window
+        self.hop = hop
+        self.length = length
+        # 倒排表：按码字排序后的窗口编号，以及每个码字的起止位置
+        self._postings = np.argsort(codes, kind="stable")
+        self._bounds = np.searchsorted(codes[self._postings], np.arange(len(centroids) + 1))
+
+    @classmethod
+    def build(
+        cls,
+        features: np.ndarray,
+        fps: float,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        hop_seconds: float = DEFAULT_HOP_SECONDS,
+        codebook_size: int = DEFAULT_CODEBOOK_SIZE
+    ) -> "SegmentIndex":
+        """
+        为标准轨迹建立索引
+
+        Args:
+            features: (帧数, 8) 标准动作特征矩阵
+            fps: 轨迹帧率
+            window_seconds: 签名窗口时长（秒）
+            hop_seconds: 窗口步长（秒）
+            codebook_size: 码本大小
+
+        Returns:
+            SegmentIndex 实例
+        """
+        window = max(SIGNATURE_POINTS, int(round(window_seconds * fps)))
+        hop = max(1, int(round(hop_seconds * fps)))
+        signatures, offsets = window_signatures(features, window, hop)
+        centroids = kmeans(signatures, codebook_size)
+        codes = np.argmin(_squared_distances(signatures, centroids), axis=1)
+        return cls(centroids, signatures, offsets, codes, fps, window, hop, features.shape[0])
+
+    def save(self, path: str):
+        """保存索引，先写临时文件再替换，避免读到写了一半的文件"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=INDEX_VERSION,
+                centroids=self.centroids,
+                signatures=self.signatures,
+                offsets=self.offsets,
+                codes=self.codes,
+                meta=np.array([self.fps, self.window, self.hop, self.length], dtype=np.float64),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentIndex":
+        """读取索引文件"""
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"不支持的索引版本: {int(data['version'])}")
+            fps, window, hop, length = data["meta"]
+            return cls(
+                data["centroids"],
+                data["signatures"],
+                data["offsets"],
+                data["codes"],
+                float(fps),
+                int(window),
+                int(hop),
+                int(length),
+            )
+
+    def query(self, features: np.ndarray, top_k: int = 3, probes: int = 3) -> List[Dict[str, Any]]:
+        """
+        查找练习片段在标准轨迹中对应的位置
+
+        Args:
+            features: (帧数, 8) 练习片段特征矩阵，帧率需与标准轨迹一致
+            top_k: 返回的候选数量
+            probes: 每个片段窗口检索的最近码字数量，越大召回越高
+
+        Returns:
+            按签名平均距离从小到大排列的候选列表，包含起止帧、起止时间、票数和距离
+        """
+        query_signatures, query_offsets = window_signatures(features, self.window, self.hop)
+        probes = min(probes, len(self.centroids))
+        nearest = np.argpartition(
+            _squared_distances(query_signatures, self.centroids), probes - 1, axis=1
+        )[:, :probes]
+
+        # 每个 (片段窗口, 码字) 展开成倒排表中的全部标准窗口，一次性投票
+        starts = self._bounds[nearest].ravel()
+        stops = self._bounds[nearest + 1].ravel()
+        sizes = stops - starts
+        if not sizes.sum():
+            return []
+        query_rows = np.repeat(np.repeat(np.arange(len(query_offsets)), probes), sizes)
+        positions = np.repeat(stops - np.cumsum(sizes), sizes) + np.arange(sizes.sum())
+        reference_windows = self._postings[positions]
+        shifts = (self.offsets[reference_windows] - query_offsets[query_rows]) // self.hop
+
+        # 偏移可能为负（片段开头在标准轨迹开始之前），整体平移后计数
+        low = int(shifts.min())
+        votes = np.bincount(shifts - low).astype(np.float64)
+        # 节奏快慢不一致时票数会分散到相邻位置，做一次平滑
+        votes = np.convolve(votes, [0.5, 1.0, 0.5], mode="same")
+
+        # 相邻窗口的码字往往相同，票数会形成一段平台；
+        # 对票数接近最高值的位置逐个计算签名距离，按距离重新排序
+        candidates = np.flatnonzero(votes >= votes.max() * 0.5)
+        shifts = candidates + low
+        windows = shifts[:, None] + query_offsets[None, :] // self.hop
+        inside = (windows >= 0) & (windows < len(self.offsets))
+        diff = self.signatures[np.clip(windows, 0, len(self.offsets) - 1)] - query_signatures[None]
+        distances = np.sqrt((diff * diff).sum(axis=2))
+        coverage = inside.sum(axis=1)
+        mean_distance = np.where(inside, distances, 0.0).sum(axis=1) / np.maximum(coverage, 1)
+        # 片段大部分超出标准轨迹范围的位置不参与排序
+        mean_distance[coverage < len(query_offsets) / 2] = np.inf
+
+        n = features.shape[0]
+        snippet_windows = max(1, n // self.hop)
+        results: List[Dict[str, Any]] = []
+        chosen: List[int] = []
+        for k in np.argsort(mean_distance, kind="stable"):
+            if len(results) >= top_k or not np.isfinite(mean_distance[k]):
+                break
+            # 与已选候选重叠超过半个片段的视为同一位置
+            if any(abs(shifts[k] - shift) < snippet_windows / 2 for shift in chosen):
+                continue
+            chosen.append(int(shifts[k]))
+            start = min(max(0, int(shifts[k]) * self.hop), max(0, self.length - 1))
+            end = min(self.length, start + n)
+            results.append({
+                "start_frame": start,
+                "end_frame": end,
+                "start": round(start / self.fps, 3),
+                "end": round(end / self.fps, 3),
+                "votes": float(votes[candidates[k]]),
+                "distance": round(float(mean_distance[k]), 4),
+            })
+        return results
+
+
+def index_path_for(track_path: str) -> str:
+    """轨迹文件对应的索引文件路径"""
+    return f"{os.path.splitext(track_path)[0]}{INDEX_SUFFIX}"
+
+
+def build_track_index(track_path: str) -> str:
+    """
+    为轨迹文件建立索引并保存在同目录下
+
+    Args:
+        track_path: .pose 轨迹文件路径
+
+    Returns:
+        索引文件路径
+    """
+    with open_track(track_path) as track:
+        index = SegmentIndex.build(feature_matrix(track.frames), track.fps)
+    path = index_path_for(track_path)
+    index.save(path)
+    return path
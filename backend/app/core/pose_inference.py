@@ -0,0 +1,364 @@
+"""
+实时分析共享的姿态推理进程池
+
+固定数量的工作进程各自持有一个预热好的 MediaPipe Pose，所有 WebSocket 会话的
+帧都交给这个进程池处理，CPU 占用由进程数决定而不随连接数增长。
+帧数据通过共享内存槽位传递，管道里只传槽位编号和长度；
+调度时每个会话最多只有一帧在等待、一帧在处理，多个会话之间轮转，慢会话不会被快会话挤占。
+
+每个工作进程使用独立的任务管道和结果管道，进程之间不共享跨进程锁，一个进程在任意时刻
+崩溃都不会卡住其他进程。进程异常退出时，分配给它的帧立即失败、槽位归还，并启动新的进程补位。
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing as mp
+import threading
+from collections import deque
+from multiprocessing.connection import Connection, wait as wait_objects
+from multiprocessing.shared_memory import SharedMemory
+from typing import Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOT_SIZE = 2 * 1024 * 1024
+DEFAULT_TIMEOUT = 5.0
+# 每个工作进程同时分配的帧数：处理当前帧时下一帧已经就绪
+FRAMES_PER_WORKER = 2
+
+
+def _worker_main(shm_name: str, slot_size: int, jobs: Connection, results: Connection, model_complexity: int):
+    """工作进程入口：加载模型后循环处理槽位中的帧"""
+    import cv2
+    import mediapipe
+
+    from .pose_track import landmarks_to_array
+
+    cv2.setNumThreads(1)
+    # 子进程与主进程共用同一个资源跟踪器，共享内存统一由主进程回收
+    shm = SharedMemory(name=shm_name)
+    # 进程池被多个会话共用，帧之间没有连续性，使用静态图像模式避免跨会话复用跟踪状态
+    pose = mediapipe.solutions.pose.Pose(
+        static_image_mode=True,
+        model_complexity=model_complexity,
+        min_detection_confidence=0.5
+    )
+    try:
+        while True:
+            try:
+                job = jobs.recv()
+            except EOFError:
+                # 主进程已关闭管道
+                break
+            if job is None:
+                break
+            job_id, slot, length = job
+            try:
+                start = slot * slot_size
+                buffer = np.frombuffer(shm.buf, dtype=np.uint8, count=length, offset=start)
+                image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+                del buffer
+                if image is None:
+                    raise ValueError("无法解码图像帧")
+                output = pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                landmarks = None
+                if output.pose_landmarks is not None:
+                    landmarks = landmarks_to_array(output.pose_landmarks)
+                results.send((job_id, slot, landmarks, None))
+            except Exception as e:
+                results.send((job_id, slot, None, str(e)))
+    finally:
+        pose.close()
+        shm.close()
+
+
+class _Worker:
+    """工作进程及其专用管道，记录已分配给它、尚未返回结果的帧"""
+
+    def __init__(self, process: mp.Process, jobs: Connection, results: Connection):
+        self.process = process
+        self.jobs = jobs
+        self.results = results
+        self.job_ids: Set[int] = set()
+
+    def close(self):
+        self.jobs.close()
+        self.results.close()
+
+
+class PoseInferencePool:
+    """
+    共享姿态推理进程池
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        slot_size: int = DEFAULT_SLOT_SIZE,
+        model_complexity: int = 0,
+        timeout: float = DEFAULT_TIMEOUT
+    ):
+        """
+        初始化进程池（调用 start 后才会启动进程）
+
+        Args:
+            workers: 工作进程数
+            slot_size: 每个共享内存槽位的字节数，即单帧编码数据的上限
+            model_complexity: Pose 模型复杂度
+            timeout: 单帧推理的最长等待时间（秒）
+        """
+        self.workers = workers
+        self.slot_size = slot_size
+        self.model_complexity = model_complexity
+        self.timeout = timeout
+        self.slot_count = workers * FRAMES_PER_WORKER
+
+        self._ctx = mp.get_context("spawn")
+        self._shm: Optional[SharedMemory] = None
+        self._workers: List[_Worker] = []
+        self._reader: Optional[threading.Thread] = None
+        # 替换工作进程或停止时唤醒读取线程，让它重新收集要等待的对象
+        self._wakeup: Optional[Tuple[Connection, Connection]] = None
+        self._stopping = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._job_ids = itertools.count()
+        self._free_slots: List[int] = []
+        self._pending: Dict[Hashable, Tuple[bytes, asyncio.Future]] = {}
+        self._order: Deque[Hashable] = deque()
+        # 帧ID -> (会话, future, 槽位, 工作进程序号)
+        self._inflight: Dict[int, Tuple[Hashable, asyncio.Future, int, int]] = {}
+        self._busy_sessions: Set[Hashable] = set()
+        self.coalesced = 0
+        self.restarts = 0
+
+    @property
+    def started(self) -> bool:
+        return self._shm is not None
+
+    async def start(self):
+        """创建共享内存并启动工作进程"""
+        if self.started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._shm = SharedMemory(create=True, size=self.slot_size * self.slot_count)
+        self._free_slots = list(range(self.slot_count))
+        self._stopping = False
+        self._wakeup = self._ctx.Pipe(duplex=False)
+        self._workers = [self._spawn(index) for index in range(self.workers)]
+        self._reader = threading.Thread(target=self._read_results, name="pose-results", daemon=True)
+        self._reader.start()
+        logger.info(f"Pose inference pool started with {self.workers} workers")
+
+    def _spawn(self, index: int) -> _Worker:
+        job_reader, job_writer = self._ctx.Pipe(duplex=False)
+        result_reader, result_writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._shm.name, self.slot_size, job_reader, result_writer, self.model_complexity),
+            name=f"pose-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        # 子进程已持有各自的一端，主进程关闭副本，子进程退出后这边才能读到 EOF
+        job_reader.close()
+        result_writer.close()
+        return _Worker(process, job_writer, result_reader)
+
+    async def stop(self):
+        """停止工作进程并释放共享内存"""
+        if not self.started:
+            return
+        self._stopping = True
+        for worker in self._workers:
+            try:
+                worker.jobs.send(None)
+            except OSError:
+                pass
+        await asyncio.get_running_loop().run_in_executor(None, self._join_processes)
+        self._wakeup[1].send(None)
+        self._reader.join(timeout=1.0)
+        for worker in self._workers:
+            worker.close()
+        for connection in self._wakeup:
+            connection.close()
+        self._wakeup = None
+
+        for _, future in self._pending.values():
+            future.cancel()
+        for _, future, _, _ in self._inflight.values():
+            future.cancel()
+        self._pending.clear()
+        self._order.clear()
+        self._inflight.clear()
+        self._busy_sessions.clear()
+
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        self._workers = []
+        logger.info("Pose inference pool stopped")
+
+    def _join_processes(self):
+        for worker in self._workers:
+            worker.process.join(timeout=5.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def _read_results(self):
+        """后台线程：等待各进程的结果和退出事件并交回事件循环"""
+        wakeup = self._wakeup[0]
+        exited: Set[_Worker] = set()
+        while not self._stopping:
+            workers = [worker for worker in self._workers if worker not in exited]
+            waiting = [wakeup]
+            for worker in workers:
+                waiting.extend((worker.results, worker.process.sentinel))
+            ready = wait_objects(waiting)
+            if self._stopping:
+                break
+            if wakeup in ready:
+                wakeup.recv()
+            for worker in workers:
+                dead = worker.process.sentinel in ready
+                # 先读完已返回的结果再处理退出，已完成的帧不会被当成失败
+                if dead or worker.results in ready:
+                    self._drain(worker)
+                if dead:
+                    exited.add(worker)
+                    self._loop.call_soon_threadsafe(self._on_worker_exit, worker)
+
+    def _drain(self, worker: _Worker):
+        try:
+            while worker.results.poll():
+                self._loop.call_soon_threadsafe(self._on_result, worker.results.recv())
+        except (EOFError, OSError):
+            # 进程已退出，或崩溃时只写了半条消息
+            pass
+
+    def _on_worker_exit(self, worker: _Worker):
+        if self._stopping or worker not in self._workers:
+            return
+        index = self._workers.index(worker)
+        # 哨兵就绪时进程已退出，回收后才能取到退出码
+        worker.process.join(timeout=1.0)
+        logger.error(f"Pose worker {worker.process.name} exited with code {worker.process.exitcode}, restarting")
+        worker.close()
+        self._workers[index] = self._spawn(index)
+        self.restarts += 1
+        self._wakeup[1].send(None)
+
+        # 分配给该进程的帧不会再有结果，立即失败并归还槽位
+        for job_id in worker.job_ids:
+            session_id, future, slot, _ = self._inflight.pop(job_id)
+            self._free_slots.append(slot)
+            self._busy_sessions.discard(session_id)
+            if not future.done():
+                future.set_exception(RuntimeError("姿态推理进程异常退出"))
+        worker.job_ids.clear()
+        self._pump()
+
+    def _on_result(self, message):
+        job_id, slot, landmarks, error = message
+        inflight = self._inflight.pop(job_id, None)
+        if inflight is None:
+            return
+        session_id, future, _, index = inflight
+        self._workers[index].job_ids.discard(job_id)
+        self._free_slots.append(slot)
+        self._busy_sessions.discard(session_id)
+        if not future.done():
+            if error:
+                future.set_exception(ValueError(error))
+            else:
+                future.set_result(landmarks)
+        self._pump()
+
+    def _pump(self):
+        """把等待中的帧分配到空闲槽位，按会话轮转"""
+        skipped = 0
+        while self._free_slots and self._order and skipped < len(self._order):
+            session_id = self._order.popleft()
+            if session_id in self._busy_sessions:
+                # 该会话已有一帧在处理，放到队尾等下一轮
+                self._order.append(session_id)
+                skipped += 1
+                continue
+            skipped = 0
+            frame, future = self._pending.pop(session_id)
+            if future.done():
+                continue
+
+            slot = self._free_slots.pop()
+            start = slot * self.slot_size
+            self._shm.buf[start:start + len(frame)] = frame
+            job_id = next(self._job_ids)
+            # 交给已分配帧最少的进程；槽位总数等于各进程容量之和，有空闲槽位就有进程可用
+            index = min(range(len(self._workers)), key=lambda i: len(self._workers[i].job_ids))
+            worker = self._workers[index]
+            self._inflight[job_id] = (session_id, future, slot, index)
+            worker.job_ids.add(job_id)
+            self._busy_sessions.add(session_id)
+            try:
+                worker.jobs.send((job_id, slot, len(frame)))
+            except OSError:
+                # 进程刚退出、尚未处理退出事件，这一帧由 _on_worker_exit 统一失败
+                pass
+
+    async def estimate(self, session_id: Hashable, frame: bytes) -> Optional[np.ndarray]:
+        """
+        提交一帧编码图像并等待关键点
+
+        同一会话还有未开始处理的帧时，旧帧直接被新帧替换并返回 None。
+
+        Args:
+            session_id: 会话标识
+            frame: 编码后的图像数据
+
+        Returns:
+            (33, 4) 关键点数组，未检测到人体或帧被替换时返回 None
+        """
+        if not self.started:
+            raise RuntimeError("姿态推理进程池尚未启动")
+        if len(frame) > self.slot_size:
+            raise ValueError(f"帧数据超过 {self.slot_size} 字节上限")
+
+        future = self._loop.create_future()
+        previous = self._pending.get(session_id)
+        if previous is not None:
+            self.coalesced += 1
+            if not previous[1].done():
+                previous[1].set_result(None)
+        else:
+            self._order.append(session_id)
+        self._pending[session_id] = (frame, future)
+        self._pump()
+        return await asyncio.wait_for(future, self.timeout)
+
+    def release(self, session_id: Hashable):
+        """会话结束时丢弃其等待中的帧"""
+        pending = self._pending.pop(session_id, None)
+        if pending is not None:
+            self._order.remove(session_id)
+            pending[1].cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """返回进程池当前状态"""
+        return {
+            "workers": self.workers,
+            "free_slots": len(self._free_slots),
+            "pending_sessions": len(self._pending),
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "restarts": self.restarts,
+        }
+
+
+pose_inference_pool = PoseInferencePool(
+    workers=settings.POSE_WORKERS,
+    slot_size=settings.POSE_SLOT_SIZE
+)
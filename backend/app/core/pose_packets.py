@@ -0,0 +1,84 @@
+"""
+实时分析的关键点数据包
+
+客户端在本地完成姿态估计后，把多帧关键点量化为 int16 打包发送，
+服务端无需解码图像即可直接评分。数据包格式（小端序）：
+
+    文件头 8 字节: magic "PLMK" | 版本 u8 | 帧数 u8 | 保留 u16
+    每帧 268 字节: 时间戳毫秒 u32 | 33 x (x, y, z, visibility) int16
+
+坐标按 QUANT_SCALE 缩放后取整，第 0 个关键点的 x 为 MISSING 时表示该帧未检测到人体。
+"""
+import struct
+from typing import Tuple
+
+import numpy as np
+
+from .pose_track import CHANNELS, NUM_LANDMARKS
+
+PACKET_MAGIC = b"PLMK"
+PACKET_VERSION = 1
+QUANT_SCALE = 10000.0
+MISSING = -32768
+MAX_FRAMES_PER_PACKET = 255
+
+_HEADER = struct.Struct("<4sBBH")
+FRAME_DTYPE = np.dtype([
+    ("timestamp", "<u4"),
+    ("landmarks", "<i2", (NUM_LANDMARKS, CHANNELS)),
+])
+
+
+def is_landmark_packet(data: bytes) -> bool:
+    """判断收到的二进制消息是否为关键点数据包"""
+    return data[:4] == PACKET_MAGIC
+
+
+def encode_packet(landmarks: np.ndarray, timestamps: np.ndarray) -> bytes:
+    """
+    将多帧关键点编码为数据包
+
+    Args:
+        landmarks: (帧数, 33, 4) 关键点数组，未检测到人体的帧全部为 NaN
+        timestamps: (帧数,) 毫秒时间戳
+
+    Returns:
+        数据包字节串
+    """
+    count = landmarks.shape[0]
+    if count > MAX_FRAMES_PER_PACKET:
+        raise ValueError(f"单个数据包最多包含 {MAX_FRAMES_PER_PACKET} 帧")
+
+    frames = np.zeros(count, dtype=FRAME_DTYPE)
+    frames["timestamp"] = np.asarray(timestamps, dtype=np.int64) & 0xFFFFFFFF
+    missing = np.isnan(landmarks).all(axis=(1, 2))
+    quantized = np.clip(np.rint(np.nan_to_num(landmarks) * QUANT_SCALE), MISSING + 1, 32767)
+    frames["landmarks"] = quantized.astype(np.int16)
+    frames["landmarks"][missing, 0, 0] = MISSING
+    return _HEADER.pack(PACKET_MAGIC, PACKET_VERSION, count, 0) + frames.tobytes()
+
+
+def decode_packet(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    解码关键点数据包
+
+    Args:
+        data: 数据包字节串
+
+    Returns:
+        ((帧数,) 毫秒时间戳, (帧数, 33, 4) float32 关键点，未检测到人体的帧为 NaN)
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("关键点数据包不完整")
+    magic, version, count, _ = _HEADER.unpack_from(data)
+    if magic != PACKET_MAGIC:
+        raise ValueError("不是关键点数据包")
+    if version != PACKET_VERSION:
+        raise ValueError(f"不支持的数据包版本: {version}")
+    if len(data) != _HEADER.size + count * FRAME_DTYPE.itemsize:
+        raise ValueError("关键点数据包长度与帧数不符")
+
+    frames = np.frombuffer(data, dtype=FRAME_DTYPE, count=count, offset=_HEADER.size)
+    landmarks = frames["landmarks"].astype(np.float32) / np.float32(QUANT_SCALE)
+    landmarks[frames["landmarks"][:, 0, 0] == MISSING] = np.nan
+    return frames["timestamp"].astype(np.int64), landmarks
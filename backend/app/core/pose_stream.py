@@ -0,0 +1,294 @@
+"""
+实时姿态流的增量评分
+
+StreamingScorer 保存最近一段时间的姿态，并用在线 DTW 逐帧推进与课程标准
+动作的对齐位置；RealtimeSession 负责单个 WebSocket 连接的帧合并与定频推送。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .pose_dtw import accumulate_row, error_to_score
+from .pose_features import JOINT_NAMES, joint_angles, symmetry_index
+from .pose_filter import LandmarkFilter
+from .pose_track import CHANNELS, NUM_LANDMARKS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM_FPS = 30.0
+DEFAULT_WINDOW_SECONDS = 3.0
+DEFAULT_SEARCH_SECONDS = 5.0
+DEFAULT_EMIT_INTERVAL = 0.5
+# 客户端关键点等待评分的最多帧数，超过时丢弃最早的帧
+DEFAULT_MAX_PENDING_LANDMARKS = 255
+
+
+class StreamingScorer:
+    """
+    单个学员的增量评分器
+
+    每来一帧只计算一行 DTW 累计代价：锁定位置之前在整条标准轨迹上搜索，
+    锁定之后只在当前位置附近 search_seconds 的范围内推进。
+    """
+
+    def __init__(
+        self,
+        reference: Optional[np.ndarray] = None,
+        reference_fps: float = DEFAULT_STREAM_FPS,
+        fps: float = DEFAULT_STREAM_FPS,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        search_seconds: float = DEFAULT_SEARCH_SECONDS,
+        landmark_filter: Optional[LandmarkFilter] = None
+    ):
+        """
+        初始化评分器
+
+        Args:
+            reference: (m, 8) 标准动作特征矩阵，为空时只输出姿态统计不评分
+            reference_fps: 标准轨迹帧率
+            fps: 输入流的估计帧率，只用于换算滑动窗口的帧数
+            window_seconds: 滑动窗口时长（秒）
+            search_seconds: 锁定后在当前位置前后搜索的范围（秒）
+            landmark_filter: 关键点滤波器，为空时直接使用原始关键点
+        """
+        self.reference = reference
+        self.reference_fps = reference_fps
+        self.fps = fps
+        self._filter = landmark_filter
+        window = max(1, int(round(window_seconds * fps)))
+        self._poses = np.full((window, NUM_LANDMARKS, CHANNELS), np.nan, dtype=np.float32)
+        self._errors = np.full((window, len(JOINT_NAMES)), np.nan, dtype=np.float32)
+        self._cursor = 0
+        self._lock_frames = window
+        self.frames = 0
+        self.missing_frames = 0
+        self.version = 0
+
+        self.position: Optional[int] = None
+        if reference is not None:
+            self._search = max(1, int(round(search_seconds * reference_fps)))
+            # 开放起点：学员可以从标准动作的任意位置开始跟练
+            self._row = np.zeros(reference.shape[0], dtype=np.float64)
+            self._row_range = (0, reference.shape[0])
+
+    def update(self, landmarks: Optional[np.ndarray], timestamp: Optional[float] = None):
+        """
+        推入一帧关键点
+
+        Args:
+            landmarks: (33, 4) 关键点数组，未检测到人体时为 None
+            timestamp: 帧时间（秒），为空时使用当前时间；实时流的帧率不固定，滤波按实际间隔计算
+        """
+        self.frames += 1
+        self.version += 1
+        slot = self._cursor
+        self._cursor = (self._cursor + 1) % self._poses.shape[0]
+
+        if self._filter is not None:
+            landmarks = self._filter.update(landmarks, time.monotonic() if timestamp is None else timestamp)
+        if landmarks is None:
+            self.missing_frames += 1
+            self._poses[slot] = np.nan
+            self._errors[slot] = np.nan
+            return
+
+        self._poses[slot] = landmarks
+        features = joint_angles(landmarks) / np.float32(180.0)
+        if self.reference is None or np.isnan(features).all():
+            self._errors[slot] = np.nan
+            return
+        self._advance(features)
+        self._errors[slot] = np.abs(features - self.reference[self.position]) * 180.0
+
+    def _advance(self, features: np.ndarray):
+        """用一帧特征推进在线 DTW"""
+        m = self.reference.shape[0]
+        if self.position is None or self.frames <= self._lock_frames:
+            start, stop = 0, m
+        else:
+            start = max(0, self.position - self._search)
+            stop = min(m, self.position + self._search + 1)
+
+        # 只在可见的关节上计算距离，并按可见比例放大
+        valid = ~np.isnan(features)
+        diff = self.reference[start:stop, valid] - features[valid]
+        cost = np.sqrt(np.sum(diff * diff, axis=1, dtype=np.float64) * (valid.size / valid.sum()))
+
+        prev = self._row
+        diag = np.empty(stop - start, dtype=np.float64)
+        diag[0] = prev[start - 1] if start > 0 else np.inf
+        diag[1:] = prev[start:stop - 1]
+        row = accumulate_row(cost, np.minimum(diag, prev[start:stop]))
+
+        # 减去最小值防止累计代价无限增长，不影响相对比较
+        best = int(np.argmin(row))
+        row -= row[best]
+        old_start, old_stop = self._row_range
+        prev[old_start:old_stop] = np.inf
+        prev[start:stop] = row
+        self._row_range = (start, stop)
+        self.position = start + best
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前滑动窗口内的评分结果"""
+        result: Dict[str, Any] = {
+            "type": "feedback",
+            "frames": self.frames,
+            "missing_frames": self.missing_frames,
+        }
+        sym = symmetry_index(joint_angles(self._poses))
+        if not np.isnan(sym).all():
+            result["symmetry"] = round(float(np.nanmean(sym)), 3)
+
+        if self.position is not None:
+            valid = ~np.isnan(self._errors)
+            counts = valid.sum(axis=0)
+            joint_error = np.where(valid, self._errors, 0.0).sum(axis=0) / np.maximum(counts, 1)
+            scored = counts > 0
+            result["position"] = round(self.position / self.reference_fps, 2)
+            result["joint_errors"] = {
+                name: round(float(err), 1)
+                for name, err, ok in zip(JOINT_NAMES, joint_error, scored) if ok
+            }
+            if scored.any():
+                result["score"] = round(float(error_to_score(joint_error[scored].mean())), 1)
+        return result
+
+
+class RealtimeSession:
+    """
+    单个实时分析连接的会话
+
+    接收端只保留最新的一帧，处理跟不上时旧帧直接被覆盖；客户端关键点按批排队，
+    超过 max_pending_landmarks 帧时丢弃最早的帧。两种输入都在处理循环中评分，不占用接收循环；
+    推送端按固定间隔发送最新评分，客户端较慢时中间结果被合并而不会排队。
+    """
+
+    def __init__(
+        self,
+        scorer: StreamingScorer,
+        estimate: Callable[[bytes], Awaitable[Optional[np.ndarray]]],
+        emit_interval: float = DEFAULT_EMIT_INTERVAL,
+        on_close: Optional[Callable[[], None]] = None,
+        max_pending_landmarks: int = DEFAULT_MAX_PENDING_LANDMARKS
+    ):
+        """
+        初始化会话
+
+        Args:
+            scorer: 增量评分器
+            estimate: 将收到的帧数据转换为 (33, 4) 关键点的协程函数
+            emit_interval: 推送间隔（秒）
+            on_close: 会话关闭时的回调，用于释放推理资源
+            max_pending_landmarks: 等待评分的客户端关键点帧数上限
+        """
+        self.scorer = scorer
+        self._estimate = estimate
+        self.emit_interval = emit_interval
+        self._on_close = on_close
+        # (帧数据, 收到的时间)
+        self._pending: Optional[Tuple[bytes, float]] = None
+        # (关键点, 时间戳)
+        self._pending_landmarks: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.max_pending_landmarks = max_pending_landmarks
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.coalesced = 0
+
+    def submit(self, frame: bytes):
+        """提交一帧数据，未处理的旧帧会被覆盖"""
+        self.received += 1
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = (frame, time.monotonic())
+        self._ready.set()
+
+    def submit_landmarks(self, landmarks: np.ndarray, timestamps: np.ndarray):
+        """
+        提交客户端已经估计好的多帧关键点，跳过图像推理，由处理循环评分
+
+        Args:
+            landmarks: (帧数, 33, 4) 关键点数组，未检测到人体的帧为 NaN
+            timestamps: (帧数,) 客户端采集时间（秒）
+        """
+        self.received += landmarks.shape[0]
+        if self._pending_landmarks is not None:
+            landmarks = np.concatenate([self._pending_landmarks[0], landmarks])
+            timestamps = np.concatenate([self._pending_landmarks[1], timestamps])
+        excess = landmarks.shape[0] - self.max_pending_landmarks
+        if excess > 0:
+            self.coalesced += excess
+            landmarks, timestamps = landmarks[excess:], timestamps[excess:]
+        self._pending_landmarks = (landmarks, timestamps)
+        self._ready.set()
+
+    def _score_landmarks(self, landmarks: np.ndarray, timestamps: np.ndarray):
+        missing = np.isnan(landmarks).all(axis=(1, 2))
+        for frame, timestamp, is_missing in zip(landmarks, timestamps, missing):
+            self.scorer.update(None if is_missing else frame, float(timestamp))
+
+    async def _process_loop(self):
+        while not self._closed:
+            await self._ready.wait()
+            self._ready.clear()
+            batch, self._pending_landmarks = self._pending_landmarks, None
+            if batch is not None:
+                self._score_landmarks(*batch)
+                # 整批评分后让出事件循环，接收循环可以继续收包
+                await asyncio.sleep(0)
+            pending, self._pending = self._pending, None
+            if pending is None:
+                continue
+            frame, received_at = pending
+            try:
+                landmarks = await self._estimate(frame)
+            except Exception as e:
+                logger.warning(f"Realtime frame estimation failed: {e}")
+                continue
+            # 滤波使用收到帧的时间，推理排队的耗时不会被当成两帧之间的间隔
+            self.scorer.update(landmarks, received_at)
+
+    async def _emit_loop(self, send: Callable[[Dict[str, Any]], Awaitable[None]]):
+        last_version = -1
+        while not self._closed:
+            started = time.monotonic()
+            if self.scorer.version != last_version:
+                last_version = self.scorer.version
+                message = self.scorer.snapshot()
+                message["received"] = self.received
+                message["coalesced"] = self.coalesced
+                await send(message)
+            # 发送耗时计入间隔，慢客户端不会让推送越积越多
+            await asyncio.sleep(max(0.0, self.emit_interval - (time.monotonic() - started)))
+
+    async def run(self, send: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """
+        运行处理与推送循环，直到会话关闭
+
+        Args:
+            send: 发送 JSON 消息的协程函数
+        """
+        tasks = [
+            asyncio.create_task(self._process_loop()),
+            asyncio.create_task(self._emit_loop(send)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        """关闭会话"""
+        if self._closed:
+            return
+        self._closed = True
+        self._ready.set()
+        if self._on_close:
+            self._on_close()
@@ -0,0 +1,223 @@
+"""
+姿态关键点轨迹的二进制存储格式
+
+文件由 64 字节定长文件头和紧随其后的 float32 数据区组成，数据区按
+(帧数, 33 个关键点, (x, y, z, visibility)) 的 C 顺序连续存放，
+可以直接用 numpy.memmap 映射，按时间窗口切片时只读取对应的页。
+"""
+import hashlib
+import os
+import struct
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+
+NUM_LANDMARKS = 33
+CHANNELS = 4  # x, y, z, visibility
+TRACK_DTYPE = np.dtype("<f4")
+TRACK_SUFFIX = ".pose"
+
+MAGIC = b"POSETRK1"
+VERSION = 1
+# magic, version, 关键点数, 通道数, 保留, 帧数, fps, 保留, 源文件sha256
+_HEADER = struct.Struct("<8sHHHHQf4x32s")
+HEADER_SIZE = 64
+_FRAME_COUNT_OFFSET = 16
+
+assert _HEADER.size == HEADER_SIZE
+
+
+def landmarks_to_array(pose_landmarks) -> np.ndarray:
+    """将 MediaPipe 关键点转换为 (33, 4) 数组，未检测到人体时填充 NaN"""
+    if pose_landmarks is None:
+        return np.full((NUM_LANDMARKS, CHANNELS), np.nan, dtype=TRACK_DTYPE)
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+        dtype=TRACK_DTYPE
+    )
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> bytes:
+    """流式计算文件的 SHA-256 摘要"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _pack_header(frame_count: int, fps: float, source_hash: bytes) -> bytes:
+    if len(source_hash) not in (0, 32):
+        raise ValueError("源文件哈希必须是32字节的SHA-256摘要")
+    return _HEADER.pack(
+        MAGIC, VERSION, NUM_LANDMARKS, CHANNELS, 0,
+        frame_count, fps, source_hash.ljust(32, b"\0")
+    )
+
+
+class PoseTrack:
+    """
+    只读的关键点轨迹，数据区通过 numpy.memmap 按需加载
+    """
+
+    def __init__(self, path: str):
+        """
+        打开轨迹文件
+
+        Args:
+            path: 轨迹文件路径
+        """
+        with open(path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_SIZE:
+            raise ValueError(f"轨迹文件头不完整: {path}")
+
+        magic, version, num_landmarks, channels, _, frame_count, fps, source_hash = _HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise ValueError(f"不是有效的姿态轨迹文件: {path}")
+        if version != VERSION:
+            raise ValueError(f"不支持的轨迹文件版本: {version}")
+        if (num_landmarks, channels) != (NUM_LANDMARKS, CHANNELS):
+            raise ValueError(f"不支持的关键点布局: {num_landmarks}x{channels}")
+
+        # 写入中断时文件头里的帧数可能没有更新，以实际数据长度为准
+        frame_bytes = NUM_LANDMARKS * CHANNELS * TRACK_DTYPE.itemsize
+        available = (os.path.getsize(path) - HEADER_SIZE) // frame_bytes
+        frame_count = min(frame_count, available) if frame_count else available
+
+        self.path = path
+        self.fps = float(fps)
+        self.source_hash = source_hash if source_hash.strip(b"\0") else b""
+        if frame_count:
+            self.frames = np.memmap(
+                path,
+                dtype=TRACK_DTYPE,
+                mode="r",
+                offset=HEADER_SIZE,
+                shape=(frame_count, NUM_LANDMARKS, CHANNELS)
+            )
+        else:
+            self.frames = np.empty((0, NUM_LANDMARKS, CHANNELS), dtype=TRACK_DTYPE)
+
+    def __len__(self) -> int:
+        return self.frames.shape[0]
+
+    @property
+    def duration(self) -> float:
+        """轨迹时长（秒）"""
+        return len(self) / self.fps if self.fps > 0 else 0.0
+
+    def window(self, start: float, end: Optional[float] = None) -> np.ndarray:
+        """
+        按时间窗口切片，返回的是映射视图，不会复制数据
+
+        Args:
+            start: 开始时间（秒）
+            end: 结束时间（秒），为空时到轨迹末尾
+
+        Returns:
+            (帧数, 33, 4) 数组视图
+        """
+        first = max(0, int(round(start * self.fps)))
+        last = len(self) if end is None else min(len(self), int(round(end * self.fps)))
+        return self.frames[first:max(first, last)]
+
+    def close(self):
+        """释放内存映射"""
+        mmap = getattr(self.frames, "_mmap", None)
+        self.frames = np.empty((0, NUM_LANDMARKS, CHANNELS), dtype=TRACK_DTYPE)
+        if mmap is not None:
+            mmap.close()
+
+    def __enter__(self) -> "PoseTrack":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TrackWriter:
+    """
+    逐帧追加写入轨迹文件，内存占用与轨迹长度无关
+
+    先写入临时文件，关闭时回填帧数并原子替换为目标文件。
+    """
+
+    def __init__(self, path: str, fps: float, source_hash: bytes = b""):
+        """
+        创建轨迹写入器
+
+        Args:
+            path: 目标文件路径
+            fps: 帧率
+            source_hash: 源视频的 SHA-256 摘要
+        """
+        self.path = path
+        self.frame_count = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file: Optional[BinaryIO] = open(self._tmp_path, "wb")
+        self._file.write(_pack_header(0, fps, source_hash))
+
+    def append(self, landmarks: np.ndarray):
+        """
+        追加一帧或多帧关键点
+
+        Args:
+            landmarks: (33, 4) 或 (帧数, 33, 4) 数组
+        """
+        data = np.ascontiguousarray(landmarks, dtype=TRACK_DTYPE)
+        if data.shape[-2:] != (NUM_LANDMARKS, CHANNELS):
+            raise ValueError(f"关键点数组形状错误: {data.shape}")
+        self._file.write(data.tobytes())
+        self.frame_count += 1 if data.ndim == 2 else data.shape[0]
+
+    def close(self):
+        """回填帧数并落盘"""
+        if self._file is None:
+            return
+        self._file.seek(_FRAME_COUNT_OFFSET)
+        self._file.write(struct.pack("<Q", self.frame_count))
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> "TrackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_track(
+    path: str,
+    landmarks: np.ndarray,
+    fps: float,
+    source_hash: bytes = b""
+):
+    """
+    一次性写入完整轨迹
+
+    Args:
+        path: 目标文件路径
+        landmarks: (帧数, 33, 4) 数组
+        fps: 帧率
+        source_hash: 源视频的 SHA-256 摘要
+    """
+    with TrackWriter(path, fps, source_hash) as writer:
+        writer.append(landmarks.reshape(-1, NUM_LANDMARKS, CHANNELS))
+
+
+def open_track(path: Union[str, os.PathLike]) -> PoseTrack:
+    """打开轨迹文件"""
+    return PoseTrack(os.fspath(path))
@@ -0,0 +1,259 @@
+"""
+AI 分析结果缓存
+
+以上传内容的 SHA-256 和模型版本作为键：同一段视频刷新页面或重试时直接返回已有结果，
+不再占用推理服务器的 GPU。缓存分两级：
+进程内 LRU 保存最近的结果；磁盘上每个结果一个 JSON 文件，总大小超过上限时
+按最近访问时间淘汰最旧的文件，服务重启后缓存仍然有效。
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ContentHasher:
+    """
+    增量计算上传内容的哈希，数据可以分块送入，不需要整体放在内存中
+    """
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk: bytes):
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+
+    def key(self, model_version: str) -> str:
+        """由内容哈希和模型版本生成缓存键，模型升级后旧结果自动失效"""
+        return hashlib.sha256(
+            f"{self._sha256.hexdigest()}:{model_version}".encode("utf-8")
+        ).hexdigest()
+
+
+def iter_file(file: BinaryIO, chunk_size: int = HASH_CHUNK_SIZE) -> Iterator[bytes]:
+    """从当前位置分块读取文件直到结尾"""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def file_key(file: BinaryIO, model_version: str) -> str:
+    """
+    分块读取文件计算缓存键，完成后把读取位置恢复到开头，文件随后可以直接上传
+
+    Args:
+        file: 支持 seek 的二进制文件对象，如 UploadFile.file
+        model_version: 模型版本
+
+    Returns:
+        十六进制缓存键
+    """
+    file.seek(0)
+    try:
+        return content_key(iter_file(file), model_version)
+    finally:
+        file.seek(0)
+
+
+@lru_cache(maxsize=256)
+def _cached_path_key(path: str, mtime_ns: int, size: int, model_version: str) -> str:
+    with open(path, "rb") as f:
+        return file_key(f, model_version)
+
+
+def path_key(path: str, model_version: str) -> str:
+    """
+    计算磁盘文件的缓存键，按路径、修改时间和大小缓存
+
+    课程标准视频等长期存在的文件每次对比都会参与计算，缓存后不必每次重新读取整个文件。
+
+    Args:
+        path: 文件路径
+        model_version: 模型版本
+
+    Returns:
+        十六进制缓存键
+    """
+    stat = os.stat(path)
+    return _cached_path_key(os.path.realpath(path), stat.st_mtime_ns, stat.st_size, model_version)
+
+
+def content_key(data: Union[bytes, Iterable[bytes]], model_version: str) -> str:
+    """
+    计算内容的缓存键
+
+    Args:
+        data: 完整字节串，或按块产出字节串的可迭代对象
+        model_version: 模型版本
+
+    Returns:
+        十六进制缓存键
+    """
+    hasher = ContentHasher()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), HASH_CHUNK_SIZE):
+            hasher.update(view[start:start + HASH_CHUNK_SIZE])
+    else:
+        for chunk in data:
+            hasher.update(chunk)
+    return hasher.key(model_version)
+
+
+class ResultCache:
+    """
+    内存 LRU + 磁盘两级结果缓存
+    """
+
+    def __init__(self, directory: Optional[str], max_disk_bytes: int, memory_items: int = 128):
+        """
+        初始化缓存
+
+        Args:
+            directory: 磁盘缓存目录，为空时只使用内存缓存
+            max_disk_bytes: 磁盘缓存总大小上限（字节）
+            memory_items: 内存中保留的结果数量
+        """
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._disk_bytes: Optional[int] = None
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        # 按前两位分子目录，避免单个目录下文件过多
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存
+
+        Returns:
+            结果的副本，未命中时返回 None
+        """
+        value = self._memory.get(key)
+        if value is None and self.directory:
+            value = await asyncio.to_thread(self._read_disk, key)
+            if value is not None:
+                self._remember(key, value)
+        elif value is not None:
+            self._memory.move_to_end(key)
+
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # 返回副本，调用方修改结果不会污染缓存
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        """写入缓存"""
+        value = copy.deepcopy(value)
+        self._remember(key, value)
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._write_disk, key, value)
+            except OSError as e:
+                # 磁盘缓存只是加速手段，写失败不影响本次结果
+                logger.warning(f"Failed to write analysis cache {key}: {e}")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            # 更新访问时间，淘汰时按访问时间排序
+            os.utime(path, None)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable analysis cache {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        # 同一个键可能被多个进程或线程同时写入，每次写入使用独立的临时文件，再原子替换
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+
+            with self._disk_lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(size for _, _, size in self._scan())
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(tmp_path, path)
+                self._disk_bytes += len(data) - previous
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict()
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _scan(self):
+        """遍历磁盘缓存，产出 (访问时间, 路径, 大小)"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, path, stat.st_size
+
+    def _evict(self):
+        """按访问时间从旧到新删除文件，直到总大小降到上限的 90%"""
+        target = self.max_disk_bytes * 0.9
+        for _, path, size in sorted(self._scan()):
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._disk_bytes -= size
+            except OSError:
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中统计"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
@@ -0,0 +1,63 @@
+"""
+并发请求合并
+
+同一内容的请求正在进行时，后到的请求不再重复调用上游，而是等待同一个调用的结果。
+上游调用在独立任务中运行，个别调用方断开连接不会取消它，其余等待者照常拿到结果。
+"""
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    按键合并进行中的异步调用
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有等待者都已离开时异常无人读取，这里读取一次避免 "never retrieved" 警告
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Shared call {key} failed: {task.exception()}")
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入一次调用
+
+        Args:
+            key: 合并键，相同键的并发调用共享结果
+            fn: 没有进行中的调用时用于发起调用的函数。fn 在发起调用的调用方中同步执行，
+                返回的协程在独立任务中运行，协程用到的资源（如上传的文件）应由它自己持有，
+                不能依赖发起方的生命周期
+
+        Returns:
+            调用结果的副本，每个调用方拿到独立的对象
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+        else:
+            self.shared += 1
+        # shield：调用方被取消时只放弃等待，不取消共享的上游调用
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, int]:
+        """返回合并统计"""
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
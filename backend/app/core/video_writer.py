@@ -0,0 +1,148 @@
+"""
+后台视频编码写入
+
+编码放在独立线程中进行，调用方只把画面拷贝进预分配的缓冲区就返回，
+编码再慢也不会阻塞推理。缓冲区数量有上限，全部被占用时当前帧直接丢弃，
+下一帧写入时重复相应次数，输出视频的时长与输入保持一致；
+缓冲区按需分配、循环复用，长视频内存占用不会增长。
+"""
+import logging
+import queue
+import threading
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 依次尝试的编码器：H.264 体积小但依赖平台编码库，mp4v 在所有 OpenCV 构建中可用
+DEFAULT_CODECS = ("avc1", "mp4v")
+DEFAULT_BUFFERS = 32
+
+
+def open_video_writer(
+    path: str,
+    fps: float,
+    size: Tuple[int, int],
+    codecs: Sequence[str] = DEFAULT_CODECS
+) -> Tuple[cv2.VideoWriter, str]:
+    """
+    按顺序尝试编码器打开视频写入器
+
+    Args:
+        path: 输出文件路径
+        fps: 帧率
+        size: (宽, 高)
+        codecs: 候选 FourCC 编码
+
+    Returns:
+        (写入器, 实际使用的编码)
+    """
+    for codec in codecs:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if writer.isOpened():
+            return writer, codec
+        writer.release()
+    raise ValueError(f"没有可用的视频编码器: {', '.join(codecs)}")
+
+
+class BackgroundVideoWriter:
+    """
+    带有界缓冲的后台视频写入器
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        size: Tuple[int, int],
+        buffers: int = DEFAULT_BUFFERS,
+        codecs: Sequence[str] = DEFAULT_CODECS
+    ):
+        """
+        打开输出文件并启动编码线程
+
+        Args:
+            path: 输出文件路径
+            fps: 帧率
+            size: (宽, 高)，尺寸不同的画面会先缩放
+            buffers: 最多缓冲的帧数
+            codecs: 候选 FourCC 编码
+        """
+        self.path = path
+        self.size = size
+        self._writer, self.codec = open_video_writer(path, fps, size, codecs)
+        self._shape = (size[1], size[0], 3)
+        self._max_buffers = buffers
+        self._allocated = 0
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        self._ready: "queue.Queue[Optional[Tuple[np.ndarray, int]]]" = queue.Queue()
+        self._skipped = 0
+        self._closed = False
+        self.frames = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _acquire(self) -> Optional[np.ndarray]:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            if self._allocated >= self._max_buffers:
+                return None
+            self._allocated += 1
+            return np.empty(self._shape, dtype=np.uint8)
+
+    def write(self, image: np.ndarray) -> bool:
+        """
+        提交一帧 BGR 画面，不等待编码
+
+        画面会被拷贝，调用返回后即可复用或修改 image。
+
+        Returns:
+            是否进入缓冲；缓冲已满时返回 False，该帧由下一帧重复补齐
+        """
+        if self._closed:
+            raise RuntimeError("视频写入器已关闭")
+        buffer = self._acquire()
+        if buffer is None:
+            self.dropped += 1
+            self._skipped += 1
+            return False
+
+        if image.shape == self._shape:
+            np.copyto(buffer, image)
+        else:
+            cv2.resize(image, self.size, dst=buffer, interpolation=cv2.INTER_AREA)
+        self._ready.put((buffer, self._skipped + 1))
+        self._skipped = 0
+        return True
+
+    def _run(self):
+        while True:
+            item = self._ready.get()
+            if item is None:
+                break
+            buffer, repeat = item
+            for _ in range(repeat):
+                self._writer.write(buffer)
+            self.frames += repeat
+            self._free.put(buffer)
+
+    def close(self):
+        """等待缓冲中的画面编码完成并关闭文件"""
+        if self._closed:
+            return
+        self._closed = True
+        self._ready.put(None)
+        self._thread.join()
+        self._writer.release()
+        if self.dropped:
+            logger.info(f"{self.path}: 编码跟不上，{self.dropped} 帧以重复前一帧补齐")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -7,6 +7,7 @@ from .prescription import Prescription, PrescriptionExercise
 from .challenge import Challenge, ChallengeRecord, challenge_participants
 from .chat import ChatMessage, ChatRoom, ChatRoomMember
 from .social import Post, PostComment, PostLike, HeritageProject, HeritageInheritor
+from .analysis import AnalysisJob, AnalysisJobStatus, AnalysisResult
 
 __all__ = [
     'Base',
@@ -28,4 +29,7 @@ __all__ = [
     'PostLike',
     'HeritageProject',
     'HeritageInheritor',
+    'AnalysisJob',
+    'AnalysisJobStatus',
+    'AnalysisResult',
 ]
@@ -0,0 +1,53 @@
+from datetime import datetime
+from enum import Enum as PyEnum
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import String, Integer, Float, Text, ForeignKey, Enum, DateTime, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+class AnalysisJobStatus(str, PyEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class AnalysisJob(Base):
+    """视频分析任务模型"""
+    __tablename__ = "analysis_jobs"
+    # 领取任务时按 (状态, 优先级, ID) 查找下一个待处理任务
+    __table_args__ = (
+        Index("ix_analysis_jobs_queue", "status", "priority", "id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    status: Mapped[str] = mapped_column(
+        Enum(AnalysisJobStatus),
+        default=AnalysisJobStatus.PENDING,
+        nullable=False
+    )
+    priority: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    video_path: Mapped[str] = mapped_column(String(255), nullable=False)  # 待分析视频的本地路径
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # AI 服务不可用时的重试次数
+    run_after: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # 重新排队的任务在此时间之后才能领取
+
+class AnalysisResult(Base):
+    """动作分析结果模型"""
+    __tablename__ = "analysis_results"
+    # 历史记录按用户、时间倒序分页，id 用于区分同一时刻的记录
+    __table_args__ = (
+        Index("ix_analysis_results_user_created", "user_id", "created_at", "id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    course_id: Mapped[Optional[int]] = mapped_column(ForeignKey("courses.id"), nullable=True)
+    source: Mapped[str] = mapped_column(String(20), nullable=False)  # upload / job / compare
+    score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    feedback: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    segments: Mapped[Optional[List[Dict[str, Any]]]] = mapped_column(JSON, nullable=True)  # 分段指标
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)  # AI服务返回的完整结果
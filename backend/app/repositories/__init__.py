@@ -23,6 +23,7 @@ from .social import (
     HeritageProjectRepository,
     HeritageInheritorRepository
 )
+from .analysis import AnalysisJobRepository, AnalysisResultRepository
 
 # 创建单例实例
 user_repository = UserRepository()
@@ -40,4 +41,6 @@ post_repository = PostRepository()
 post_comment_repository = PostCommentRepository()
 post_like_repository = PostLikeRepository()
 heritage_project_repository = HeritageProjectRepository()
-heritage_inheritor_repository = HeritageInheritorRepository() 
\ No newline at end of file
+heritage_inheritor_repository = HeritageInheritorRepository()
+analysis_job_repository = AnalysisJobRepository()
+analysis_result_repository = AnalysisResultRepository() 
\ No newline at end of file
@@ -0,0 +1,161 @@
+from typing import Optional, Collection, List, Tuple
+from datetime import datetime, timezone
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from .base import RepositoryBase
+from ..models.analysis import AnalysisJob, AnalysisJobStatus, AnalysisResult
+from ..schemas.analysis import (
+    AnalysisJobCreate, AnalysisJobUpdate,
+    AnalysisResultCreate, AnalysisResultUpdate
+)
+
+class AnalysisJobRepository(RepositoryBase[AnalysisJob, AnalysisJobCreate, AnalysisJobUpdate]):
+    """
+    视频分析任务数据访问层
+    """
+
+    def __init__(self):
+        super().__init__(AnalysisJob)
+
+    async def count_unfinished(self, db: AsyncSession, *, user_id: int) -> int:
+        """
+        统计用户尚未完成的任务数
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+
+        Returns:
+            等待中和处理中的任务数
+        """
+        query = select(func.count(AnalysisJob.id)).where(
+            AnalysisJob.user_id == user_id,
+            AnalysisJob.status.in_([AnalysisJobStatus.PENDING, AnalysisJobStatus.RUNNING])
+        )
+        result = await db.execute(query)
+        return result.scalar_one()
+
+    async def claim_next(
+        self,
+        db: AsyncSession,
+        *,
+        exclude_user_ids: Collection[int] = ()
+    ) -> Optional[AnalysisJob]:
+        """
+        领取优先级最高、提交最早的待处理任务并标记为处理中
+
+        Args:
+            db: 数据库会话
+            exclude_user_ids: 已达到并发上限、本次跳过的用户
+
+        Returns:
+            领取到的任务，没有可处理的任务时返回None
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+            query = (
+                select(AnalysisJob.id)
+                .where(
+                    AnalysisJob.status == AnalysisJobStatus.PENDING,
+                    or_(AnalysisJob.run_after.is_(None), AnalysisJob.run_after <= now)
+                )
+                .order_by(AnalysisJob.priority.desc(), AnalysisJob.id)
+                .limit(1)
+            )
+            if exclude_user_ids:
+                query = query.where(AnalysisJob.user_id.not_in(list(exclude_user_ids)))
+            job_id = (await db.execute(query)).scalar_one_or_none()
+            if job_id is None:
+                return None
+
+            # 带状态条件更新，多个进程同时领取同一任务时只有一个能成功
+            result = await db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, AnalysisJob.status == AnalysisJobStatus.PENDING)
+                .values(status=AnalysisJobStatus.RUNNING, started_at=now)
+            )
+            await db.commit()
+            if result.rowcount == 1:
+                return await self.get(db, job_id)
+
+    async def requeue_running(self, db: AsyncSession) -> int:
+        """
+        把处理中的任务重新放回队列，用于服务重启后恢复中断的任务
+
+        Returns:
+            恢复的任务数
+        """
+        result = await db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.status == AnalysisJobStatus.RUNNING)
+            .values(status=AnalysisJobStatus.PENDING, started_at=None)
+        )
+        await db.commit()
+        return result.rowcount
+
+
+class AnalysisResultRepository(RepositoryBase[AnalysisResult, AnalysisResultCreate, AnalysisResultUpdate]):
+    """
+    动作分析结果数据访问层
+    """
+
+    def __init__(self):
+        super().__init__(AnalysisResult)
+
+    async def get_history(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[AnalysisResult]:
+        """
+        按时间倒序获取用户的分析记录
+
+        使用 (created_at, id) 游标分页而不是 OFFSET，翻到第几页都只扫描
+        (user_id, created_at, id) 索引中的 limit 条记录。列表不加载分段指标和完整结果。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            limit: 返回的最大记录数
+            before: 上一页最后一条记录的 (created_at, id)，为空时从最新记录开始
+
+        Returns:
+            分析记录列表
+        """
+        query = (
+            select(AnalysisResult)
+            .options(defer(AnalysisResult.segments), defer(AnalysisResult.result))
+            .where(AnalysisResult.user_id == user_id)
+        )
+        if before is not None:
+            created_at, last_id = before
+            query = query.where(
+                or_(
+                    AnalysisResult.created_at < created_at,
+                    and_(AnalysisResult.created_at == created_at, AnalysisResult.id < last_id)
+                )
+            )
+        query = query.order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc()).limit(limit)
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    async def count_by_user(self, db: AsyncSession, *, user_id: int) -> int:
+        """
+        统计用户的分析记录数
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+
+        Returns:
+            记录数
+        """
+        result = await db.execute(
+            select(func.count(AnalysisResult.id)).where(AnalysisResult.user_id == user_id)
+        )
+        return result.scalar_one()
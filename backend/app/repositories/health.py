@@ -108,6 +108,42 @@ class HealthRepository(RepositoryBase[HealthRecord, HealthRecordCreate, HealthRe
         result = await db.execute(query)
         return result.scalars().first()
     
+    async def get_metric_rows(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        start_date: Optional[datetime] = None
+    ) -> List[Any]:
+        """
+        按记录时间升序获取趋势分析用的指标列
+
+        只查询时间和数值列，不构造 ORM 对象，几年的记录也能一次取出。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            start_date: 开始时间，为空时取全部记录
+
+        Returns:
+            (recorded_at, weight, bmi, heart_rate, blood_sugar) 行列表
+        """
+        query = (
+            select(
+                HealthRecord.recorded_at,
+                HealthRecord.weight,
+                HealthRecord.bmi,
+                HealthRecord.heart_rate,
+                HealthRecord.blood_sugar
+            )
+            .where(HealthRecord.user_id == user_id)
+            .order_by(HealthRecord.recorded_at)
+        )
+        if start_date is not None:
+            query = query.where(HealthRecord.recorded_at >= start_date)
+        result = await db.execute(query)
+        return result.all()
+    
     async def get_statistics(
         self, 
         db: AsyncSession, 
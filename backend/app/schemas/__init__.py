@@ -113,3 +113,14 @@ from .social import (
     HeritageInheritorPublic,
     HeritageInheritorWithProjects
 )
+
+from .analysis import (
+    AnalysisJobCreate,
+    AnalysisJobUpdate,
+    AnalysisJobPublic,
+    AnalysisResultCreate,
+    AnalysisResultUpdate,
+    AnalysisResultSummary,
+    AnalysisResultPublic,
+    AnalysisHistoryPage
+)
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from pydantic import Field
+
+from .base import BaseSchema
+
+class AnalysisJobCreate(BaseSchema):
+    """创建视频分析任务的模型"""
+    user_id: int = Field(..., description="用户ID")
+    priority: int = Field(0, description="优先级，数值越大越先处理")
+    video_path: str = Field(..., description="待分析视频的本地路径")
+
+class AnalysisJobUpdate(BaseSchema):
+    """更新视频分析任务的模型"""
+    status: Optional[str] = Field(None, description="任务状态")
+    result: Optional[Dict[str, Any]] = Field(None, description="分析结果")
+    error: Optional[str] = Field(None, description="失败原因")
+    started_at: Optional[datetime] = Field(None, description="开始处理时间")
+    finished_at: Optional[datetime] = Field(None, description="完成时间")
+    attempts: Optional[int] = Field(None, description="重试次数")
+    run_after: Optional[datetime] = Field(None, description="重新排队后最早的处理时间")
+
+class AnalysisJobPublic(BaseSchema):
+    """返回给客户端的视频分析任务模型"""
+    id: int = Field(..., description="任务ID")
+    status: str = Field(..., description="任务状态: pending/running/succeeded/failed")
+    priority: int = Field(..., description="优先级")
+    result: Optional[Dict[str, Any]] = Field(None, description="分析结果")
+    error: Optional[str] = Field(None, description="失败原因")
+    created_at: datetime = Field(..., description="提交时间")
+    started_at: Optional[datetime] = Field(None, description="开始处理时间")
+    finished_at: Optional[datetime] = Field(None, description="完成时间")
+
+class AnalysisResultCreate(BaseSchema):
+    """创建动作分析结果的模型"""
+    user_id: int = Field(..., description="用户ID")
+    course_id: Optional[int] = Field(None, description="课程ID")
+    source: str = Field(..., description="来源: upload/job/compare")
+    score: Optional[float] = Field(None, description="总分")
+    feedback: Optional[str] = Field(None, description="总体评价")
+    segments: Optional[List[Dict[str, Any]]] = Field(None, description="分段指标")
+    result: Optional[Dict[str, Any]] = Field(None, description="AI服务返回的完整结果")
+
+    @classmethod
+    def from_ai_result(
+        cls,
+        result: Dict[str, Any],
+        *,
+        user_id: int,
+        source: str,
+        course_id: Optional[int] = None
+    ) -> "AnalysisResultCreate":
+        """从 AI 服务或轨迹比对返回的结果中提取总分、评价和分段指标"""
+        score = result.get("score")
+        segments = result.get("segments")
+        feedback = result.get("feedback")
+        # 模型有时把评价返回成分点列表或对象，统一保存为文本
+        if feedback is not None and not isinstance(feedback, str):
+            feedback = json.dumps(feedback, ensure_ascii=False)
+        return cls(
+            user_id=user_id,
+            course_id=course_id,
+            source=source,
+            score=float(score) if isinstance(score, (int, float)) else None,
+            feedback=feedback,
+            segments=segments if isinstance(segments, list) else None,
+            result=result
+        )
+
+class AnalysisResultUpdate(BaseSchema):
+    """更新动作分析结果的模型"""
+    score: Optional[float] = Field(None, description="总分")
+    feedback: Optional[str] = Field(None, description="总体评价")
+    segments: Optional[List[Dict[str, Any]]] = Field(None, description="分段指标")
+
+class AnalysisResultSummary(BaseSchema):
+    """历史记录列表中的动作分析结果"""
+    id: int = Field(..., description="分析记录ID")
+    course_id: Optional[int] = Field(None, description="课程ID")
+    source: str = Field(..., description="来源")
+    score: Optional[float] = Field(None, description="总分")
+    feedback: Optional[str] = Field(None, description="总体评价")
+    created_at: datetime = Field(..., description="分析时间")
+
+class AnalysisResultPublic(AnalysisResultSummary):
+    """返回给客户端的动作分析结果详情"""
+    user_id: int = Field(..., description="用户ID")
+    segments: Optional[List[Dict[str, Any]]] = Field(None, description="分段指标")
+    result: Optional[Dict[str, Any]] = Field(None, description="AI服务返回的完整结果")
+
+class AnalysisHistoryPage(BaseSchema):
+    """按游标分页的分析历史"""
+    items: List[AnalysisResultSummary] = Field(default_factory=list, description="分析记录")
+    total: Optional[int] = Field(None, description="总记录数，只在首页返回")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多记录时为空")
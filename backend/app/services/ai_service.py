@@ -1,15 +1,94 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, BinaryIO, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from functools import lru_cache, partial
+import asyncio
+import base64
 import json
+import logging
 import os
+import uuid
 from datetime import datetime
 
+import numpy as np
+
 from ..core.config import settings
 from ..core import ai as ai_core
+from ..core.ai import ai_analyzer
+from ..core.analysis_jobs import PRIORITY_LIVE, PRIORITY_NORMAL, analysis_job_queue
+from ..core.keyframes import extract_track, pool_estimator
+from ..core.pose_inference import pose_inference_pool
+from ..core.pose_dtw import compare_features, resample
+from ..core.pose_features import feature_matrix
+from ..core.pose_index import SegmentIndex, index_path_for
+from ..core.pose_filter import create_filter, filter_track
+from ..core.pose_stream import RealtimeSession, StreamingScorer
+from ..core.pose_track import TRACK_SUFFIX, open_track
 from .health_service import HealthService
+from ..models.user import User, UserRole
 from .prescription_service import PrescriptionService
 from ..schemas.prescription import PrescriptionCreate, PrescriptionExerciseCreate
-from ..repositories import health_repository, prescription_repository
+from ..core.exceptions import ValidationException
+from ..schemas.analysis import AnalysisHistoryPage, AnalysisResultCreate, AnalysisResultSummary
+from ..repositories import (
+    health_repository, prescription_repository, course_repository,
+    analysis_job_repository, analysis_result_repository
+)
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=32)
+def _load_reference_features(path: str, mtime: float) -> Tuple[np.ndarray, float]:
+    """
+    读取标准轨迹并计算特征矩阵，按路径和修改时间缓存
+
+    Returns:
+        (特征矩阵, 帧率)
+    """
+    with open_track(path) as track:
+        # 与实时评分使用同样的滤波，两边的平滑程度一致
+        landmarks = filter_track(track.frames, track.fps, settings.POSE_FILTER)
+        return feature_matrix(landmarks), track.fps
+
+
+@lru_cache(maxsize=32)
+def _load_reference_index(path: str, mtime: float) -> SegmentIndex:
+    """读取标准轨迹的分段索引，按路径和修改时间缓存"""
+    return SegmentIndex.load(path)
+
+
+def _reference_index(track_path: str) -> Optional[SegmentIndex]:
+    """标准轨迹的分段索引，没有建立索引或索引文件损坏时返回 None"""
+    path = index_path_for(track_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        return _load_reference_index(path, os.path.getmtime(path))
+    except Exception as e:
+        logger.warning(f"Failed to load segment index {path}: {e!r}")
+        return None
+
+
+def _track_features(landmarks: np.ndarray, fps: float) -> np.ndarray:
+    """按标准轨迹同样的滤波计算上传视频的特征矩阵"""
+    return feature_matrix(filter_track(landmarks, fps, settings.POSE_FILTER))
+
+
+def _compare_learner(
+    learner: np.ndarray,
+    learner_fps: float,
+    reference: np.ndarray,
+    reference_fps: float,
+    index: Optional[SegmentIndex] = None
+) -> Dict[str, Any]:
+    """在学员的采样帧率上比对学员关键点与标准特征，有分段索引时先定位练习的乐句"""
+    return compare_features(
+        _track_features(learner, learner_fps),
+        resample(reference, reference_fps, learner_fps),
+        learner_fps,
+        index=index
+    )
+
 
 class AIService:
     """
@@ -23,6 +102,310 @@ class AIService:
         self.health_service = HealthService()
         self.prescription_service = PrescriptionService()
         
+    def get_reference_track_path(self, video_url: Optional[str]) -> Optional[str]:
+        """
+        根据课程视频地址定位预计算的标准轨迹文件
+
+        Args:
+            video_url: 课程视频URL，如 /uploads/video/xxx.mp4
+
+        Returns:
+            轨迹文件路径，不存在时返回None
+        """
+        if not video_url:
+            return None
+        stem = os.path.splitext(os.path.basename(video_url))[0]
+        path = os.path.join(settings.UPLOAD_DIR, "pose", f"{stem}{TRACK_SUFFIX}")
+        return path if os.path.exists(path) else None
+
+    async def create_realtime_session(
+        self,
+        db: AsyncSession,
+        *,
+        course_id: Optional[int] = None
+    ) -> RealtimeSession:
+        """
+        创建实时分析会话
+
+        Args:
+            db: 数据库会话
+            course_id: 跟练的课程ID，提供且存在标准轨迹时进行评分
+
+        Returns:
+            实时分析会话
+        """
+        reference, reference_fps = None, 30.0
+        if course_id:
+            course = await course_repository.get(db, course_id)
+            path = self.get_reference_track_path(course.video_url if course else None)
+            if path:
+                # 首次加载要读取并滤波整条轨迹，放到线程中执行，不阻塞其他连接
+                reference, reference_fps = await asyncio.to_thread(
+                    _load_reference_features, path, os.path.getmtime(path)
+                )
+
+        # 图像帧交给共享推理进程池，会话只持有自己的标识
+        session_id = uuid.uuid4().hex
+        return RealtimeSession(
+            StreamingScorer(
+                reference,
+                reference_fps=reference_fps,
+                landmark_filter=create_filter(settings.POSE_FILTER)
+            ),
+            partial(pose_inference_pool.estimate, session_id),
+            on_close=partial(pose_inference_pool.release, session_id)
+        )
+
+    def get_course_video_path(self, video_url: Optional[str]) -> Optional[str]:
+        """
+        根据课程视频地址定位上传目录中的视频文件
+
+        Args:
+            video_url: 课程视频URL，如 /uploads/video/xxx.mp4
+
+        Returns:
+            视频文件路径，不存在时返回None
+        """
+        if not video_url:
+            return None
+        path = os.path.join(settings.UPLOAD_DIR, "video", os.path.basename(video_url))
+        return path if os.path.exists(path) else None
+
+    async def analyze_dance_video(self, video: BinaryIO) -> Dict[str, Any]:
+        """
+        分析上传的舞蹈视频
+
+        Args:
+            video: 视频文件对象，按块上传给 AI 服务
+
+        Returns:
+            AI 分析结果
+        """
+        return await ai_analyzer.analyze_dance_video(video)
+
+    async def submit_analysis_job(
+        self,
+        db: AsyncSession,
+        *,
+        user: User,
+        video: BinaryIO
+    ):
+        """
+        提交后台视频分析任务
+
+        优先级由服务端按用户角色决定：教师和管理员在直播课堂上提交的示范、点评视频
+        有学员在等结果，优先处理；客户端无法自行提高优先级。
+
+        Args:
+            db: 数据库会话
+            user: 提交任务的用户
+            video: 视频文件对象
+
+        Returns:
+            新建的任务
+        """
+        live = user.is_admin or user.role in (UserRole.ADMIN, UserRole.TEACHER)
+        priority = PRIORITY_LIVE if live else PRIORITY_NORMAL
+        return await analysis_job_queue.submit(db, user_id=user.id, video=video, priority=priority)
+
+    async def record_analysis(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        result: Dict[str, Any],
+        source: str,
+        course_id: Optional[int] = None
+    ):
+        """
+        保存分析结果到历史记录
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            result: AI 服务返回的结果
+            source: 来源: upload/job/compare
+            course_id: 对比的课程ID
+
+        Returns:
+            新建的分析记录，保存失败时返回 None
+        """
+        # 历史记录只是附带保存，失败时只记录日志，不影响返回给用户的分析结果
+        try:
+            return await analysis_result_repository.create(
+                db,
+                obj_in=AnalysisResultCreate.from_ai_result(
+                    result, user_id=user_id, source=source, course_id=course_id
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to record {source} analysis for user {user_id}: {e!r}")
+            await db.rollback()
+            return None
+
+    @staticmethod
+    def _encode_cursor(created_at: datetime, analysis_id: int) -> str:
+        raw = f"{created_at.isoformat()}|{analysis_id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            created_at, analysis_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+            return datetime.fromisoformat(created_at), int(analysis_id)
+        except ValueError as e:
+            raise ValidationException("无效的分页游标") from e
+
+    async def get_analysis_history(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> AnalysisHistoryPage:
+        """
+        按游标分页获取用户的分析历史
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            cursor: 上一页返回的 next_cursor，为空时从最新记录开始
+            limit: 每页记录数
+
+        Returns:
+            分析记录、下一页游标，以及只在首页计算的总数
+        """
+        before = self._decode_cursor(cursor) if cursor else None
+        # 多取一条判断是否还有下一页
+        records = await analysis_result_repository.get_history(
+            db, user_id=user_id, limit=limit + 1, before=before
+        )
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = self._encode_cursor(records[-1].created_at, records[-1].id)
+        return AnalysisHistoryPage(
+            items=[AnalysisResultSummary.model_validate(record) for record in records],
+            # 翻页时总数不变，不必每页都做一次 COUNT
+            total=None if cursor else await analysis_result_repository.count_by_user(db, user_id=user_id),
+            next_cursor=next_cursor
+        )
+
+    async def get_analysis_by_id(self, db: AsyncSession, analysis_id: int):
+        """
+        获取分析记录详情
+
+        Args:
+            db: 数据库会话
+            analysis_id: 分析记录ID
+
+        Returns:
+            分析记录，不存在时返回None
+        """
+        return await analysis_result_repository.get(db, analysis_id)
+
+    async def get_analysis_job(self, db: AsyncSession, *, job_id: int, user_id: int):
+        """
+        获取用户的分析任务
+
+        Args:
+            db: 数据库会话
+            job_id: 任务ID
+            user_id: 当前用户ID
+
+        Returns:
+            任务，不存在或不属于该用户时返回None
+        """
+        job = await analysis_job_repository.get(db, job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def _extract_track(self, video: BinaryIO) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        用共享姿态推理进程池提取上传视频的关键点轨迹
+
+        进程池未启动、视频无法解码或推理失败时返回 None，由调用方改用 AI 服务比对。
+        """
+        if not pose_inference_pool.started:
+            return None
+        try:
+            return await extract_track(
+                video,
+                pool_estimator(pose_inference_pool, settings.POSE_COMPARE_CONCURRENCY),
+                sample_fps=settings.POSE_COMPARE_FPS,
+                max_samples=settings.POSE_COMPARE_MAX_FRAMES,
+                concurrency=settings.POSE_COMPARE_CONCURRENCY
+            )
+        except Exception as e:
+            logger.warning(f"Pose track extraction failed, falling back to the AI service: {e!r}")
+            return None
+
+    async def compare_with_standard_video(
+        self,
+        user_video: BinaryIO,
+        standard_video: BinaryIO
+    ) -> Dict[str, Any]:
+        """
+        将用户视频与上传的标准视频进行对比
+
+        两段视频都在本地提取关键点轨迹后做 DTW 比对，不再把两段原始视频上传给 AI 服务；
+        无法提取轨迹时退回 AI 服务比对。
+
+        Args:
+            user_video: 用户视频文件对象
+            standard_video: 标准视频文件对象
+
+        Returns:
+            对比结果
+        """
+        learner = await self._extract_track(user_video)
+        reference = await self._extract_track(standard_video) if learner is not None else None
+        if learner is None or reference is None:
+            return await ai_analyzer.compare_with_standard(user_video, standard_video)
+
+        reference_landmarks, reference_fps = reference
+        reference_features = await asyncio.to_thread(_track_features, reference_landmarks, reference_fps)
+        return await asyncio.to_thread(_compare_learner, *learner, reference_features, reference_fps)
+
+    async def compare_with_standard_by_id(
+        self,
+        db: AsyncSession,
+        user_video: BinaryIO,
+        course_id: int
+    ) -> Dict[str, Any]:
+        """
+        将用户视频与课程的标准视频进行对比
+
+        Args:
+            db: 数据库会话
+            user_video: 用户视频文件对象
+            course_id: 课程ID
+
+        Returns:
+            对比结果
+        """
+        course = await course_repository.get(db, course_id)
+        video_url = course.video_url if course else None
+
+        # 课程有预计算的标准轨迹时只需提取学员一侧，在本地完成比对
+        track_path = self.get_reference_track_path(video_url)
+        if track_path:
+            learner = await self._extract_track(user_video)
+            if learner is not None:
+                reference, reference_fps = await asyncio.to_thread(
+                    _load_reference_features, track_path, os.path.getmtime(track_path)
+                )
+                index = await asyncio.to_thread(_reference_index, track_path)
+                return await asyncio.to_thread(_compare_learner, *learner, reference, reference_fps, index)
+
+        path = self.get_course_video_path(video_url)
+        if not path:
+            raise ValueError("标准视频不存在")
+        with open(path, "rb") as standard_video:
+            return await ai_analyzer.compare_with_standard(user_video, standard_video)
+
     async def analyze_health_data(
         self, 
         db: AsyncSession, 
@@ -41,9 +424,9 @@ class AIService:
         Returns:
             分析结果
         """
-        # 获取用户健康数据
-        health_records = await health_repository.get_by_user_id(db, user_id=user_id)
-        if not health_records:
+        # 使用健康服务分析全部历史记录的趋势
+        trend_analysis = await self.health_service.get_health_trend(db, user_id=user_id)
+        if not trend_analysis["data_points"]:
             return {
                 "status": "error",
                 "message": "没有健康记录数据",
@@ -53,9 +436,6 @@ class AIService:
         # 获取健康统计数据
         health_stats = await health_repository.get_statistics(db, user_id=user_id, days=days)
         
-        # 使用健康服务分析趋势
-        trend_analysis = self.health_service.analyze_health_trend(health_records)
-        
         # 构建分析结果
         analysis_result = {
             "status": "success",
@@ -2,7 +2,10 @@ from typing import List, Optional, Dict, Any, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date, timedelta
 
+import numpy as np
+
 from .base_service import BaseService
+from ..core import health_trend
 from ..models.health import HealthRecord
 from ..repositories import health_repository
 from ..schemas.health import HealthRecordCreate, HealthRecordUpdate, HealthStatistics
@@ -190,85 +193,57 @@ class HealthService(BaseService[HealthRecord, HealthRecordCreate, HealthRecordUp
         """
         return await self.repository.get_monthly_summary(db, user_id=user_id, year=year, month=month)
     
-    def analyze_health_trend(self, records: List[HealthRecord]) -> Dict[str, Any]:
+    async def get_health_trend(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        start_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
-        分析健康趋势
-        
+        获取用户健康趋势
+
         Args:
-            records: 健康记录列表
-            
+            db: 数据库会话
+            user_id: 用户ID
+            start_date: 开始时间，为空时分析全部记录
+
         Returns:
             健康趋势分析结果
         """
-        if not records or len(records) < 2:
-            return {
-                "trend": "insufficient_data",
-                "message": "数据不足，无法分析趋势"
-            }
-            
-        # 按记录时间排序
-        sorted_records = sorted(records, key=lambda r: r.recorded_at)
-        
-        # 分析体重趋势
-        weights = [r.weight for r in sorted_records if r.weight]
-        weight_trend = self._analyze_trend(weights) if weights and len(weights) >= 2 else None
-        
-        # 分析BMI趋势
-        bmis = [r.bmi for r in sorted_records if r.bmi]
-        bmi_trend = self._analyze_trend(bmis) if bmis and len(bmis) >= 2 else None
-        
-        # 分析心率趋势
-        heart_rates = [r.heart_rate for r in sorted_records if r.heart_rate]
-        heart_rate_trend = self._analyze_trend(heart_rates) if heart_rates and len(heart_rates) >= 2 else None
-        
-        # 分析血糖趋势
-        blood_sugars = [r.blood_sugar for r in sorted_records if r.blood_sugar]
-        blood_sugar_trend = self._analyze_trend(blood_sugars) if blood_sugars and len(blood_sugars) >= 2 else None
-        
-        return {
-            "weight_trend": weight_trend,
-            "bmi_trend": bmi_trend,
-            "heart_rate_trend": heart_rate_trend,
-            "blood_sugar_trend": blood_sugar_trend,
-            "analysis_date": datetime.now().isoformat(),
-            "data_points": len(sorted_records)
-        }
-    
-    def _analyze_trend(self, values: List[float]) -> Dict[str, Any]:
+        rows = await self.repository.get_metric_rows(db, user_id=user_id, start_date=start_date)
+        times, values = health_trend.to_columns(rows)
+        return self.analyze_health_trend(times, values)
+
+    def analyze_health_trend(self, times: np.ndarray, values: np.ndarray) -> Dict[str, Any]:
         """
-        分析数值趋势
-        
+        分析健康趋势
+
+        所有指标一次计算最小二乘斜率、7 天滑动平均、波动和异常读数，
+        趋势按拟合直线的变化幅度判断，而不是只比较首末两次读数。
+
         Args:
-            values: 数值列表
-            
+            times: (记录数,) 升序记录时间（天）
+            values: (记录数, 指标数) 指标矩阵，列顺序见 health_trend.METRICS，缺失值为 NaN
+
         Returns:
-            趋势分析结果
+            健康趋势分析结果
         """
-        if not values or len(values) < 2:
+        if len(times) < 2:
             return {
                 "trend": "insufficient_data",
-                "change": 0,
-                "change_percent": 0
+                "message": "数据不足，无法分析趋势",
+                "data_points": len(times)
             }
-            
-        first = values[0]
-        last = values[-1]
-        change = last - first
-        change_percent = (change / first) * 100 if first != 0 else 0
-        
-        if abs(change_percent) < 1:
-            trend = "stable"
-        elif change_percent > 0:
-            trend = "increasing"
-        else:
-            trend = "decreasing"
-            
+
+        trends = health_trend.summarize(health_trend.compute_trends(times, values))
         return {
-            "trend": trend,
-            "change": round(change, 2),
-            "change_percent": round(change_percent, 2),
-            "first_value": first,
-            "last_value": last
+            "weight_trend": trends["weight"],
+            "bmi_trend": trends["bmi"],
+            "heart_rate_trend": trends["heart_rate"],
+            "blood_sugar_trend": trends["blood_sugar"],
+            "analysis_date": datetime.now().isoformat(),
+            "data_points": len(times)
         }
 
     async def get_user_activity_stats(
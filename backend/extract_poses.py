@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+课程视频姿态批量提取脚本
+离线遍历上传目录中的课程视频，使用多进程为每一帧提取 MediaPipe 姿态关键点
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+import cv2
+import mediapipe as mp
+
+from app.core.config import settings
+from app.core.pose_index import build_track_index, index_path_for
+from app.core.pose_track import TRACK_SUFFIX, TrackWriter, hash_file, landmarks_to_array
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v"}
+
+# 每个工作进程持有一个独立的 Pose 实例
+_pose = None
+
+
+def _init_worker(model_complexity: int):
+    """工作进程初始化：创建本进程专用的 Pose 模型"""
+    global _pose
+    # 进程池已经占满所有核心，避免 OpenCV 内部再开线程
+    cv2.setNumThreads(1)
+    _pose = mp.solutions.pose.Pose(
+        static_image_mode=False,
+        model_complexity=model_complexity,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def extract_video(video_path: str, output_path: str) -> Tuple[str, int, float]:
+    """
+    提取单个视频的逐帧关键点并逐帧写入轨迹文件，完成后建立分段索引
+
+    Args:
+        video_path: 视频文件路径
+        output_path: 输出文件路径
+
+    Returns:
+        (视频路径, 帧数, 耗时秒数)
+    """
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    # 每个视频开始时重置跟踪状态，避免沿用上一个视频的结果
+    _pose.reset()
+
+    try:
+        with TrackWriter(output_path, fps, hash_file(video_path)) as writer:
+            while True:
+                success, image = cap.read()
+                if not success:
+                    break
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                results = _pose.process(image_rgb)
+                writer.append(landmarks_to_array(results.pose_landmarks))
+    finally:
+        cap.release()
+
+    # 建立分段索引，练习片段比对时先定位对应乐句
+    build_track_index(output_path)
+    return video_path, writer.frame_count, time.perf_counter() - started
+
+
+def collect_jobs(input_dir: str, output_dir: str, overwrite: bool) -> List[Tuple[str, str]]:
+    """收集需要处理的视频，已有且比视频新的结果默认跳过"""
+    jobs = []
+    for name in sorted(os.listdir(input_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in VIDEO_EXTENSIONS:
+            continue
+        video_path = os.path.join(input_dir, name)
+        output_path = os.path.join(output_dir, f"{stem}{TRACK_SUFFIX}")
+        if (
+            not overwrite
+            and os.path.exists(output_path)
+            and os.path.getmtime(output_path) >= os.path.getmtime(video_path)
+            and os.path.exists(index_path_for(output_path))
+        ):
+            continue
+        jobs.append((video_path, output_path))
+    return jobs
+
+
+def run(
+    input_dir: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    model_complexity: int = 1,
+    overwrite: bool = False
+) -> int:
+    """
+    批量提取姿态关键点
+
+    Returns:
+        失败的视频数量
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = collect_jobs(input_dir, output_dir, overwrite)
+    if not jobs:
+        logger.info("没有需要处理的视频")
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    logger.info(f"开始处理 {len(jobs)} 个视频，工作进程数: {workers}")
+
+    failures = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_complexity,)
+    ) as executor:
+        futures = {
+            executor.submit(extract_video, video_path, output_path): video_path
+            for video_path, output_path in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                video_path, frame_count, elapsed = future.result()
+                fps = frame_count / elapsed if elapsed > 0 else 0.0
+                logger.info(f"完成 {video_path}: {frame_count} 帧, {elapsed:.1f}s ({fps:.1f} 帧/秒)")
+            except Exception as e:
+                failures += 1
+                logger.error(f"处理失败 {futures[future]}: {e}")
+
+    logger.info(f"全部完成，耗时 {time.perf_counter() - started:.1f}s，失败 {failures} 个")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量提取课程视频的姿态关键点")
+    parser.add_argument(
+        "--input", default=os.path.join(settings.UPLOAD_DIR, "video"),
+        help="课程视频目录（默认为上传目录下的 video）"
+    )
+    parser.add_argument(
+        "--output", default=os.path.join(settings.UPLOAD_DIR, "pose"),
+        help="关键点输出目录（默认为上传目录下的 pose）"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认使用全部 CPU 核心")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1, help="Pose 模型复杂度")
+    parser.add_argument("--overwrite", action="store_true", help="重新处理已提取过的视频")
+    args = parser.parse_args()
+
+    failures = run(
+        args.input,
+        args.output,
+        workers=args.workers,
+        model_complexity=args.model_complexity,
+        overwrite=args.overwrite
+    )
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
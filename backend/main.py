@@ -47,6 +47,18 @@ async def lifespan(app: FastAPI):
     # 初始化WebSocket连接管理器
     from app.core.chat import chat_manager
     app.state.chat_manager = chat_manager
+
+    # 启动实时分析共享的姿态推理进程池
+    from app.core.pose_inference import pose_inference_pool
+    await pose_inference_pool.start()
+
+    # 创建访问 AI 服务的共享连接池
+    from app.core.ai import ai_analyzer
+    await ai_analyzer.start()
+
+    # 启动视频分析任务队列
+    from app.core.analysis_jobs import analysis_job_queue
+    await analysis_job_queue.start()
     
     # 注册异常处理器
     register_exception_handlers(app)
@@ -56,6 +68,15 @@ async def lifespan(app: FastAPI):
     
     # 应用关闭时的操作
     logger.info("Shutting down application...")
+
+    # 停止视频分析任务队列
+    await analysis_job_queue.stop()
+
+    # 停止姿态推理进程池
+    await pose_inference_pool.stop()
+
+    # 关闭 AI 服务连接池
+    await ai_analyzer.close()
     
     # 关闭数据库连接
     await close_db_connection()
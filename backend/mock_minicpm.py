@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+本地 MiniCPM-V 模拟服务
+
+实现 app/core/ai.py 使用的 /analyze、/feedback、/compare 接口，用于在没有模型服务器的
+机器上压测 /ai-analysis/* 接口。延迟分布、错误率、响应大小和同时处理的请求数可配置，
+随机数种子固定时同样的请求序列得到同样的延迟和错误，结果可以复现。
+
+用法:
+    python mock_minicpm.py --profile realistic --port 9000
+    python mock_minicpm.py --latency lognormal:2,0.5 --error-rate 0.05 --slots 4
+    # 后端配置 MINICPM_V_API_URL=http://localhost:9000/v1
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import random
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 预设配置：延迟分布、错误率、同时处理的请求数（模拟 GPU 数量）
+PROFILES: Dict[str, Dict] = {
+    "fast": {"latency": "fixed:0.05", "error_rate": 0.0, "slots": 0},
+    "realistic": {"latency": "lognormal:2.5,0.4", "error_rate": 0.01, "slots": 4},
+    "slow": {"latency": "lognormal:15,0.6", "error_rate": 0.02, "slots": 2},
+    "flaky": {"latency": "uniform:0.5,3", "error_rate": 0.2, "slots": 4},
+    "overloaded": {"latency": "lognormal:8,0.8", "error_rate": 0.1, "slots": 1},
+}
+
+# /feedback 只处理 URL，比上传视频的接口快得多
+FEEDBACK_LATENCY_SCALE = 0.2
+# 只收到关键帧帧条时模型处理的画面少一个数量级
+KEYFRAME_LATENCY_SCALE = 0.1
+
+
+class LatencyModel:
+    """
+    按分布生成延迟，格式:
+    fixed:秒 / uniform:最小,最大 / normal:均值,标准差 / lognormal:中位数,sigma
+    """
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+        self.rng = rng
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"无效的延迟分布: {spec}")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = self.rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = self.rng.gauss(p[0], p[1])
+        else:
+            value = self.rng.lognormvariate(0.0, p[1]) * p[0]
+        return max(0.0, value)
+
+
+class MockModel:
+    """
+    模拟推理服务的状态：延迟、错误注入、GPU 排队和统计
+    """
+
+    def __init__(
+        self,
+        latency: str,
+        error_rate: float,
+        error_status: int,
+        payload_bytes: int,
+        slots: int,
+        seed: Optional[int]
+    ):
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.payload_bytes = payload_bytes
+        # slots 为 0 表示不限并发；否则超出的请求排队，模拟吞吐量上限
+        self.slots = asyncio.Semaphore(slots) if slots > 0 else None
+        self.requests = 0
+        self.errors = 0
+        self.received_bytes = 0
+        self.busy = 0
+
+    async def run(self, scale: float = 1.0) -> bool:
+        """
+        模拟一次推理
+
+        Returns:
+            是否成功，False 表示本次请求应返回错误
+        """
+        self.requests += 1
+        # 延迟和错误在排队前决定，保证同一种子下与请求到达顺序一一对应
+        delay = self.latency.sample() * scale
+        failed = self.rng.random() < self.error_rate
+        if self.slots is None:
+            await self._infer(delay)
+        else:
+            async with self.slots:
+                await self._infer(delay)
+        if failed:
+            self.errors += 1
+        return not failed
+
+    async def _infer(self, delay: float):
+        self.busy += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.busy -= 1
+
+    def error_response(self) -> JSONResponse:
+        return JSONResponse(status_code=self.error_status, content={"detail": "mock inference failure"})
+
+    def keypoints(self, digest: bytes):
+        """按配置的响应大小生成关键点列表，内容由输入哈希决定"""
+        count = max(0, self.payload_bytes // 60)
+        seed = int.from_bytes(digest[:8], "big")
+        rng = random.Random(seed)
+        return [
+            {"frame": i, "x": round(rng.random(), 4), "y": round(rng.random(), 4), "score": round(rng.random(), 3)}
+            for i in range(count)
+        ]
+
+
+async def drain(upload: UploadFile, model: MockModel) -> bytes:
+    """读完上传内容并返回其哈希，模拟服务端接收完整视频"""
+    sha = hashlib.sha256()
+    while True:
+        chunk = await upload.read(1024 * 1024)
+        if not chunk:
+            break
+        sha.update(chunk)
+        model.received_bytes += len(chunk)
+    return sha.digest()
+
+
+def score_for(digest: bytes) -> int:
+    # 同一视频总是得到同样的分数，方便核对缓存命中的结果
+    return 60 + digest[0] % 40
+
+
+def create_app(model: MockModel, prefix: str) -> FastAPI:
+    app = FastAPI(title="MiniCPM-V mock")
+
+    @app.post(f"{prefix}/analyze")
+    async def analyze(
+        video: Optional[UploadFile] = File(None),
+        frames: Optional[UploadFile] = File(None),
+        summary: Optional[str] = Form(None)
+    ):
+        # 整段视频，或关键帧帧条加关键点摘要
+        upload = video or frames
+        if upload is None:
+            raise HTTPException(status_code=422, detail="video or frames is required")
+        digest = await drain(upload, model)
+        if summary is not None:
+            model.received_bytes += len(summary)
+        if not await model.run(1.0 if video is not None else KEYFRAME_LATENCY_SCALE):
+            return model.error_response()
+        score = score_for(digest)
+        return {
+            "score": score,
+            "feedback": f"整体完成度{score}分，节奏把握较好",
+            "improvements": ["手臂抬起时保持伸直", "转身时注意重心"],
+            "keypoints": model.keypoints(digest),
+        }
+
+    @app.post(f"{prefix}/feedback")
+    async def feedback(request: Request):
+        body = await request.json()
+        digest = hashlib.sha256(str(body.get("video_url", "")).encode("utf-8")).digest()
+        if not await model.run(FEEDBACK_LATENCY_SCALE):
+            return model.error_response()
+        return {
+            "score": score_for(digest),
+            "feedback": "动作连贯，注意保持呼吸均匀",
+            "improvements": ["放慢第二段的节奏"],
+        }
+
+    @app.post(f"{prefix}/compare")
+    async def compare(user_video: UploadFile = File(...), standard_video: UploadFile = File(...)):
+        user_digest = await drain(user_video, model)
+        standard_digest = await drain(standard_video, model)
+        if not await model.run():
+            return model.error_response()
+        digest = hashlib.sha256(user_digest + standard_digest).digest()
+        return {
+            "similarity": round(0.5 + digest[0] / 512, 3),
+            "score": score_for(digest),
+            "differences": ["第3个八拍手臂高度偏低"],
+            "keypoints": model.keypoints(digest),
+        }
+
+    @app.get(f"{prefix}/stats")
+    async def stats():
+        return {
+            "requests": model.requests,
+            "errors": model.errors,
+            "busy": model.busy,
+            "received_bytes": model.received_bytes,
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 MiniCPM-V 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--prefix", default="/v1", help="接口路径前缀，与 MINICPM_V_API_URL 的路径一致")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="预设配置")
+    parser.add_argument("--latency", default=None, help="延迟分布，覆盖预设，如 lognormal:2,0.5")
+    parser.add_argument("--error-rate", type=float, default=None, help="错误率，覆盖预设")
+    parser.add_argument("--error-status", type=int, default=503, help="注入错误时返回的状态码")
+    parser.add_argument("--slots", type=int, default=None, help="同时处理的请求数，0 表示不限，覆盖预设")
+    parser.add_argument("--payload-bytes", type=int, default=2048, help="分析结果中关键点数据的大致字节数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子，-1 表示不固定")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    model = MockModel(
+        latency=args.latency or profile["latency"],
+        error_rate=profile["error_rate"] if args.error_rate is None else args.error_rate,
+        error_status=args.error_status,
+        payload_bytes=args.payload_bytes,
+        slots=profile["slots"] if args.slots is None else args.slots,
+        seed=None if args.seed < 0 else args.seed
+    )
+    logger.info(
+        f"Mock MiniCPM-V on http://{args.host}:{args.port}{args.prefix} "
+        f"(latency={model.latency.kind}:{model.latency.params}, error_rate={model.error_rate})"
+    )
+    uvicorn.run(create_app(model, args.prefix.rstrip("/")), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
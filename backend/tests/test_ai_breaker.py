@@ -0,0 +1,135 @@
+"""
+AI 服务调用的熔断与重试
+
+用本地 asyncio 桩服务器模拟 MiniCPM-V 服务，按需返回指定的状态码，验证各类响应对熔断器的影响。
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.ai import AIAnalyzer
+from app.core.exceptions import ServiceUnavailableException
+from app.core.load_control import STATE_CLOSED, STATE_OPEN, CircuitBreaker
+
+
+class StubServer:
+    """最小的 HTTP/1.1 服务器，按 status 返回响应并记录收到的请求数"""
+
+    def __init__(self):
+        self.status = 200
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            self.requests += 1
+            body = b'{"ok": true}'
+            writer.write(
+                b"HTTP/1.1 %d Stub\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                b"Connection: close\r\n\r\n" % (self.status, len(body)) + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def _run(scenario):
+    async def main():
+        server = StubServer()
+        analyzer = AIAnalyzer()
+        analyzer.api_url = await server.start()
+        analyzer.max_retries = 0
+        analyzer.breaker = CircuitBreaker(failure_threshold=3, recovery_time=0.3)
+        await analyzer.start()
+        try:
+            await scenario(server, analyzer)
+        finally:
+            await analyzer.close()
+            await server.close()
+
+    asyncio.run(main())
+
+
+async def _call(analyzer: AIAnalyzer, count: int):
+    """连续调用 count 次，返回各次抛出的异常（成功为 None）"""
+    errors = []
+    for i in range(count):
+        try:
+            await analyzer.get_dance_feedback(f"video-{i}")
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+    return errors
+
+
+@pytest.mark.parametrize("status", [500, 501, 502, 503, 504])
+def test_server_errors_open_breaker(status):
+    async def scenario(server, analyzer):
+        server.status = status
+        await _call(analyzer, 3)
+        assert analyzer.breaker.state == STATE_OPEN
+
+        # 熔断期间直接拒绝，不再访问服务
+        requests = server.requests
+        errors = await _call(analyzer, 2)
+        assert all(isinstance(e, ServiceUnavailableException) for e in errors)
+        assert server.requests == requests
+
+    _run(scenario)
+
+
+@pytest.mark.parametrize("status", [400, 404, 422])
+def test_client_errors_keep_breaker_closed(status):
+    async def scenario(server, analyzer):
+        server.status = status
+        errors = await _call(analyzer, 5)
+        assert all(e is not None and not isinstance(e, ServiceUnavailableException) for e in errors)
+        assert analyzer.breaker.state == STATE_CLOSED
+        assert server.requests == 5
+
+    _run(scenario)
+
+
+def test_breaker_recovers_after_trial_succeeds():
+    async def scenario(server, analyzer):
+        server.status = 500
+        await _call(analyzer, 3)
+        assert analyzer.breaker.state == STATE_OPEN
+
+        server.status = 200
+        started = time.monotonic()
+        while time.monotonic() - started < analyzer.breaker.recovery_time:
+            await asyncio.sleep(0.05)
+        assert await _call(analyzer, 2) == [None, None]
+        assert analyzer.breaker.state == STATE_CLOSED
+
+    _run(scenario)
+
+
+def test_connection_failures_open_breaker():
+    async def scenario(server, analyzer):
+        await server.close()
+        errors = await _call(analyzer, 3)
+        assert all(e is not None for e in errors)
+        assert analyzer.breaker.state == STATE_OPEN
+        # 让 _run 的清理步骤可以再次关闭
+        await server.start()
+
+    _run(scenario)
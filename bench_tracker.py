@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+dance_tracker 姿态流水线基准测试
+
+用录制好的视频代替摄像头，逐帧回放采集、推理、滤波、评分、渲染各阶段，
+输出各阶段 p50/p95 耗时、整体帧率、峰值内存和每帧内存分配，结果可保存为 JSON，
+并与之前保存的基线对比，适合在没有摄像头的 CI 机器上运行。
+
+用法:
+    python bench_tracker.py --fixtures recordings/*.mp4 --output bench.json
+    python bench_tracker.py --fixtures recordings/*.mp4 --baseline bench.json
+    python bench_tracker.py --synthetic 300      # 没有录像时生成合成视频
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# dance_tracker 导入时会把 backend 目录加入 sys.path
+import dance_tracker
+from app.core.pose_features import feature_matrix
+from app.core.pose_filter import FILTER_CHOICES, FILTER_NONE, create_filter
+from app.core.pose_stream import StreamingScorer
+from app.core.pose_track import open_track
+
+STAGES = ("capture", "inference", "filter", "scoring", "render", "total")
+
+# 对比基线时检查的指标：(指标路径, 数值越大越好)
+REGRESSION_METRICS = (
+    (("fps",), True),
+    (("stages", "total", "p95"), False),
+    (("peak_rss_mb",), False),
+)
+
+
+def make_synthetic_fixture(path, frames, size=(640, 480), fps=30.0):
+    """生成一段画有摆动火柴人的合成视频，用于没有录像的环境"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    cx, cy = width // 2, height // 2
+    for i in range(frames):
+        image = np.full((height, width, 3), 40, dtype=np.uint8)
+        swing = np.sin(i / fps * 2 * np.pi * 0.5)
+        head = (cx, cy - 120)
+        hip = (cx, cy + 40)
+        cv2.circle(image, head, 30, (220, 200, 180), -1)
+        cv2.line(image, (cx, cy - 90), hip, (220, 200, 180), 12)
+        for side in (-1, 1):
+            hand = (cx + side * 110, int(cy - 60 - side * swing * 70))
+            foot = (cx + side * 50, cy + 170)
+            cv2.line(image, (cx, cy - 70), hand, (220, 200, 180), 10)
+            cv2.line(image, hip, foot, (220, 200, 180), 10)
+        writer.write(image)
+    writer.release()
+    return path
+
+
+def synthetic_reference(seconds, fps, seed=0):
+    """生成平滑随机的标准特征序列，评分阶段的开销只与长度有关"""
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * fps)
+    knots = rng.uniform(0.2, 0.9, size=(frames // 15 + 2, 8))
+    t = np.linspace(0, len(knots) - 1, frames)
+    columns = [np.interp(t, np.arange(len(knots)), knots[:, j]) for j in range(8)]
+    return np.stack(columns, axis=1).astype(np.float32)
+
+
+def load_reference(path, fps):
+    """读取标准轨迹特征，未指定时使用 3 分钟的合成序列"""
+    if not path:
+        return synthetic_reference(180, fps), fps
+    with open_track(path) as track:
+        return feature_matrix(track.frames), track.fps
+
+
+def percentile_summary(samples):
+    """返回 {p50, p95, mean}（毫秒）"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "mean": 0.0}
+    values = np.asarray(samples) * 1000.0
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+class Replay:
+    """
+    按顺序回放所有录像，读完一个接着下一个，直到达到帧数上限
+    """
+
+    def __init__(self, fixtures, max_frames):
+        self.fixtures = list(fixtures)
+        self.max_frames = max_frames
+        self.frames = 0
+        self._cap = None
+        self._next = 0
+
+    def read(self):
+        while self.frames < self.max_frames:
+            if self._cap is None:
+                if self._next >= len(self.fixtures):
+                    return None
+                self._cap = cv2.VideoCapture(self.fixtures[self._next])
+                self._next += 1
+            success, image = self._cap.read()
+            if success:
+                self.frames += 1
+                return image
+            self._cap.release()
+            self._cap = None
+        return None
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+def run_pass(fixtures, max_frames, reference, reference_fps, adaptive, smoothing, on_frame=None):
+    """
+    回放一遍录像并记录各阶段耗时
+
+    Args:
+        on_frame: 每帧处理前后以 "start" / "end" 调用的回调，用于内存分配统计
+
+    Returns:
+        ({阶段: [秒]}, 帧数, 总耗时秒数)
+    """
+    replay = Replay(fixtures, max_frames)
+    estimator = dance_tracker.create_estimator(adaptive)
+    landmark_filter = create_filter(smoothing)
+    scorer = StreamingScorer(reference, reference_fps=reference_fps)
+    timings = {stage: [] for stage in STAGES}
+
+    started_at = time.perf_counter()
+    try:
+        while True:
+            if on_frame:
+                on_frame("start")
+            t0 = time.perf_counter()
+            image = replay.read()
+            if image is None:
+                break
+            t1 = time.perf_counter()
+            landmarks = estimator.process(image)
+            t2 = time.perf_counter()
+            landmarks = dance_tracker.smooth(landmark_filter, landmarks, t2)
+            t3 = time.perf_counter()
+            scorer.update(landmarks)
+            t4 = time.perf_counter()
+            # 与 show_frame 相同的绘制和镜像，只是不弹出窗口
+            dance_tracker.draw_skeleton(image, landmarks)
+            cv2.flip(image, 1)
+            t5 = time.perf_counter()
+            if on_frame:
+                on_frame("end")
+
+            for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t5 - t0)):
+                timings[stage].append(seconds)
+    finally:
+        elapsed = time.perf_counter() - started_at
+        estimator.close()
+        replay.close()
+    return timings, replay.frames, elapsed
+
+
+class AllocationProbe:
+    """用 tracemalloc 统计每帧处理过程中新分配的内存峰值和净增长的内存块"""
+
+    def __init__(self):
+        self.peak_bytes = []
+        self.net_blocks = []
+        self._start_bytes = 0
+        self._start_blocks = 0
+
+    def __call__(self, phase):
+        if phase == "start":
+            tracemalloc.reset_peak()
+            self._start_bytes = tracemalloc.get_traced_memory()[0]
+            self._start_blocks = sys.getallocatedblocks()
+        else:
+            self.peak_bytes.append(tracemalloc.get_traced_memory()[1] - self._start_bytes)
+            self.net_blocks.append(sys.getallocatedblocks() - self._start_blocks)
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），Linux 下 ru_maxrss 以 KB 为单位，macOS 下以字节为单位"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def benchmark(args, fixtures):
+    reference, reference_fps = load_reference(args.reference, 30.0)
+
+    # 预热：模型加载和首帧初始化不计入结果
+    run_pass(fixtures, args.warmup, reference, reference_fps, args.adaptive, args.filter)
+
+    timings, frames, elapsed = run_pass(
+        fixtures, args.frames, reference, reference_fps, args.adaptive, args.filter
+    )
+    result = {
+        "fixtures": [os.path.basename(path) for path in fixtures],
+        "adaptive": args.adaptive,
+        "filter": args.filter,
+        "frames": frames,
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {stage: percentile_summary(samples) for stage, samples in timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    # 内存分配单独跑一遍，tracemalloc 的开销不影响上面的耗时
+    if args.alloc_frames > 0:
+        probe = AllocationProbe()
+        tracemalloc.start()
+        try:
+            run_pass(
+                fixtures, args.alloc_frames, reference, reference_fps,
+                args.adaptive, args.filter, on_frame=probe
+            )
+        finally:
+            tracemalloc.stop()
+        result["alloc_kb_per_frame"] = round(float(np.median(probe.peak_bytes)) / 1024, 1)
+        result["net_blocks_per_frame"] = round(float(np.mean(probe.net_blocks)), 1)
+    return result
+
+
+def print_result(result):
+    print(f"帧数 {result['frames']} | {result['fps']:.1f} FPS | 峰值内存 {result['peak_rss_mb']} MB")
+    if "alloc_kb_per_frame" in result:
+        print(
+            f"每帧分配峰值 {result['alloc_kb_per_frame']} KB | "
+            f"每帧净增内存块 {result['net_blocks_per_frame']}"
+        )
+    print(f"{'阶段':<10}{'p50(ms)':>10}{'p95(ms)':>10}{'mean(ms)':>10}")
+    for stage, summary in result["stages"].items():
+        print(f"{stage:<10}{summary['p50']:>10.2f}{summary['p95']:>10.2f}{summary['mean']:>10.2f}")
+
+
+def metric(result, path):
+    value = result
+    for key in path:
+        value = value[key]
+    return value
+
+
+def compare_baseline(result, baseline, tolerance):
+    """
+    与基线对比，打印变化并返回退化的指标列表
+
+    Args:
+        tolerance: 允许的相对退化比例
+    """
+    regressions = []
+    for path, higher_is_better in REGRESSION_METRICS:
+        name = ".".join(path)
+        current, previous = metric(result, path), metric(baseline, path)
+        if not previous:
+            continue
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        flag = "  <- 退化" if worse > tolerance else ""
+        print(f"{name:<22}{previous:>10.2f} -> {current:>10.2f} ({change:+.1%}){flag}")
+        if worse > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dance_tracker 姿态流水线基准测试")
+    parser.add_argument("--fixtures", nargs="*", default=[], help="回放的视频文件")
+    parser.add_argument("--synthetic", type=int, default=0, help="没有录像时生成指定帧数的合成视频")
+    parser.add_argument("--frames", type=int, default=600, help="计时阶段最多处理的帧数")
+    parser.add_argument("--warmup", type=int, default=30, help="预热帧数")
+    parser.add_argument("--alloc-frames", type=int, default=100, help="内存分配统计的帧数，0 表示跳过")
+    parser.add_argument("--reference", default=None, help="评分使用的标准 .pose 轨迹，默认使用合成序列")
+    parser.add_argument("--adaptive", action="store_true", help="使用自适应分辨率和跳帧")
+    parser.add_argument("--filter", choices=FILTER_CHOICES, default=FILTER_NONE, help="关键点滤波方式")
+    parser.add_argument("--output", default=None, help="将结果保存为 JSON")
+    parser.add_argument("--baseline", default=None, help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的相对退化比例")
+    args = parser.parse_args()
+
+    fixtures = list(args.fixtures)
+    tmp_dir = None
+    if not fixtures:
+        if not args.synthetic:
+            parser.error("需要通过 --fixtures 指定录像，或使用 --synthetic 生成合成视频")
+        tmp_dir = tempfile.TemporaryDirectory()
+        fixtures = [make_synthetic_fixture(os.path.join(tmp_dir.name, "synthetic.mp4"), args.synthetic)]
+
+    try:
+        result = benchmark(args, fixtures)
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+    print_result(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"性能退化超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,767 @@
 # 导入所需的库
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+
 import cv2
 import mediapipe as mp
+import numpy as np
+
+# 复用后端的姿态数据模块
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from app.core.frame_ring import (  # noqa: E402
+    CAPTURE_SECONDS, CAPTURED_AT, END, INFERENCE_SECONDS, FrameRing
+)
+from app.core.multi_pose import DEFAULT_DETECT_INTERVAL, MultiPoseTracker  # noqa: E402
+from app.core.pose_filter import FILTER_CHOICES, FILTER_NONE, create_filter  # noqa: E402
+from app.core.pose_track import TrackWriter, hash_file, landmarks_to_array  # noqa: E402
+from app.core.video_writer import BackgroundVideoWriter  # noqa: E402
 
 # 初始化 MediaPipe Pose 模型
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
 
-# 初始化 MediaPipe 的绘图工具
-mp_drawing = mp.solutions.drawing_utils
+WINDOW_NAME = 'Real-time Dance Skeleton by MediaPipe'
+POSE_CONNECTIONS = np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.intp)
+LANDMARK_COLOR = (0, 255, 0)
+CONNECTION_COLOR = (0, 0, 255)
+# 多人模式下按编号区分每个人的骨骼颜色
+PERSON_COLORS = ((0, 0, 255), (255, 128, 0), (0, 200, 255), (255, 0, 255), (0, 255, 128), (255, 255, 0))
+VISIBILITY_THRESHOLD = 0.5
 
-# 打开电脑的默认摄像头 (摄像头编号通常为 0)
-cap = cv2.VideoCapture('0')
 
-# 检查摄像头是否成功打开
-if not cap.isOpened():
-    print("错误：无法打开摄像头。")
-    exit()
+def create_pose():
+    """创建 MediaPipe Pose 模型实例"""
+    return mp_pose.Pose(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
 
-# 开始一个循环，实时处理摄像头的每一帧
-while cap.isOpened():
-    # 读取摄像头的一帧画面
-    success, image = cap.read()
-    if not success:
-        print("忽略了一个空帧。")
-        continue
 
-    image.flags.writeable = False
+def open_capture(source):
+    """打开视频源，纯数字按摄像头编号处理，其余按文件路径处理"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def capture_fps(cap):
+    """读取视频源帧率，摄像头可能返回 0"""
+    return cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+
+def capture_size(cap):
+    """读取视频源分辨率 (宽, 高)"""
+    return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+
+def open_output(path, fps, size):
+    """为骨骼叠加视频创建后台写入器，未指定路径时返回 None"""
+    if not path:
+        return None
+    writer = BackgroundVideoWriter(path, fps, size)
+    print(f"[output] 骨骼叠加视频写入 {path}，编码 {writer.codec}")
+    return writer
+
+
+def source_digest(source):
+    """视频文件的内容哈希，摄像头没有哈希"""
+    return b"" if str(source).isdigit() else hash_file(source)
+
 
+def open_recorder(path, source, fps):
+    """为关键点记录创建轨迹写入器，未指定路径时返回 None"""
+    if not path:
+        return None
+    return TrackWriter(path, fps, source_digest(source))
+
+
+def infer(pose, image, in_place=False):
+    """
+    对一帧 BGR 图像进行姿态推理
+
+    in_place 为 True 时直接在原图上转换通道顺序，推理后再转换回 BGR，不分配新图像；
+    用于共享内存槽位这类不希望每帧重新分配的缓冲区。
+    """
     # MediaPipe 模型需要 RGB 格式的图像，而 OpenCV 读取的是 BGR 格式，所以需要转换
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if in_place:
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        try:
+            return pose.process(image)
+        finally:
+            cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
 
-    # 使用 MediaPipe Pose 模型处理图像，得到姿态结果
+    image.flags.writeable = False
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     results = pose.process(image_rgb)
-
     image.flags.writeable = True
+    return results
 
-    # 在图像上绘制骨骼
-    if results.pose_landmarks:
-        mp_drawing.draw_landmarks(
-            image,
-            results.pose_landmarks,
-            mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
-            connection_drawing_spec=mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2, circle_radius=2)
-        )
 
+def draw_skeleton(image, landmarks, color=CONNECTION_COLOR):
+    """在图像上绘制骨骼，landmarks 为 (33, 4) 数组，None 表示未检测到人体"""
+    if landmarks is None:
+        return
+    height, width = image.shape[:2]
+    visible = np.nan_to_num(landmarks[:, 3]) >= VISIBILITY_THRESHOLD
+    points = np.rint(np.nan_to_num(landmarks[:, :2]) * (width, height)).astype(np.int32)
+    for a, b in POSE_CONNECTIONS:
+        if visible[a] and visible[b]:
+            cv2.line(image, tuple(points[a]), tuple(points[b]), color, 2)
+    for point in points[visible]:
+        cv2.circle(image, tuple(point), 4, LANDMARK_COLOR, 2)
+
+
+class PoseEstimator:
+    """逐帧推理，返回 (33, 4) 关键点数组"""
+
+    def __init__(self):
+        self.pose = create_pose()
+
+    def process(self, image, in_place=False):
+        results = infer(self.pose, image, in_place)
+        if results.pose_landmarks is None:
+            return None
+        return landmarks_to_array(results.pose_landmarks)
+
+    def close(self):
+        self.pose.close()
+
+
+class AdaptiveController:
+    """
+    根据实测推理耗时选择推理分辨率和跳帧间隔
+
+    档位按开销从高到低排列：(缩放比例, 每几帧推理一次)。
+    平摊到每个显示帧的推理耗时超过预算时降档，低于预算一半时升档。
+    """
+
+    LEVELS = ((1.0, 1), (0.75, 1), (0.75, 2), (0.5, 2), (0.5, 3))
+
+    def __init__(self, target_fps=30.0, budget=0.8, cooldown=15):
+        self.frame_budget = budget / target_fps
+        self.cooldown = cooldown
+        self.level = 0
+        self.latency = None
+        self._since_change = 0
+
+    @property
+    def scale(self):
+        return self.LEVELS[self.level][0]
+
+    @property
+    def skip(self):
+        return self.LEVELS[self.level][1]
+
+    def observe(self, latency):
+        """记录一次推理耗时（秒），必要时调整档位"""
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self._since_change += 1
+        if self._since_change < self.cooldown:
+            return
+
+        cost = self.latency / self.skip
+        if cost > self.frame_budget and self.level < len(self.LEVELS) - 1:
+            self._change(self.level + 1)
+        elif cost < self.frame_budget * 0.5 and self.level > 0:
+            self._change(self.level - 1)
+
+    def _change(self, level):
+        self.level = level
+        self._since_change = 0
+        print(f"[adaptive] 推理分辨率 {self.scale:.2f}，每 {self.skip} 帧推理一次")
+
+
+class AdaptiveEstimator(PoseEstimator):
+    """
+    自适应推理：按控制器的档位缩小图像并跳帧，
+    跳过的帧用最近两次推理结果线性外推，保证骨骼叠加层每帧都有更新
+    """
+
+    def __init__(self, target_fps=30.0):
+        super().__init__()
+        self.controller = AdaptiveController(target_fps)
+        self._last = None
+        self._prev = None
+        self._gap = 1
+        self._since = 0
+
+    def process(self, image, in_place=False):
+        self._since += 1
+        if self._last is None or self._since >= self.controller.skip:
+            started = time.perf_counter()
+            scale = self.controller.scale
+            small = image if scale == 1.0 else cv2.resize(
+                image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+            # 关键点是归一化坐标，缩小图像后无需换算
+            # 缩小后的图像是新分配的，可以直接原地转换
+            landmarks = super().process(small, in_place or small is not image)
+            self.controller.observe(time.perf_counter() - started)
+
+            self._prev = self._last if landmarks is not None else None
+            self._last = landmarks
+            self._gap = self._since
+            self._since = 0
+            return landmarks
+
+        if self._prev is None:
+            return self._last
+        # 跳过的帧：沿最近两次推理之间的速度外推，外推量不超过一个推理间隔
+        t = min(self._since / self._gap, 1.0)
+        predicted = self._last + (self._last - self._prev) * t
+        predicted[:, 3] = np.minimum(self._last[:, 3], self._prev[:, 3])
+        return predicted
+
+
+def create_estimator(adaptive=False, target_fps=30.0):
+    """创建姿态估计器"""
+    return AdaptiveEstimator(target_fps) if adaptive else PoseEstimator()
+
+
+def record_landmarks(recorder, landmarks):
+    """写入一帧关键点，未检测到人体时写入 NaN"""
+    if recorder:
+        recorder.append(landmarks if landmarks is not None else landmarks_to_array(None))
+
+
+def smooth(landmark_filter, landmarks, timestamp):
+    """对一帧关键点滤波，未启用滤波时原样返回"""
+    if landmark_filter is None:
+        return landmarks
+    return landmark_filter.update(landmarks, timestamp)
+
+
+def show_frame(image):
+    """镜像显示一帧画面，按下 'q' 键或 ESC 键 (ASCII 码 27) 时返回 True"""
     # 将处理后的图像水平翻转，看起来像镜子一样
     flipped_image = cv2.flip(image, 1)
+    cv2.imshow(WINDOW_NAME, flipped_image)
+    key = cv2.waitKey(5) & 0xFF
+    return key == ord('q') or key == 27
 
-    # 创建一个窗口并显示处理后的图像
-    cv2.imshow('Real-time Dance Skeleton by MediaPipe', flipped_image)
 
-    # 等待按键，如果按下 'q' 键或 ESC 键 (ASCII 码 27)，就退出循环
-    key = cv2.waitKey(5) & 0xFF
-    if key == ord('q') or key == 27:
-        break
+def present(image, writer=None, headless=False):
+    """
+    输出一帧：写入叠加视频（不镜像），非无头模式下同时显示
+
+    写入只是拷贝进后台写入器的缓冲区，编码不会拖慢调用方。
+    返回是否请求退出。
+    """
+    if writer:
+        writer.write(image)
+    if headless:
+        return False
+    return show_frame(image)
+
+
+class DropOldestQueue:
+    """有界队列，满时丢弃最旧的一帧，保证消费者总是拿到最新画面"""
+
+    def __init__(self, maxsize):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取出最旧的一项，超时或队列已关闭且为空时返回 None"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StageStats:
+    """记录各阶段耗时（毫秒），只保留最近的样本"""
+
+    def __init__(self, window=300):
+        self._samples = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.setdefault(stage, deque(maxlen=self._window))
+            samples.append(seconds * 1000.0)
+
+    def summary(self):
+        """返回 {阶段: (平均耗时, p95耗时)}"""
+        with self._lock:
+            result = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                result[stage] = (sum(ordered) / len(ordered), p95)
+            return result
+
+
+def report(stats, frames, elapsed, dropped):
+    """打印流水线运行状态，dropped 为 {阶段: 丢帧数}"""
+    fps = frames / elapsed if elapsed > 0 else 0.0
+    stages = ", ".join(
+        f"{stage} {avg:.1f}/{p95:.1f}ms" for stage, (avg, p95) in stats.summary().items()
+    )
+    drops = ", ".join(f"{name} {count}" for name, count in dropped.items())
+    print(f"[pipeline] {fps:.1f} FPS | 平均/p95: {stages} | 丢帧: {drops}")
+
+
+def run_serial(
+    source, record=None, adaptive=False, target_fps=30.0, smoothing=FILTER_NONE,
+    output=None, headless=False
+):
+    """串行模式：读取、推理、绘制、显示依次在同一个循环中完成"""
+    cap = open_capture(source)
+    # 检查摄像头是否成功打开
+    if not cap.isOpened():
+        print("错误：无法打开摄像头。")
+        return
+
+    is_camera = str(source).isdigit()
+    recorder = open_recorder(record, source, capture_fps(cap))
+    writer = open_output(output, capture_fps(cap), capture_size(cap))
+    estimator = create_estimator(adaptive, target_fps)
+    landmark_filter = create_filter(smoothing)
+    try:
+        while cap.isOpened():
+            success, image = cap.read()
+            if not success:
+                # 视频文件读完后结束，摄像头空帧则继续
+                if not is_camera:
+                    break
+                print("忽略了一个空帧。")
+                continue
+
+            landmarks = estimator.process(image)
+            # 轨迹文件保存原始关键点，滤波只影响显示，离线时可以再按需滤波
+            record_landmarks(recorder, landmarks)
+            landmarks = smooth(landmark_filter, landmarks, time.perf_counter())
+            draw_skeleton(image, landmarks)
+            if present(image, writer, headless):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # 循环结束后，释放摄像头资源并关闭所有窗口
+        if writer:
+            writer.close()
+        if recorder:
+            recorder.close()
+        estimator.close()
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def run_multi(
+    source, max_people, detect_interval=DEFAULT_DETECT_INTERVAL, record=None, smoothing=FILTER_NONE,
+    output=None, headless=False
+):
+    """
+    多人模式：每隔 detect_interval 帧检测一次人体，之间按关键点外接框跟踪，
+    每个人使用独立的 Pose 实例并获得固定编号；指定 record 时每人各写一条轨迹
+    """
+    cap = open_capture(source)
+    if not cap.isOpened():
+        print("错误：无法打开摄像头。")
+        return
+
+    is_camera = str(source).isdigit()
+    fps = capture_fps(cap)
+    source_hash = source_digest(source) if record else b""
+    writer = open_output(output, fps, capture_size(cap))
+    tracker = MultiPoseTracker(create_pose, detect_interval=detect_interval, max_people=max_people)
+    recorders = {}
+    filters = {}
+    frame_index = 0
+
+    def open_person_recorder(track_id):
+        stem, ext = os.path.splitext(record)
+        recorder = TrackWriter(f"{stem}_p{track_id}{ext}", fps, source_hash)
+        # 补齐此人出现之前的帧，所有人的轨迹共用同一条时间轴
+        for _ in range(frame_index):
+            recorder.append(landmarks_to_array(None))
+        return recorder
+
+    try:
+        while cap.isOpened():
+            success, image = cap.read()
+            if not success:
+                if not is_camera:
+                    break
+                continue
+
+            people = tracker.process(image)
+            now = time.perf_counter()
+            active = set()
+            for person in people:
+                active.add(person.id)
+                if record:
+                    if person.id not in recorders:
+                        recorders[person.id] = open_person_recorder(person.id)
+                    record_landmarks(recorders[person.id], person.landmarks)
+                if person.id not in filters:
+                    filters[person.id] = create_filter(smoothing)
+                landmarks = smooth(filters[person.id], person.landmarks, now)
+                draw_skeleton(image, landmarks, PERSON_COLORS[person.id % len(PERSON_COLORS)])
+
+            # 结束跟踪的人关闭各自的轨迹
+            for track_id in [track_id for track_id in recorders if track_id not in active]:
+                recorders.pop(track_id).close()
+            for track_id in [track_id for track_id in filters if track_id not in active]:
+                del filters[track_id]
+            frame_index += 1
+
+            if present(image, writer, headless):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for recorder in recorders.values():
+            recorder.close()
+        if writer:
+            writer.close()
+        tracker.close()
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def run_pipeline(
+    source, queue_size=2, report_interval=5.0, record=None, adaptive=False, target_fps=30.0,
+    smoothing=FILTER_NONE, output=None, headless=False
+):
+    """
+    流水线模式：采集线程 -> 推理线程 -> 主线程渲染
+
+    采集与推理之间、推理与渲染之间都是丢弃最旧帧的有界队列，
+    推理变慢时不会阻塞采集，也不会在摄像头缓冲区里堆积旧帧。
+    """
+    cap = open_capture(source)
+    if not cap.isOpened():
+        print("错误：无法打开摄像头。")
+        return
+
+    is_camera = str(source).isdigit()
+    recorder = open_recorder(record, source, capture_fps(cap))
+    writer = open_output(output, capture_fps(cap), capture_size(cap))
+    stop = threading.Event()
+    stats = StageStats()
+    capture_queue = DropOldestQueue(queue_size)
+    render_queue = DropOldestQueue(queue_size)
+
+    def capture_loop():
+        while not stop.is_set():
+            started = time.perf_counter()
+            success, image = cap.read()
+            if not success:
+                # 视频文件读完后结束，摄像头空帧则继续
+                if not is_camera:
+                    break
+                continue
+            captured_at = time.perf_counter()
+            stats.record("capture", captured_at - started)
+            capture_queue.put((image, captured_at))
+        capture_queue.close()
+
+    def inference_loop():
+        # MediaPipe Pose 不能跨线程共享，在推理线程内创建
+        estimator = create_estimator(adaptive, target_fps)
+        landmark_filter = create_filter(smoothing)
+        try:
+            while not stop.is_set():
+                item = capture_queue.get(timeout=0.5)
+                if item is None:
+                    if capture_queue.closed:
+                        break
+                    continue
+                image, captured_at = item
+                started = time.perf_counter()
+                landmarks = estimator.process(image)
+                stats.record("inference", time.perf_counter() - started)
+                record_landmarks(recorder, landmarks)
+                landmarks = smooth(landmark_filter, landmarks, captured_at)
+                render_queue.put((image, landmarks, captured_at))
+        finally:
+            estimator.close()
+            render_queue.close()
+
+    workers = [
+        threading.Thread(target=capture_loop, name="capture", daemon=True),
+        threading.Thread(target=inference_loop, name="inference", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    # cv2.imshow 必须在主线程调用，渲染阶段留在主线程
+    frames = 0
+    started_at = last_report = time.perf_counter()
+    queues = {"capture": capture_queue, "render": render_queue}
+
+    def dropped():
+        return {name: q.dropped for name, q in queues.items()}
+
+    try:
+        while True:
+            item = render_queue.get(timeout=0.5)
+            if item is None:
+                if render_queue.closed:
+                    break
+                continue
+            image, landmarks, captured_at = item
+            started = time.perf_counter()
+            draw_skeleton(image, landmarks)
+            quit_requested = present(image, writer, headless)
+            now = time.perf_counter()
+            stats.record("render", now - started)
+            stats.record("end_to_end", now - captured_at)
+            frames += 1
+
+            if now - last_report >= report_interval:
+                report(stats, frames, now - started_at, dropped())
+                last_report = now
+            if quit_requested:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=2.0)
+        report(stats, frames, time.perf_counter() - started_at, dropped())
+        if writer:
+            writer.close()
+        if recorder:
+            recorder.close()
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def _capture_process(ring, ready, stop, source):
+    """采集进程：直接把画面读进共享内存槽位"""
+    cap = open_capture(source)
+    is_camera = str(source).isdigit()
+    try:
+        while not stop.is_set():
+            slot = ring.acquire(timeout=0)
+            if slot is None:
+                # 下游占满了所有槽位，丢掉这一帧，避免摄像头缓冲区积压旧画面
+                if not cap.grab() and not is_camera:
+                    break
+                ring.drop("capture")
+                continue
+
+            started = time.perf_counter()
+            frame = ring.frame(slot)
+            success, image = cap.read(frame)
+            if success and image is not frame:
+                # 实际分辨率与预分配的不一致时才会走到这里
+                cv2.resize(image, frame.shape[1::-1], dst=frame)
+            if not success:
+                ring.release(slot)
+                if not is_camera:
+                    break
+                continue
+            captured_at = time.perf_counter()
+            ring.timings[slot, CAPTURED_AT] = captured_at
+            ring.timings[slot, CAPTURE_SECONDS] = captured_at - started
+            ready.put(slot)
+    finally:
+        ready.put(END)
+        cap.release()
+
+
+def _inference_process(ring, ready, rendered, stop, record, source, fps, adaptive, target_fps, smoothing):
+    """推理进程：在槽位上原地推理，关键点写回同一槽位"""
+    estimator = create_estimator(adaptive, target_fps)
+    landmark_filter = create_filter(smoothing)
+    recorder = open_recorder(record, source, fps)
+    try:
+        while not stop.is_set():
+            slot = ring.take_latest(ready, "inference", timeout=0.5)
+            if slot is None:
+                continue
+            if slot == END:
+                break
+            started = time.perf_counter()
+            landmarks = estimator.process(ring.frame(slot), in_place=True)
+            ring.timings[slot, INFERENCE_SECONDS] = time.perf_counter() - started
+            record_landmarks(recorder, landmarks)
+            landmarks = smooth(landmark_filter, landmarks, ring.timings[slot, CAPTURED_AT])
+            ring.landmarks[slot] = landmarks if landmarks is not None else np.nan
+            rendered.put(slot)
+    finally:
+        rendered.put(END)
+        if recorder:
+            recorder.close()
+        estimator.close()
+
+
+def run_processes(
+    source, queue_size=2, report_interval=5.0, record=None, adaptive=False, target_fps=30.0,
+    smoothing=FILTER_NONE, output=None, headless=False
+):
+    """
+    多进程模式：采集进程 -> 推理进程 -> 主进程渲染
+
+    帧保存在预分配的共享内存槽位中，进程之间只传递槽位编号，
+    推理在槽位上原地完成 BGR/RGB 转换，整个流程没有逐帧的图像分配和拷贝。
+    """
+    cap = open_capture(source)
+    if not cap.isOpened():
+        print("错误：无法打开摄像头。")
+        return
+    shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+    fps = capture_fps(cap)
+    writer = open_output(output, fps, (shape[1], shape[0]))
+    # 采集进程打开同一视频源前先释放，摄像头通常不允许同时打开两次
+    cap.release()
+
+    ctx = multiprocessing.get_context("spawn")
+    # 采集和渲染各占一个，两段队列各 queue_size 个
+    ring = FrameRing(shape, queue_size * 2 + 2, ctx.Queue())
+    ready, rendered = ctx.Queue(), ctx.Queue()
+    stop = ctx.Event()
+    workers = [
+        ctx.Process(target=_capture_process, args=(ring, ready, stop, source), name="capture"),
+        ctx.Process(
+            target=_inference_process,
+            args=(ring, ready, rendered, stop, record, source, fps, adaptive, target_fps, smoothing),
+            name="inference"
+        ),
+    ]
+    for worker in workers:
+        worker.start()
+
+    stats = StageStats()
+    frames = 0
+    started_at = last_report = time.perf_counter()
+    try:
+        while True:
+            slot = ring.take_latest(rendered, "render", timeout=0.5)
+            if slot is None:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+            if slot == END:
+                break
+
+            started = time.perf_counter()
+            image = ring.frame(slot)
+            landmarks = ring.landmarks[slot]
+            draw_skeleton(image, None if np.isnan(landmarks).all() else landmarks)
+            # 写入器会拷贝画面，槽位随后即可归还
+            quit_requested = present(image, writer, headless)
+            now = time.perf_counter()
+            stats.record("capture", ring.timings[slot, CAPTURE_SECONDS])
+            stats.record("inference", ring.timings[slot, INFERENCE_SECONDS])
+            stats.record("render", now - started)
+            stats.record("end_to_end", now - ring.timings[slot, CAPTURED_AT])
+            ring.release(slot)
+            frames += 1
+
+            if now - last_report >= report_interval:
+                report(stats, frames, now - started_at, ring.dropped())
+                last_report = now
+            if quit_requested:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=2.0)
+            if worker.is_alive():
+                worker.terminate()
+        report(stats, frames, time.perf_counter() - started_at, ring.dropped())
+        if writer:
+            writer.close()
+        ring.close()
+        if not headless:
+            cv2.destroyAllWindows()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基于 MediaPipe 的实时舞蹈骨骼追踪")
+    parser.add_argument("--source", default="0", help="摄像头编号或视频文件路径")
+    parser.add_argument(
+        "--mode", choices=["serial", "pipeline", "process"], default="serial",
+        help="serial: 单循环串行处理; pipeline: 采集/推理/渲染多线程流水线; "
+             "process: 基于共享内存帧环的多进程流水线"
+    )
+    parser.add_argument("--queue-size", type=int, default=2, help="流水线各阶段队列长度")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="流水线状态打印间隔（秒）")
+    parser.add_argument("--record", default=None, help="将逐帧关键点保存为 .pose 轨迹文件")
+    parser.add_argument("--adaptive", action="store_true", help="根据推理耗时自动降低分辨率并跳帧")
+    parser.add_argument("--target-fps", type=float, default=30.0, help="自适应模式下的目标显示帧率")
+    parser.add_argument("--output", default=None, help="将骨骼叠加画面编码保存为 MP4 视频")
+    parser.add_argument("--headless", action="store_true", help="不弹出显示窗口，适合在服务器上生成叠加视频")
+    parser.add_argument("--people", type=int, default=0, help="多人模式下同时跟踪的最多人数，0 表示单人模式")
+    parser.add_argument(
+        "--detect-interval", type=int, default=DEFAULT_DETECT_INTERVAL, help="多人模式下每隔多少帧检测一次人体"
+    )
+    parser.add_argument(
+        "--filter", choices=FILTER_CHOICES, default=FILTER_NONE,
+        help="关键点滤波: none 不滤波; one_euro 低延迟平滑; kalman 常速度卡尔曼滤波"
+    )
+    args = parser.parse_args()
+
+    if args.people > 0:
+        run_multi(
+            args.source,
+            args.people,
+            detect_interval=args.detect_interval,
+            record=args.record,
+            smoothing=args.filter,
+            output=args.output,
+            headless=args.headless
+        )
+    elif args.mode in ("pipeline", "process"):
+        runner = run_pipeline if args.mode == "pipeline" else run_processes
+        runner(
+            args.source,
+            queue_size=args.queue_size,
+            report_interval=args.report_interval,
+            record=args.record,
+            adaptive=args.adaptive,
+            target_fps=args.target_fps,
+            smoothing=args.filter,
+            output=args.output,
+            headless=args.headless
+        )
+    else:
+        run_serial(
+            args.source,
+            record=args.record,
+            adaptive=args.adaptive,
+            target_fps=args.target_fps,
+            smoothing=args.filter,
+            output=args.output,
+            headless=args.headless
+        )
+
 
-# 循环结束后，释放摄像头资源并关闭所有窗口
-cap.release()
-cv2.destroyAllWindows()()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
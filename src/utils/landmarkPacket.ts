@@ -0,0 +1,93 @@
+/**
+ * 实时分析关键点数据包
+ * 与后端 app/core/pose_packets.py 的格式保持一致：
+ * 文件头 8 字节 "PLMK" | 版本 u8 | 帧数 u8 | 保留 u16，
+ * 每帧 268 字节：时间戳毫秒 u32 | 33 x (x, y, z, visibility) int16，小端序
+ */
+
+export interface PoseLandmark {
+  x: number
+  y: number
+  z: number
+  visibility?: number
+}
+
+export interface LandmarkFrame {
+  timestamp: number
+  landmarks: PoseLandmark[] | null
+}
+
+const PACKET_MAGIC = [0x50, 0x4c, 0x4d, 0x4b] // "PLMK"
+const PACKET_VERSION = 1
+const HEADER_SIZE = 8
+const NUM_LANDMARKS = 33
+const FRAME_SIZE = 4 + NUM_LANDMARKS * 4 * 2
+const QUANT_SCALE = 10000
+const MISSING = -32768
+export const MAX_FRAMES_PER_PACKET = 255
+
+const quantize = (value: number): number =>
+  Math.max(MISSING + 1, Math.min(32767, Math.round(value * QUANT_SCALE)))
+
+/**
+ * 将多帧关键点编码为二进制数据包
+ * @param frames 关键点帧，未检测到人体的帧 landmarks 为 null
+ */
+export const encodeLandmarkPacket = (frames: LandmarkFrame[]): ArrayBuffer => {
+  if (frames.length > MAX_FRAMES_PER_PACKET) {
+    throw new Error(`单个数据包最多包含 ${MAX_FRAMES_PER_PACKET} 帧`)
+  }
+
+  const buffer = new ArrayBuffer(HEADER_SIZE + frames.length * FRAME_SIZE)
+  const view = new DataView(buffer)
+  PACKET_MAGIC.forEach((byte, i) => view.setUint8(i, byte))
+  view.setUint8(4, PACKET_VERSION)
+  view.setUint8(5, frames.length)
+
+  frames.forEach((frame, index) => {
+    let offset = HEADER_SIZE + index * FRAME_SIZE
+    view.setUint32(offset, Math.floor(frame.timestamp) >>> 0, true)
+    offset += 4
+
+    if (!frame.landmarks) {
+      view.setInt16(offset, MISSING, true)
+      return
+    }
+    for (let i = 0; i < NUM_LANDMARKS; i++) {
+      const landmark = frame.landmarks[i]
+      view.setInt16(offset, quantize(landmark.x), true)
+      view.setInt16(offset + 2, quantize(landmark.y), true)
+      view.setInt16(offset + 4, quantize(landmark.z), true)
+      view.setInt16(offset + 6, quantize(landmark.visibility ?? 0), true)
+      offset += 8
+    }
+  })
+  return buffer
+}
+
+/**
+ * 攒够若干帧后批量发送关键点数据包
+ */
+export class LandmarkPacketBatcher {
+  private frames: LandmarkFrame[] = []
+
+  constructor(
+    private socket: WebSocket,
+    private batchSize = 5
+  ) {}
+
+  push(landmarks: PoseLandmark[] | null, timestamp = performance.now()): void {
+    this.frames.push({ timestamp, landmarks })
+    if (this.frames.length >= this.batchSize) {
+      this.flush()
+    }
+  }
+
+  flush(): void {
+    if (!this.frames.length) return
+    if (this.socket.readyState === WebSocket.OPEN) {
+      this.socket.send(encodeLandmarkPacket(this.frames))
+    }
+    this.frames = []
+  }
+}